@@ -0,0 +1,73 @@
+"""
+benchmark_loading.py
+----------------
+Compares the notebook's way of getting the LEGO tables and aggregates (pd.read_csv on every
+run, each groupby computed on its own) with lego_analysis (typed tables from the cache,
+one-pass memoized aggregates).
+
+Usage:
+    python benchmark_loading.py [--repeat 20]
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import pandas as pd
+
+from lego_analysis import DATA_DIR, LegoData, load
+from lego_analysis.loaders import load_table
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """Returns the fastest of `repeat` runs in milliseconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def notebook_style() -> None:
+    """What the notebook cells do: parse every CSV and aggregate per year separately."""
+    colors = pd.read_csv(f"{DATA_DIR}/colors.csv")
+    sets = pd.read_csv(f"{DATA_DIR}/sets.csv")
+    themes = pd.read_csv(f"{DATA_DIR}/themes.csv")
+    colors["name"].nunique()
+    sets.groupby("year").size()
+    sets.groupby("year").agg({"theme_id": pd.Series.nunique})
+    sets.groupby("year").agg({"num_parts": "mean"})
+    set_theme_count = sets["theme_id"].value_counts().rename_axis("id").reset_index(name="set_count")
+    pd.merge(set_theme_count, themes, on="id", how="left")
+
+
+def cached_style() -> None:
+    """A fresh process with lego_analysis: tables from the cache, aggregates in one pass."""
+    lego = LegoData.from_csv()
+    lego.colour_counts
+    lego.sets_by_year, lego.themes_by_year, lego.parts_per_set
+    lego.theme_set_counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cached LEGO loading and aggregates.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    # Warm the on-disk cache (and the Parquet/Feather engine import)
+    for name in ("colors", "sets", "themes"):
+        load_table(name)
+    load().yearly
+
+    rows = [
+        ("notebook: read_csv + separate groupbys", best_time(notebook_style, args.repeat)),
+        ("lego_analysis: cached tables + one-pass aggregates", best_time(cached_style, args.repeat)),
+        ("lego_analysis.load() again in the same process", best_time(lambda: load().sets_by_year, args.repeat)),
+    ]
+    for label, milliseconds in rows:
+        print(f"{label:<52} {milliseconds:>8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
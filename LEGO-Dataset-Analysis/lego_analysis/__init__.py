@@ -0,0 +1,28 @@
+"""
+lego_analysis
+----------------
+Importable, cached version of the analysis in Lego_Analysis_for_learning.ipynb.
+
+Usage:
+    from lego_analysis import load
+    lego = load()              # typed tables from the Feather cache, memoized per process
+    lego.sets_by_year          # aggregates are computed once, in one pass
+    lego.theme_index.sets_under("Star Wars")  # sets of every Star Wars theme and its sub-themes
+"""
+
+from .aggregates import INCOMPLETE_YEARS, LegoData, load
+from .loaders import DATA_DIR, load_colors, load_sets, load_table, load_themes, parse_csv
+from .themes import ThemeIndex
+
+__all__ = [
+    "DATA_DIR",
+    "INCOMPLETE_YEARS",
+    "LegoData",
+    "load",
+    "load_colors",
+    "load_sets",
+    "load_table",
+    "load_themes",
+    "parse_csv",
+    "ThemeIndex",
+]
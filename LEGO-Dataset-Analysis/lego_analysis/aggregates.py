@@ -0,0 +1,149 @@
+"""
+aggregates.py
+----------------
+Memoized LEGO aggregates:
+1. LegoData holds the three typed tables and computes every per-year aggregate
+   (sets, distinct themes, average and total parts) in a single groupby pass, once.
+2. Theme set counts (with theme names), colour counts and the theme hierarchy index
+   (see themes.ThemeIndex) are computed once as well.
+3. load() returns the same LegoData for the same data folder until one of its CSVs changes,
+   so scripts and dashboards share the parsed tables and aggregates.
+"""
+
+import os
+import threading
+from functools import cached_property
+from typing import Dict, Tuple
+
+import pandas as pd
+
+from .loaders import DATA_DIR, load_colors, load_sets, load_themes
+from .themes import ThemeIndex
+
+# The CSVs are from late 2020, so the last two years in the data are incomplete
+INCOMPLETE_YEARS = 2
+
+
+class LegoData:
+    """
+    The colours, sets and themes tables plus their memoized aggregates.
+    Aggregates are computed on first access and shared afterwards; treat them as read-only.
+    """
+
+    def __init__(self, colors: pd.DataFrame, sets: pd.DataFrame, themes: pd.DataFrame) -> None:
+        """
+        Args:
+            colors (pd.DataFrame): Typed colours table (see loaders.load_colors).
+            sets (pd.DataFrame): Typed sets table (see loaders.load_sets).
+            themes (pd.DataFrame): Typed themes table (see loaders.load_themes).
+        """
+        self.colors = colors
+        self.sets = sets
+        self.themes = themes
+
+    @classmethod
+    def from_csv(cls, data_dir: str = DATA_DIR, use_cache: bool = True) -> "LegoData":
+        """Loads the three tables (from the Feather/Parquet cache when it is fresh)."""
+        return cls(
+            load_colors(data_dir, use_cache),
+            load_sets(data_dir, use_cache),
+            load_themes(data_dir, use_cache),
+        )
+
+    @cached_property
+    def yearly(self) -> pd.DataFrame:
+        """
+        Per-year aggregates from one groupby pass over the sets.
+
+        Returns:
+            pd.DataFrame: Indexed by year with nr_sets, nr_themes, avg_parts and total_parts.
+        """
+        return self.sets.groupby("year", observed=True).agg(
+            nr_sets=("set_num", "size"),
+            nr_themes=("theme_id", "nunique"),
+            avg_parts=("num_parts", "mean"),
+            total_parts=("num_parts", "sum"),
+        ).sort_index()
+
+    @property
+    def sets_by_year(self) -> pd.Series:
+        """Number of sets released per year."""
+        return self.yearly["nr_sets"]
+
+    @property
+    def themes_by_year(self) -> pd.DataFrame:
+        """Number of distinct themes per year (column nr_themes)."""
+        return self.yearly[["nr_themes"]]
+
+    @property
+    def parts_per_set(self) -> pd.DataFrame:
+        """Average number of parts per set per year (column avg_parts)."""
+        return self.yearly[["avg_parts"]]
+
+    @property
+    def complete_years(self) -> pd.DataFrame:
+        """The per-year aggregates without the trailing incomplete years (for charts)."""
+        return self.yearly.iloc[:-INCOMPLETE_YEARS]
+
+    @cached_property
+    def theme_set_counts(self) -> pd.DataFrame:
+        """
+        Number of sets per theme id with the theme name, most sets first.
+
+        Returns:
+            pd.DataFrame: Columns id, set_count and name (NaN for ids missing from themes.csv).
+        """
+        counts = self.sets["theme_id"].value_counts(sort=False)
+        counts = pd.DataFrame({"id": counts.index.astype("int16"), "set_count": counts.to_numpy()})
+        counts = counts[counts["set_count"] > 0]
+        merged = counts.merge(self.themes[["id", "name"]], on="id", how="left")
+        return merged.sort_values(["set_count", "id"], ascending=[False, True], ignore_index=True)
+
+    @cached_property
+    def theme_index(self) -> ThemeIndex:
+        """Theme tree index with the sets sorted by theme, for subtree queries and roll-ups."""
+        return ThemeIndex(self.themes, self.sets)
+
+    @cached_property
+    def colour_counts(self) -> Dict[str, int]:
+        """Unique colour names and the number of transparent and opaque colours."""
+        transparent = int(self.colors["is_trans"].sum())
+        return {
+            "unique": int(self.colors["name"].nunique()),
+            "transparent": transparent,
+            "opaque": len(self.colors) - transparent,
+        }
+
+
+_loaded: Dict[str, Tuple[Tuple, LegoData]] = {}
+_loaded_lock = threading.Lock()
+
+
+def _csv_versions(data_dir: str) -> Tuple:
+    versions = []
+    for name in ("colors", "sets", "themes"):
+        stat = os.stat(os.path.join(data_dir, f"{name}.csv"))
+        versions.append((stat.st_mtime_ns, stat.st_size))
+    return tuple(versions)
+
+
+def load(data_dir: str = DATA_DIR) -> LegoData:
+    """
+    Returns the LegoData of a data folder, reusing the one loaded earlier in this process
+    (with its memoized aggregates) unless a CSV has changed since.
+
+    Args:
+        data_dir (str): Folder with colors.csv, sets.csv and themes.csv.
+
+    Returns:
+        LegoData: Tables and aggregates.
+    """
+    key = os.path.abspath(data_dir)
+    versions = _csv_versions(key)
+    with _loaded_lock:
+        cached = _loaded.get(key)
+        if cached is not None and cached[0] == versions:
+            return cached[1]
+        data = LegoData.from_csv(key)
+        _loaded[key] = (versions, data)
+        return data
@@ -0,0 +1,171 @@
+"""
+loaders.py
+----------------
+Typed loaders for the Rebrickable CSVs in data/:
+1. Each CSV is parsed once with compact dtypes (int16/int32 ids and counts, categorical
+   `theme_id`, `is_trans` as bool, nullable `parent_id`).
+2. The parsed frame is cached next to the data (data/.cache/) as Feather or Parquet, keyed
+   on the CSV's modification time and size, so later loads skip CSV parsing entirely and an
+   edited CSV is re-parsed automatically.
+3. Without a Feather/Parquet engine (pyarrow) the cache falls back to pickle; if the cache
+   cannot be read or written the CSV is simply parsed.
+"""
+
+import glob
+import os
+import pickle
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CACHE_DIR_NAME = ".cache"
+
+# Bump when a schema below changes, so caches written with the old dtypes are ignored
+SCHEMA_VERSION = 1
+
+# read_csv arguments per table; ids and counts are small, so int16/int32 instead of int64
+SCHEMAS: Dict[str, Dict[str, Any]] = {
+    "colors": {
+        "dtype": {"id": "int16", "name": "string", "rgb": "string"},
+        "true_values": ["t"],
+        "false_values": ["f"],
+    },
+    "sets": {
+        "dtype": {"set_num": "string", "name": "string", "year": "int16", "theme_id": "int16",
+                  "num_parts": "int32"},
+    },
+    "themes": {
+        "dtype": {"id": "int16", "name": "string", "parent_id": "Int16"},
+    },
+}
+
+
+def _has_module(name: str) -> bool:
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def cache_format(preferred: str = "feather") -> str:
+    """
+    Returns the cache format to use: `preferred` ("feather" or "parquet") when an engine
+    for it is installed, otherwise "pickle".
+    """
+    if preferred == "parquet" and (_has_module("pyarrow") or _has_module("fastparquet")):
+        return "parquet"
+    if preferred in ("feather", "parquet") and _has_module("pyarrow"):
+        return "feather"
+    return "pickle"
+
+
+def _categorize(name: str, frame: pd.DataFrame) -> pd.DataFrame:
+    # Categories are built from the ints (read_csv would make them strings, and Parquet
+    # round-trips them as plain ints)
+    if name == "sets" and not isinstance(frame["theme_id"].dtype, pd.CategoricalDtype):
+        frame["theme_id"] = frame["theme_id"].astype("category")
+    return frame
+
+
+def parse_csv(name: str, data_dir: str = DATA_DIR) -> pd.DataFrame:
+    """
+    Parses one CSV with its typed schema.
+
+    Args:
+        name (str): Table name: "colors", "sets" or "themes".
+        data_dir (str): Folder with the CSVs.
+
+    Returns:
+        pd.DataFrame: Parsed table.
+    """
+    return _categorize(name, pd.read_csv(os.path.join(data_dir, f"{name}.csv"), **SCHEMAS[name]))
+
+
+def cache_path(name: str, data_dir: str = DATA_DIR, fmt: Optional[str] = None) -> str:
+    """
+    Path of the cached frame for the current version of a CSV (its mtime and size are in the name).
+    """
+    fmt = fmt or cache_format()
+    stat = os.stat(os.path.join(data_dir, f"{name}.csv"))
+    return os.path.join(data_dir, CACHE_DIR_NAME,
+                        f"{name}-{stat.st_mtime_ns}-{stat.st_size}-v{SCHEMA_VERSION}.{fmt}")
+
+
+def _read_cache(path: str, fmt: str) -> pd.DataFrame:
+    if fmt == "parquet":
+        return pd.read_parquet(path)
+    if fmt == "feather":
+        return pd.read_feather(path)
+    with open(path, "rb") as file:
+        return pickle.load(file)
+
+
+def _write_cache(frame: pd.DataFrame, path: str, fmt: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f"{path}.tmp"
+    if fmt == "parquet":
+        frame.to_parquet(temporary, index=False)
+    elif fmt == "feather":
+        frame.to_feather(temporary)
+    else:
+        with open(temporary, "wb") as file:
+            pickle.dump(frame, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def load_table(
+    name: str,
+    data_dir: str = DATA_DIR,
+    use_cache: bool = True,
+    fmt: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Loads a table from its cache, parsing (and caching) the CSV if the cache is missing or stale.
+
+    Args:
+        name (str): Table name: "colors", "sets" or "themes".
+        data_dir (str): Folder with the CSVs.
+        use_cache (bool): Set to False to always parse the CSV.
+        fmt (str, optional): "feather" (default, fastest to read), "parquet" or "pickle".
+
+    Returns:
+        pd.DataFrame: Typed table.
+    """
+    if not use_cache:
+        return parse_csv(name, data_dir)
+
+    fmt = cache_format(fmt or "feather")
+    path = cache_path(name, data_dir, fmt)
+    if os.path.exists(path):
+        try:
+            return _categorize(name, _read_cache(path, fmt))
+        except Exception as error:
+            print(f"Ignoring unreadable cache {path}: {error}")
+
+    frame = parse_csv(name, data_dir)
+    try:
+        _write_cache(frame, path, fmt)
+        # Drop caches of older versions of the same CSV
+        for stale in glob.glob(os.path.join(data_dir, CACHE_DIR_NAME, f"{name}-*")):
+            if stale != path:
+                os.remove(stale)
+    except (OSError, ImportError, ValueError) as error:
+        print(f"Could not cache {name}.csv: {error}")
+    return frame
+
+
+def load_colors(data_dir: str = DATA_DIR, use_cache: bool = True) -> pd.DataFrame:
+    """Colours: id, name, rgb and is_trans (bool)."""
+    return load_table("colors", data_dir, use_cache)
+
+
+def load_sets(data_dir: str = DATA_DIR, use_cache: bool = True) -> pd.DataFrame:
+    """Sets: set_num, name, year, theme_id (categorical) and num_parts."""
+    return load_table("sets", data_dir, use_cache)
+
+
+def load_themes(data_dir: str = DATA_DIR, use_cache: bool = True) -> pd.DataFrame:
+    """Themes: id, name and parent_id (nullable, <NA> for top-level themes)."""
+    return load_table("themes", data_dir, use_cache)
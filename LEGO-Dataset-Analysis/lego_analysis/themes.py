@@ -0,0 +1,232 @@
+"""
+themes.py
+----------------
+Theme hierarchy index over themes.csv `parent_id`:
+1. One depth-first walk numbers the themes in pre-order, so every theme's descendants
+   occupy a contiguous interval [start, end) of positions (nested-set / Euler-tour numbering).
+2. Sets are sorted once by the position of their theme; "all sets under theme X, including
+   its sub-themes" is then two binary searches and a slice instead of a scan of the table.
+3. Roll-ups of set counts and parts per theme subtree or per top-level theme are computed
+   for every theme at once with bincount and prefix sums.
+
+Works on any Rebrickable themes/sets export (missing parents become top-level themes).
+"""
+
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+Theme = Union[int, str]
+
+
+class ThemeIndex:
+    """
+    Pre-order (nested-set) index of the theme tree, optionally with the sets sorted by theme.
+    """
+
+    def __init__(self, themes: pd.DataFrame, sets: Optional[pd.DataFrame] = None) -> None:
+        """
+        Args:
+            themes (pd.DataFrame): Columns id, name and parent_id (missing for top-level themes).
+            sets (pd.DataFrame, optional): Sets with theme_id and num_parts, for set queries and roll-ups.
+        """
+        ids = themes["id"].to_numpy(dtype=np.int64)
+        parents = themes["parent_id"].astype("Float64").fillna(-1).to_numpy(dtype=np.int64)
+        names = themes["name"].astype(str).to_numpy()
+
+        # Themes whose parent is missing from the table are treated as top-level
+        known_parent = np.isin(parents, ids)
+        parents = np.where(known_parent, parents, -1)
+
+        order = np.argsort(ids, kind="stable")
+        children = {}
+        for row in np.argsort(parents, kind="stable"):
+            children.setdefault(parents[row], []).append(row)
+
+        # Iterative DFS from the top-level themes (in id order); rows not reached are part
+        # of a parent_id cycle and become roots so every theme gets an interval
+        preorder: List[int] = []
+        depth = np.zeros(len(ids), dtype=np.int64)
+        end_row = np.zeros(len(ids), dtype=np.int64)
+        visited = np.zeros(len(ids), dtype=bool)
+        roots = sorted(children.get(-1, []), key=lambda row: ids[row])
+        for start_row in roots + [row for row in order if parents[row] != -1]:
+            if visited[start_row]:
+                continue
+            stack: List[Tuple[int, bool]] = [(start_row, False)]
+            while stack:
+                row, leaving = stack.pop()
+                if leaving:
+                    end_row[row] = len(preorder)
+                    continue
+                if visited[row]:
+                    continue
+                visited[row] = True
+                preorder.append(row)
+                stack.append((row, True))
+                for child in sorted(children.get(ids[row], []), key=lambda child: -ids[child]):
+                    if not visited[child]:
+                        depth[child] = depth[row] + 1
+                        stack.append((child, False))
+
+        preorder_rows = np.array(preorder, dtype=np.int64)
+        # Theme ids, names, parents and depths in pre-order
+        self.ids = ids[preorder_rows]
+        self.names = names[preorder_rows]
+        self.parent_ids = parents[preorder_rows]
+        self.depth = depth[preorder_rows]
+        # Subtree of the theme at position p is positions [p, end[p])
+        self.end = end_row[preorder_rows]
+        positions = np.arange(len(preorder_rows))
+        # Top-level ancestor: the last depth-0 position at or before each position
+        self.root_position = np.maximum.accumulate(np.where(self.depth == 0, positions, 0))
+
+        self._lower_names = np.char.lower(self.names.astype(str))
+        self._sorted_ids = np.sort(self.ids)
+        self._sorted_positions = np.argsort(self.ids, kind="stable")
+
+        self.sets: Optional[pd.DataFrame] = None
+        self._set_positions = np.empty(0, dtype=np.int64)
+        if sets is not None:
+            self._index_sets(sets)
+
+    def _index_sets(self, sets: pd.DataFrame) -> None:
+        positions = self.positions(sets["theme_id"].to_numpy(dtype=np.int64))
+        known = positions >= 0
+        order = np.argsort(positions[known], kind="stable")
+        self.sets = sets[known].iloc[order].reset_index(drop=True)
+        self._set_positions = positions[known][order]
+
+    def positions(self, theme_ids: np.ndarray) -> np.ndarray:
+        """
+        Pre-order positions of theme ids (binary search); -1 for unknown ids.
+        """
+        theme_ids = np.asarray(theme_ids, dtype=np.int64)
+        found = np.searchsorted(self._sorted_ids, theme_ids)
+        found = np.minimum(found, len(self._sorted_ids) - 1)
+        known = (len(self._sorted_ids) > 0) & (self._sorted_ids[found] == theme_ids)
+        return np.where(known, self._sorted_positions[found], -1)
+
+    def position(self, theme_id: int) -> int:
+        """Pre-order position of one theme id (KeyError if unknown)."""
+        position = int(self.positions(np.array([theme_id]))[0])
+        if position < 0:
+            raise KeyError(f"unknown theme id {theme_id}")
+        return position
+
+    def find(self, name: str) -> np.ndarray:
+        """Ids of the themes with this exact name (case-insensitive), e.g. the four "Star Wars" themes."""
+        return self.ids[self._lower_names == name.lower()]
+
+    def _intervals(self, theme: Theme) -> List[Tuple[int, int]]:
+        """Position intervals of the subtrees of a theme id or of every theme with a name, without overlaps."""
+        theme_ids = self.find(theme) if isinstance(theme, str) else np.array([theme])
+        if isinstance(theme, str) and len(theme_ids) == 0:
+            raise KeyError(f"no theme named {theme!r}")
+        starts = np.sort(np.array([self.position(theme_id) for theme_id in theme_ids]))
+        intervals: List[Tuple[int, int]] = []
+        for start in starts:
+            # A theme nested under an earlier match is already covered by its interval
+            if intervals and start < intervals[-1][1]:
+                continue
+            intervals.append((int(start), int(self.end[start])))
+        return intervals
+
+    def descendants(self, theme: Theme, include_self: bool = True) -> np.ndarray:
+        """
+        Ids of all themes under a theme id (or under every theme with a name).
+
+        Args:
+            theme (int | str): Theme id or theme name.
+            include_self (bool): Whether the matched themes themselves are included.
+
+        Returns:
+            np.ndarray: Theme ids in pre-order.
+        """
+        ids = [self.ids[start + (0 if include_self else 1):end] for start, end in self._intervals(theme)]
+        return np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+
+    def top_level(self, theme_id: int) -> int:
+        """Id of the top-level theme a theme belongs to."""
+        return int(self.ids[self.root_position[self.position(theme_id)]])
+
+    def path(self, theme_id: int) -> List[str]:
+        """Theme names from the top-level theme down to this one."""
+        names = []
+        position = self.position(theme_id)
+        while True:
+            names.append(str(self.names[position]))
+            if self.depth[position] == 0:
+                break
+            position = self.position(int(self.parent_ids[position]))
+        return names[::-1]
+
+    def sets_under(self, theme: Theme) -> pd.DataFrame:
+        """
+        All sets of a theme (by id, or every theme with that name) and of its sub-themes.
+        Each subtree is a binary search on the theme-sorted sets, so the cost does not
+        depend on the size of the sets table.
+
+        Args:
+            theme (int | str): Theme id or theme name.
+
+        Returns:
+            pd.DataFrame: Matching sets, grouped by theme in pre-order.
+        """
+        if self.sets is None:
+            raise ValueError("ThemeIndex was built without sets")
+        slices = []
+        for start, end in self._intervals(theme):
+            low, high = np.searchsorted(self._set_positions, [start, end])
+            slices.append(self.sets.iloc[low:high])
+        return pd.concat(slices, ignore_index=True) if len(slices) > 1 else slices[0].reset_index(drop=True)
+
+    def _set_totals(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Sets and parts per theme position (the theme's own sets only)."""
+        if self.sets is None:
+            raise ValueError("ThemeIndex was built without sets")
+        count = np.bincount(self._set_positions, minlength=len(self.ids))
+        parts = np.bincount(self._set_positions, weights=self.sets["num_parts"].to_numpy(dtype=np.float64),
+                            minlength=len(self.ids))
+        return count, parts
+
+    def subtree_totals(self) -> pd.DataFrame:
+        """
+        Set counts and parts of every theme including all its sub-themes, via prefix sums over
+        the pre-order positions.
+
+        Returns:
+            pd.DataFrame: Indexed by theme id in pre-order with name, depth, own_sets,
+            nr_sets, total_parts and avg_parts.
+        """
+        count, parts = self._set_totals()
+        cumulative_count = np.concatenate([[0], np.cumsum(count)])
+        cumulative_parts = np.concatenate([[0], np.cumsum(parts)])
+        starts = np.arange(len(self.ids))
+        nr_sets = cumulative_count[self.end] - cumulative_count[starts]
+        total_parts = cumulative_parts[self.end] - cumulative_parts[starts]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg_parts = total_parts / nr_sets
+        return pd.DataFrame({
+            "name": self.names,
+            "depth": self.depth,
+            "own_sets": count,
+            "nr_sets": nr_sets,
+            "total_parts": total_parts.astype(np.int64),
+            "avg_parts": avg_parts,
+        }, index=pd.Index(self.ids, name="id"))
+
+    def rollup(self) -> pd.DataFrame:
+        """
+        Set counts and parts per top-level theme (all descendants included).
+
+        Returns:
+            pd.DataFrame: Indexed by top-level theme id with name, nr_themes, nr_sets,
+            total_parts and avg_parts, most sets first.
+        """
+        totals = self.subtree_totals()
+        top = totals[self.depth == 0].copy()
+        top.insert(1, "nr_themes", (self.end - np.arange(len(self.ids)))[self.depth == 0])
+        top = top.drop(columns=["depth", "own_sets"])
+        return top.sort_values(["nr_sets", "name"], ascending=[False, True])
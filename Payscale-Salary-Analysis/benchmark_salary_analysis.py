@@ -0,0 +1,80 @@
+"""
+benchmark_salary_analysis.py
+----------------
+Times the notebook's separate passes (idxmax/idxmin per column, insert of Spread, three
+sort_values and a groupby mean) against salary_analysis.analyze on synthetic surveys
+scaled to millions of rows.
+
+Usage:
+    python benchmark_salary_analysis.py [--rows 100000 1000000 5000000]
+"""
+
+import argparse
+import time
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from salary_analysis import (GROUP, MAJOR, MID_CAREER_10TH, MID_CAREER_90TH, SALARY_COLUMNS, analyze,
+                             from_frame)
+
+
+def make_survey(nr_rows: int, seed: int = 11) -> pd.DataFrame:
+    """Builds a survey with the CSV's columns, realistic salary ranges and three degree groups."""
+    rng = np.random.default_rng(seed)
+    starting = rng.uniform(30_000, 80_000, nr_rows).round(-2)
+    mid_career = (starting * rng.uniform(1.3, 2.0, nr_rows)).round(-2)
+    return pd.DataFrame({
+        MAJOR: np.char.add("Major ", np.arange(nr_rows).astype(str)).astype(object),
+        SALARY_COLUMNS[0]: starting,
+        SALARY_COLUMNS[1]: mid_career,
+        SALARY_COLUMNS[2]: (mid_career * rng.uniform(0.45, 0.7, nr_rows)).round(-2),
+        SALARY_COLUMNS[3]: (mid_career * rng.uniform(1.6, 2.2, nr_rows)).round(-2),
+        GROUP: rng.choice(["Business", "HASS", "STEM"], nr_rows),
+    })
+
+
+def notebook_passes(df: pd.DataFrame) -> None:
+    """The notebook's questions, each as its own pass over the DataFrame."""
+    clean_df = df.dropna()
+    for column in SALARY_COLUMNS[:2]:
+        clean_df[MAJOR].loc[clean_df[column].idxmax()]
+        clean_df[MAJOR].loc[clean_df[column].idxmin()]
+    clean_df.insert(1, "Spread", clean_df[MID_CAREER_90TH] - clean_df[MID_CAREER_10TH])
+    clean_df.sort_values("Spread")[[MAJOR, "Spread"]].head()
+    clean_df.sort_values(MID_CAREER_90TH, ascending=False)[[MAJOR, MID_CAREER_90TH]].head()
+    clean_df.sort_values("Spread", ascending=False)[[MAJOR, "Spread"]].head()
+    clean_df.groupby(GROUP).count()
+    clean_df.groupby(GROUP)[SALARY_COLUMNS].mean()
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """Returns the fastest of `repeat` runs in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the vectorized salary analysis.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'notebook passes':>16} {'typed arrays':>13} {'analyze':>10} {'speed-up':>9}")
+    for nr_rows in args.rows:
+        df = make_survey(nr_rows)
+        notebook = best_time(lambda: notebook_passes(df), args.repeat)
+        table = from_frame(df)
+        conversion = best_time(lambda: from_frame(df), 1)
+        vectorized = best_time(lambda: analyze(table), args.repeat)
+        print(f"{nr_rows:>10,} {notebook * 1000:>13.1f} ms {conversion * 1000:>10.1f} ms "
+              f"{vectorized * 1000:>7.1f} ms {notebook / vectorized:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
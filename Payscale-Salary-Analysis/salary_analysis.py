@@ -0,0 +1,261 @@
+"""
+salary_analysis.py
+----------------
+The analysis of major.ipynb as a reusable module:
+1. load(): reads salaries_by_college_major.csv once, drops junk rows (e.g. the trailing
+   "Source: PayScale Inc." line) and keeps typed arrays: majors, group codes and a
+   rows × 4 float matrix of salaries.
+2. analyze(): every question of the notebook in one vectorized pass: highest/lowest of every
+   salary column, the spread ranking (lowest risk and greatest spread), highest potential
+   and per-group counts and means.
+3. generate_reports(): writes a Markdown report per input file (e.g. one per survey year),
+   in parallel across a process pool.
+
+Usage:
+    python salary_analysis.py salaries_by_college_major.csv [more.csv ...] [--output reports] [--workers 4]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+MAJOR = "Undergraduate Major"
+GROUP = "Group"
+STARTING = "Starting Median Salary"
+MID_CAREER = "Mid-Career Median Salary"
+MID_CAREER_10TH = "Mid-Career 10th Percentile Salary"
+MID_CAREER_90TH = "Mid-Career 90th Percentile Salary"
+SALARY_COLUMNS = [STARTING, MID_CAREER, MID_CAREER_10TH, MID_CAREER_90TH]
+SPREAD = "Spread"
+
+
+@dataclass
+class SalaryTable:
+    """
+    Cleaned survey data as typed arrays.
+
+    Attributes:
+        majors (np.ndarray): Major names.
+        groups (np.ndarray): Group code per major (index into group_names).
+        group_names (List[str]): Degree groups, e.g. Business, HASS, STEM.
+        salaries (np.ndarray): majors × 4 float matrix in SALARY_COLUMNS order.
+    """
+    majors: np.ndarray
+    groups: np.ndarray
+    group_names: List[str]
+    salaries: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.majors)
+
+
+@dataclass
+class SalaryReport:
+    """
+    Answers to the notebook's questions for one survey.
+
+    Attributes:
+        rows (int): Majors analysed.
+        extremes (pd.DataFrame): Per salary column the highest and lowest major and value.
+        lowest_risk (pd.DataFrame): Majors with the smallest 10th-90th percentile spread.
+        greatest_spread (pd.DataFrame): Majors with the largest spread.
+        highest_potential (pd.DataFrame): Majors with the highest 90th percentile salary.
+        groups (pd.DataFrame): Per group the number of majors, mean salaries and mean spread.
+    """
+    rows: int
+    extremes: pd.DataFrame
+    lowest_risk: pd.DataFrame
+    greatest_spread: pd.DataFrame
+    highest_potential: pd.DataFrame
+    groups: pd.DataFrame
+
+
+def load(path: str) -> SalaryTable:
+    """
+    Reads and cleans a PayScale salaries-by-major CSV.
+
+    Args:
+        path (str): CSV with the major, group and four salary columns.
+
+    Returns:
+        SalaryTable: Rows with a missing major, group or salary are dropped.
+    """
+    frame = pd.read_csv(path, dtype={column: np.float64 for column in SALARY_COLUMNS})
+    frame.columns = frame.columns.str.strip()
+    return from_frame(frame)
+
+
+def from_frame(frame: pd.DataFrame) -> SalaryTable:
+    """Builds a SalaryTable from a DataFrame with the CSV's columns (junk rows are dropped)."""
+    salaries = frame[SALARY_COLUMNS].to_numpy(dtype=np.float64)
+    groups = pd.Categorical(frame[GROUP])
+    valid = ~np.isnan(salaries).any(axis=1) & (groups.codes >= 0) & frame[MAJOR].notna().to_numpy()
+    return SalaryTable(
+        majors=frame[MAJOR].to_numpy(dtype=object)[valid],
+        groups=groups.codes[valid].astype(np.int64),
+        group_names=[str(name) for name in groups.categories],
+        salaries=salaries[valid],
+    )
+
+
+def analyze(table: SalaryTable, top: int = 5) -> SalaryReport:
+    """
+    Computes every extremum, the spread rankings and the per-group statistics in one pass
+    over the salary matrix.
+
+    Args:
+        table (SalaryTable): Cleaned survey.
+        top (int): Majors listed per ranking.
+
+    Returns:
+        SalaryReport: All answers.
+    """
+    salaries = table.salaries
+    spread = salaries[:, 3] - salaries[:, 2]
+    top = min(top, len(table))
+
+    # Highest and lowest of every column at once (first occurrence on ties, like idxmax/idxmin)
+    highest, lowest = salaries.argmax(axis=0), salaries.argmin(axis=0)
+    columns = np.arange(len(SALARY_COLUMNS))
+    extremes = pd.DataFrame({
+        "highest_major": table.majors[highest],
+        "highest": salaries[highest, columns],
+        "lowest_major": table.majors[lowest],
+        "lowest": salaries[lowest, columns],
+    }, index=pd.Index(SALARY_COLUMNS, name="column"))
+
+    # Rankings only need the top rows: partition first, then sort those few
+    def smallest(values: np.ndarray) -> np.ndarray:
+        if top == 0:
+            return np.empty(0, dtype=np.int64)
+        candidates = np.argpartition(values, top - 1)[:top] if top < len(values) else np.arange(len(values))
+        return candidates[np.lexsort((candidates, values[candidates]))]
+
+    def ranking(rows: np.ndarray, column: str, values: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame({MAJOR: table.majors[rows], column: values[rows]})
+
+    # Per-group counts and sums with bincount (one pass per column, no Python loop over rows)
+    nr_groups = len(table.group_names)
+    counts = np.bincount(table.groups, minlength=nr_groups)
+    sums = np.column_stack([np.bincount(table.groups, weights=values, minlength=nr_groups)
+                            for values in (*salaries.T, spread)])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts[:, None]
+    groups = pd.DataFrame(means, columns=SALARY_COLUMNS + [SPREAD],
+                          index=pd.Index(table.group_names, name=GROUP))
+    groups.insert(0, "majors", counts)
+
+    return SalaryReport(
+        rows=len(table),
+        extremes=extremes,
+        lowest_risk=ranking(smallest(spread), SPREAD, spread),
+        greatest_spread=ranking(smallest(-spread), SPREAD, spread),
+        highest_potential=ranking(smallest(-salaries[:, 3]), MID_CAREER_90TH, salaries[:, 3]),
+        groups=groups,
+    )
+
+
+def _markdown(frame: pd.DataFrame, index: bool = True) -> str:
+    """Renders a small DataFrame as a Markdown table (salaries with thousands separators)."""
+    if index:
+        frame = frame.reset_index()
+    header = "| " + " | ".join(str(column) for column in frame.columns) + " |"
+    lines = [header, "|" + "---|" * len(frame.columns)]
+    for row in frame.itertuples(index=False):
+        cells = [f"{value:,.2f}" if isinstance(value, (float, np.floating)) else str(value) for value in row]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def format_report(report: SalaryReport, title: str) -> str:
+    """
+    Formats a SalaryReport as Markdown.
+
+    Args:
+        report (SalaryReport): Analysis result.
+        title (str): Report title, e.g. the input file name.
+
+    Returns:
+        str: Markdown document.
+    """
+    sections = [
+        f"# Salary report: {title}",
+        f"{report.rows} majors analysed.",
+        "## Highest and lowest salaries",
+        _markdown(report.extremes),
+        "## Lowest risk (smallest 10th-90th percentile spread)",
+        _markdown(report.lowest_risk, index=False),
+        "## Greatest spread",
+        _markdown(report.greatest_spread, index=False),
+        "## Highest potential (90th percentile mid-career salary)",
+        _markdown(report.highest_potential, index=False),
+        "## Degree groups (mean salaries)",
+        _markdown(report.groups),
+    ]
+    return "\n\n".join(sections) + "\n"
+
+
+def report_file(path: str, output_dir: str, top: int = 5) -> Tuple[str, int, float]:
+    """
+    Loads, analyses and writes the report of one CSV (runs in a worker process).
+
+    Returns:
+        Tuple[str, int, float]: Report path, majors analysed and seconds taken.
+    """
+    start = time.perf_counter()
+    report = analyze(load(path), top)
+    name = os.path.splitext(os.path.basename(path))[0]
+    output_path = os.path.join(output_dir, f"{name}_report.md")
+    with open(output_path, "w", encoding="utf-8") as file:
+        file.write(format_report(report, os.path.basename(path)))
+    return output_path, report.rows, time.perf_counter() - start
+
+
+def generate_reports(
+    paths: List[str],
+    output_dir: str = "reports",
+    workers: Optional[int] = None,
+    top: int = 5
+) -> List[Tuple[str, int, float]]:
+    """
+    Writes one report per input file, in parallel.
+
+    Args:
+        paths (List[str]): Survey CSVs (e.g. one per year).
+        output_dir (str): Folder for the "<name>_report.md" files (created if missing).
+        workers (int, optional): Worker processes (defaults to the number of CPUs).
+        top (int): Majors listed per ranking.
+
+    Returns:
+        List[Tuple[str, int, float]]: (report path, majors, seconds) per input, in input order.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if len(paths) <= 1:
+        return [report_file(path, output_dir, top) for path in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(report_file, paths, [output_dir] * len(paths), [top] * len(paths)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Salary reports for PayScale salaries-by-major CSVs.")
+    parser.add_argument("paths", nargs="*", default=["salaries_by_college_major.csv"], help="Input CSV files")
+    parser.add_argument("--output", default="reports", help="Folder for the reports")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--top", type=int, default=5, help="Majors per ranking")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = generate_reports(args.paths, args.output, args.workers, args.top)
+    for output_path, rows, seconds in results:
+        print(f"{output_path}: {rows:,} majors in {seconds * 1000:.1f} ms")
+    print(f"{len(results)} report(s) in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
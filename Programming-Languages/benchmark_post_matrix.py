@@ -0,0 +1,96 @@
+"""
+benchmark_post_matrix.py
+----------------
+Times the notebook pipeline (read_csv, to_datetime, pivot, fillna, rolling mean) against
+PostMatrix on a synthetic export with many tags and months, appending one new month
+incrementally against recomputing everything, and range queries on the TrendIndex
+against the notebook's groupby scans.
+
+Usage:
+    python benchmark_post_matrix.py [--tags 3000] [--months 240]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from post_matrix import PostMatrix
+from trend_index import TrendIndex
+
+
+def write_export(path: str, nr_tags: int, nr_months: int, seed: int = 3) -> int:
+    """
+    Writes a QueryResults.csv-like export where every tag starts in a random month.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rng = np.random.default_rng(seed)
+    months = pd.date_range("2000-01-01", periods=nr_months, freq="MS")
+    starts = rng.integers(0, nr_months, size=nr_tags)
+    month_index, tag_index = np.nonzero(np.arange(nr_months)[:, None] >= starts[None, :])
+    frame = pd.DataFrame({
+        "m": months[month_index].strftime("%Y-%m-%d %H:%M:%S"),
+        "TagName": np.array([f"tag{index}" for index in range(nr_tags)])[tag_index],
+        "": rng.integers(1, 5000, size=len(month_index)),
+    })
+    frame.to_csv(path, index=False)
+    return len(frame)
+
+
+def notebook_pipeline(path: str) -> pd.DataFrame:
+    """The notebook's steps on the whole export."""
+    df = pd.read_csv(path, names=["DATE", "TAG", "POSTS"], header=0)
+    df["DATE"] = pd.to_datetime(df["DATE"])
+    reshaped_df = df.pivot(index="DATE", columns="TAG", values="POSTS").fillna(0)
+    return reshaped_df.rolling(window=6).mean()
+
+
+def timed(function) -> float:
+    """Runs function once and returns the elapsed seconds."""
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the streaming post matrix.")
+    parser.add_argument("--tags", type=int, default=3000)
+    parser.add_argument("--months", type=int, default=240)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "QueryResults.csv")
+        rows = write_export(path, args.tags, args.months)
+        print(f"Synthetic export: {rows:,} rows, {args.tags} tags, {args.months} months")
+
+        notebook = timed(lambda: notebook_pipeline(path))
+        matrix = PostMatrix(window=6)
+        streaming = timed(lambda: matrix.ingest(path))
+        print(f"{'notebook: read, to_datetime, pivot, fillna, rolling':<55} {notebook * 1000:>9.1f} ms")
+        print(f"{'PostMatrix.ingest (chunked, rolling mean included)':<55} {streaming * 1000:>9.1f} ms")
+
+        next_month = str(matrix.months[-1] + 1)
+        new_month = {tag: 100 for tag in matrix.tags}
+        incremental = timed(lambda: matrix.append_month(next_month, new_month))
+        print(f"{'append one month, recompute everything (notebook)':<55} {notebook * 1000:>9.1f} ms")
+        print(f"{'append one month, PostMatrix.append_month':<55} {incremental * 1000:>9.1f} ms")
+
+        df = pd.read_csv(path, names=["DATE", "TAG", "POSTS"], header=0, parse_dates=["DATE"])
+        start, end = str(matrix.months[len(matrix.months) // 2]), str(matrix.months[-12])
+        index_build = timed(lambda: TrendIndex(matrix))
+        index = TrendIndex(matrix)
+        scan = timed(lambda: df[(df["DATE"] >= start) & (df["DATE"] <= end)]
+                     .groupby("TAG")["POSTS"].sum().sort_values(ascending=False).head(3))
+        lookup = timed(lambda: index.top(3, start, end))
+        print(f"{'TrendIndex build (ranks, growth, prefix sums)':<55} {index_build * 1000:>9.1f} ms")
+        print(f"{'top-3 tags in a range, groupby scan (notebook)':<55} {scan * 1000:>9.1f} ms")
+        print(f"{'top-3 tags in a range, TrendIndex.top':<55} {lookup * 1000:>9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
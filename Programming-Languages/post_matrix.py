@@ -0,0 +1,213 @@
+"""
+post_matrix.py
+----------------
+Streaming month × tag engine for the Stack Overflow export (QueryResults.csv):
+1. The CSV is read in chunks with dates parsed while reading; every chunk is written straight
+   into a dense month × tag NumPy matrix of post counts (tags get stable integer codes), so the
+   long table, pd.to_datetime, pivot and fillna(0) steps of the notebook are never needed.
+2. Cumulative sums per tag are kept next to the counts, so the rolling mean of every month is
+   a difference of two rows. Appending a month (or late data for an old one) only recomputes
+   the cumulative sums and rolling means from the earliest month touched.
+3. to_frame() gives the notebook's reshaped_df / roll_df shapes for plotting.
+
+Usage:
+    matrix = PostMatrix(window=6)
+    matrix.ingest("QueryResults.csv")
+    matrix.append_month("2024-06", {"python": 1234, "rust": 56})
+    roll_df = matrix.to_frame(smoothed=True)
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+COLUMN_NAMES = ["DATE", "TAG", "POSTS"]
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def month_numbers(dates: np.ndarray) -> np.ndarray:
+    """Months since 1970-01 of datetime64 values (or date strings)."""
+    return np.asarray(dates, dtype="datetime64[M]").astype(np.int64)
+
+
+class PostMatrix:
+    """
+    Dense month × tag matrix of post counts with incrementally maintained rolling means.
+    Months are contiguous from the first to the last month seen (months without data are 0).
+    """
+
+    def __init__(self, window: int = 6) -> None:
+        """
+        Args:
+            window (int): Rolling-mean window in months (the notebook uses 6).
+        """
+        self.window = window
+        self.tags: List[str] = []
+        self._tag_codes: Dict[str, int] = {}
+        self.first_month: Optional[int] = None
+        self.nr_months = 0
+        # Backing arrays grow by doubling; the live part is [:nr_months, :len(tags)]
+        self._counts = np.zeros((0, 0), dtype=np.int64)
+        self._present = np.zeros((0, 0), dtype=bool)
+        self._cumulative = np.zeros((1, 0), dtype=np.int64)
+        self._rolling = np.zeros((0, 0), dtype=np.float64)
+
+    # -------------------- INGESTION --------------------
+
+    def ingest(self, path: str, chunksize: int = 100_000) -> int:
+        """
+        Streams a QueryResults.csv export (date, tag, posts; one header row) into the matrix.
+
+        Args:
+            path (str): CSV file.
+            chunksize (int): Rows per chunk; memory use is bounded by the chunk and the matrix.
+
+        Returns:
+            int: Number of rows read.
+        """
+        rows = 0
+        reader = pd.read_csv(
+            path,
+            names=COLUMN_NAMES,
+            header=0,
+            usecols=[0, 1, 2],
+            parse_dates=["DATE"],
+            date_format=DATE_FORMAT,
+            dtype={"TAG": "category", "POSTS": np.int64},
+            chunksize=chunksize,
+        )
+        for chunk in reader:
+            self.append(chunk["DATE"].to_numpy(), chunk["TAG"], chunk["POSTS"].to_numpy())
+            rows += len(chunk)
+        return rows
+
+    def tag_codes(self, tags: Iterable[str]) -> np.ndarray:
+        """
+        Integer codes of tags, assigning new codes (new matrix columns) to unseen tags.
+        A categorical Series is translated through its categories, so each distinct tag
+        of a chunk is looked up once.
+        """
+        categorical = tags if isinstance(tags, pd.Series) and isinstance(tags.dtype, pd.CategoricalDtype) \
+            else pd.Series(pd.Categorical(list(tags)))
+        categories = categorical.cat.categories
+        for tag in categories:
+            if tag not in self._tag_codes:
+                self._tag_codes[tag] = len(self.tags)
+                self.tags.append(tag)
+        lookup = np.array([self._tag_codes[tag] for tag in categories], dtype=np.int64)
+        return lookup[categorical.cat.codes.to_numpy()]
+
+    def append(self, dates: np.ndarray, tags: Iterable[str], posts: np.ndarray) -> None:
+        """
+        Adds post counts (summed into existing cells) and updates the rolling means of the
+        months from the earliest one touched onwards.
+
+        Args:
+            dates (np.ndarray): Month of every row (datetime64 or date strings).
+            tags (Iterable[str]): Tag of every row (a categorical Series is fastest).
+            posts (np.ndarray): Posts of every row.
+        """
+        months = month_numbers(dates)
+        if len(months) == 0:
+            return
+        codes = self.tag_codes(tags)
+        previous_months = self.nr_months
+        shift = self._reserve(int(months.min()), int(months.max()), len(self.tags))
+        rows = months - self.first_month
+        np.add.at(self._counts, (rows, codes), np.asarray(posts, dtype=np.int64))
+        self._present[rows, codes] = True
+        # Months inserted in front move every window; new empty months after the old end need sums too
+        self._refresh(0 if shift else min(int(rows.min()), previous_months))
+
+    def append_month(self, month: str, posts_by_tag: Dict[str, int]) -> None:
+        """
+        Adds one month of data, e.g. append_month("2024-06", {"python": 1234}).
+        Only that month's cumulative sums and rolling means are computed.
+        """
+        self.append(np.full(len(posts_by_tag), np.datetime64(month, "M")), list(posts_by_tag),
+                    np.fromiter(posts_by_tag.values(), dtype=np.int64, count=len(posts_by_tag)))
+
+    def _reserve(self, first: int, last: int, nr_tags: int) -> int:
+        """
+        Grows the backing arrays to cover months first..last and nr_tags tags.
+
+        Returns:
+            int: Number of months inserted before the previous first month.
+        """
+        if self.first_month is None:
+            self.first_month = first
+        shift = max(0, self.first_month - first)
+        nr_months = max(self.nr_months + shift, last - self.first_month + shift + 1)
+        capacity_months, capacity_tags = self._counts.shape
+        if shift or nr_months > capacity_months or nr_tags > capacity_tags:
+            grow_months = nr_months > capacity_months
+            new_months = max(nr_months, 16, 2 * capacity_months if grow_months else capacity_months)
+            new_tags = max(nr_tags, 16, 2 * capacity_tags if nr_tags > capacity_tags else capacity_tags)
+            for name, extra in (("_counts", 0), ("_present", 0), ("_rolling", 0), ("_cumulative", 1)):
+                old = getattr(self, name)
+                grown = np.zeros((new_months + extra, new_tags), dtype=old.dtype)
+                grown[shift:shift + self.nr_months + extra, :old.shape[1]] = old[:self.nr_months + extra]
+                setattr(self, name, grown)
+            self.first_month -= shift
+        self.nr_months = nr_months
+        return shift
+
+    def _refresh(self, start: int) -> None:
+        """Recomputes cumulative sums and rolling means for months start.. (all tags at once)."""
+        end = self.nr_months
+        if start >= end:
+            return
+        counts = self._counts[start:end]
+        np.cumsum(counts, axis=0, out=self._cumulative[start + 1:end + 1])
+        self._cumulative[start + 1:end + 1] += self._cumulative[start]
+        # Rolling mean of month m: (cumulative[m + 1] - cumulative[m + 1 - window]) / window
+        first_full = max(start, self.window - 1)
+        rolling = self._rolling[start:end]
+        rolling[:first_full - start] = np.nan
+        if first_full < end:
+            upper = self._cumulative[first_full + 1:end + 1]
+            lower = self._cumulative[first_full + 1 - self.window:end + 1 - self.window]
+            np.divide(upper - lower, self.window, out=self._rolling[first_full:end])
+
+    # -------------------- ACCESS --------------------
+
+    @property
+    def months(self) -> np.ndarray:
+        """Month of every matrix row (datetime64[M])."""
+        if self.first_month is None:
+            return np.empty(0, dtype="datetime64[M]")
+        return (self.first_month + np.arange(self.nr_months)).astype("datetime64[M]")
+
+    @property
+    def counts(self) -> np.ndarray:
+        """months × tags post counts (0 where a tag had no row); a view, do not modify."""
+        return self._counts[:self.nr_months, :len(self.tags)]
+
+    @property
+    def present(self) -> np.ndarray:
+        """months × tags mask of the cells that appeared in the data."""
+        return self._present[:self.nr_months, :len(self.tags)]
+
+    @property
+    def cumulative(self) -> np.ndarray:
+        """(months + 1) × tags running totals; row m is the sum of months before m."""
+        return self._cumulative[:self.nr_months + 1, :len(self.tags)]
+
+    @property
+    def rolling_mean(self) -> np.ndarray:
+        """months × tags rolling mean over `window` months (NaN for the first window - 1 months)."""
+        return self._rolling[:self.nr_months, :len(self.tags)]
+
+    def column(self, tag: str) -> int:
+        """Matrix column of a tag (KeyError if unknown)."""
+        return self._tag_codes[tag]
+
+    def to_frame(self, smoothed: bool = False) -> pd.DataFrame:
+        """
+        The matrix as a DataFrame indexed by month with one column per tag, like the
+        notebook's reshaped_df after fillna(0) (or roll_df with smoothed=True).
+        """
+        values = self.rolling_mean if smoothed else self.counts
+        index = pd.DatetimeIndex(self.months.astype("datetime64[ns]"), name="DATE")
+        return pd.DataFrame(values.copy(), index=index, columns=pd.Index(self.tags, name="TAG"))
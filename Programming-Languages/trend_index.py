@@ -0,0 +1,168 @@
+"""
+trend_index.py
+----------------
+Rank and trend index over the month × tag post matrix (see post_matrix), built once:
+1. Per-tag totals, months with posts, monthly ranks (1 = most posts that month),
+   year-over-year growth of the smoothed series and per-tag prefix sums of posts.
+2. Queries answer from the prefix sums instead of re-scanning the long table: the posts of
+   every tag in any date range are one subtraction per tag, whatever the length of the history.
+   - top(k, start, end): most popular tags in a date range
+   - rank_history(tag): monthly rank of a tag
+   - rising(k, end, months): tags whose posts grew fastest against the months before
+   - total(tag, start, end), months_active, most_popular()
+
+Usage:
+    index = TrendIndex.from_csv("QueryResults.csv")
+    index.top(3, "2015-01", "2018-12")
+    index.rank_history("python")
+    index.rising(5, end="2020-12", months=12)
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from post_matrix import PostMatrix, month_numbers
+
+
+class TrendIndex:
+    """
+    Materialized totals, ranks, growth rates and prefix sums of a PostMatrix.
+    It is a snapshot: build a new index after appending to the matrix.
+    """
+
+    def __init__(self, matrix: PostMatrix, growth_months: int = 12) -> None:
+        """
+        Args:
+            matrix (PostMatrix): Ingested post counts.
+            growth_months (int): Lag (in months) of the growth rates, 12 for year over year.
+        """
+        self.tags = np.array(matrix.tags, dtype=object)
+        self.months = matrix.months
+        self.first_month = matrix.first_month
+        self.growth_months = growth_months
+        counts = matrix.counts
+
+        # Prefix sums: posts of tag t in months [a, b) = cumulative[b, t] - cumulative[a, t]
+        self.cumulative = matrix.cumulative.copy()
+        self.totals = self.cumulative[-1].copy()
+        self.months_active = matrix.present.sum(axis=0)
+
+        # Rank of every tag in every month (1 = most posts); 0 where the tag had no data
+        present = matrix.present
+        order = np.argsort(-counts, axis=1, kind="stable")
+        ranks = np.empty(counts.shape, dtype=np.int32)
+        np.put_along_axis(ranks, order, np.arange(1, counts.shape[1] + 1, dtype=np.int32)[None, :], axis=1)
+        self.ranks = np.where(present, ranks, 0)
+
+        # Growth of the smoothed series against growth_months earlier (NaN where undefined)
+        rolling = matrix.rolling_mean
+        self.growth = np.full(counts.shape, np.nan)
+        if len(rolling) > growth_months:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                growth = rolling[growth_months:] / rolling[:-growth_months] - 1
+            self.growth[growth_months:] = np.where(np.isfinite(growth), growth, np.nan)
+
+        self._tag_positions = {tag: position for position, tag in enumerate(matrix.tags)}
+
+    @classmethod
+    def from_csv(cls, path: str, window: int = 6, growth_months: int = 12) -> "TrendIndex":
+        """Streams a QueryResults.csv export into a PostMatrix and indexes it."""
+        matrix = PostMatrix(window=window)
+        matrix.ingest(path)
+        return cls(matrix, growth_months)
+
+    def _tag(self, tag: str) -> int:
+        try:
+            return self._tag_positions[tag]
+        except KeyError:
+            raise KeyError(f"unknown tag {tag!r}") from None
+
+    def _rows(self, start: Optional[str] = None, end: Optional[str] = None) -> Tuple[int, int]:
+        """Matrix rows [low, high) of the months from start to end (both inclusive, e.g. "2015-01")."""
+        nr_months = len(self.months)
+        low = 0 if start is None else int(month_numbers(np.array([start]))[0]) - self.first_month
+        high = nr_months if end is None else int(month_numbers(np.array([end]))[0]) - self.first_month + 1
+        return min(max(low, 0), nr_months), min(max(high, 0), nr_months)
+
+    def posts_in_range(self, start: Optional[str] = None, end: Optional[str] = None) -> np.ndarray:
+        """Posts of every tag from start to end (inclusive months): one subtraction per tag."""
+        low, high = self._rows(start, end)
+        if high <= low:
+            return np.zeros(len(self.tags), dtype=np.int64)
+        return self.cumulative[high] - self.cumulative[low]
+
+    def total(self, tag: str, start: Optional[str] = None, end: Optional[str] = None) -> int:
+        """Posts of one tag from start to end (inclusive months), in O(1)."""
+        low, high = self._rows(start, end)
+        column = self._tag(tag)
+        return int(self.cumulative[high, column] - self.cumulative[low, column]) if high > low else 0
+
+    def top(self, k: int = 3, start: Optional[str] = None, end: Optional[str] = None) -> pd.Series:
+        """
+        The k tags with the most posts from start to end (inclusive months).
+
+        Args:
+            k (int): Number of tags.
+            start (str, optional): First month, e.g. "2015-01" or "2015-01-01".
+            end (str, optional): Last month.
+
+        Returns:
+            pd.Series: Posts per tag, most popular first.
+        """
+        posts = self.posts_in_range(start, end)
+        k = min(k, len(posts))
+        if k == 0:
+            return pd.Series(dtype=np.int64, name="POSTS")
+        best = np.argpartition(-posts, k - 1)[:k]
+        best = best[np.lexsort((self.tags[best].astype(str), -posts[best]))]
+        return pd.Series(posts[best], index=pd.Index(self.tags[best], name="TAG"), name="POSTS")
+
+    def most_popular(self) -> Tuple[str, int]:
+        """The tag with the most posts overall and its total."""
+        column = int(np.argmax(self.totals))
+        return str(self.tags[column]), int(self.totals[column])
+
+    def months_per_tag(self) -> pd.Series:
+        """Number of months with posts per tag, most first (the notebook's months_per_language)."""
+        series = pd.Series(self.months_active, index=pd.Index(self.tags, name="TAG"), name="months")
+        return series.sort_values(ascending=False, kind="stable")
+
+    def rank_history(self, tag: str) -> pd.Series:
+        """Monthly rank of a tag (1 = most posts that month), <NA> for months without data."""
+        ranks = self.ranks[:, self._tag(tag)]
+        index = pd.DatetimeIndex(self.months.astype("datetime64[ns]"), name="DATE")
+        return pd.Series(ranks, index=index, name=tag, dtype="Int32").mask(ranks == 0)
+
+    def growth_history(self, tag: str) -> pd.Series:
+        """Growth of the smoothed posts of a tag against growth_months earlier (0.25 = +25%)."""
+        return pd.Series(self.growth[:, self._tag(tag)],
+                         index=pd.DatetimeIndex(self.months.astype("datetime64[ns]"), name="DATE"), name=tag)
+
+    def rising(self, k: int = 5, end: Optional[str] = None, months: int = 12, min_posts: int = 100) -> pd.DataFrame:
+        """
+        Tags whose posts grew fastest in the `months` months up to `end` against the `months`
+        months before, from the prefix sums (O(1) per tag).
+
+        Args:
+            k (int): Number of tags.
+            end (str, optional): Last month of the recent period (defaults to the last month).
+            months (int): Length of each period.
+            min_posts (int): Minimum posts in the earlier period, so tiny tags do not dominate.
+
+        Returns:
+            pd.DataFrame: recent, previous and growth (0.25 = +25%) per tag, fastest-rising first.
+        """
+        _, high = self._rows(None, end)
+        middle, low = max(high - months, 0), max(high - 2 * months, 0)
+        recent = self.cumulative[high] - self.cumulative[middle]
+        previous = self.cumulative[middle] - self.cumulative[low]
+        eligible = previous >= max(min_posts, 1)
+        growth = np.full(len(self.tags), -np.inf)
+        growth[eligible] = recent[eligible] / previous[eligible] - 1
+        order = np.argsort(-growth, kind="stable")[:min(k, int(eligible.sum()))]
+        return pd.DataFrame(
+            {"recent": recent[order], "previous": previous[order], "growth": growth[order]},
+            index=pd.Index(self.tags[order], name="TAG"),
+        )
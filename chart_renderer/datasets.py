@@ -0,0 +1,154 @@
+"""
+datasets.py
+----------------
+Data behind the charts of the three analysis notebooks, as named builders:
+1. Builders take their frames from the projects' own analysis modules (lego_analysis,
+   post_matrix/trend_index and salary_analysis), so a chart plots exactly what the analysis
+   computes instead of a second pandas re-derivation of it.
+2. DATASETS lists the files each dataset is built from, so the renderer can hash the input
+   data and skip charts whose inputs have not changed without building anything.
+3. The loaded analysis objects and the built datasets are memoized per process, so charts of
+   one project share one parse of its CSVs.
+"""
+
+import importlib
+import os
+import sys
+from functools import lru_cache
+from types import ModuleType
+from typing import Callable, Dict, Tuple
+
+import pandas as pd
+
+LEGO_DATA = "LEGO-Dataset-Analysis/data"
+LEGO_COLORS = f"{LEGO_DATA}/colors.csv"
+LEGO_SETS = f"{LEGO_DATA}/sets.csv"
+LEGO_THEMES = f"{LEGO_DATA}/themes.csv"
+LANGUAGE_POSTS = "Programming-Languages/QueryResults.csv"
+SALARIES = "Payscale-Salary-Analysis/salaries_by_college_major.csv"
+
+
+def _module(root: str, project: str, name: str) -> ModuleType:
+    """Imports an analysis module from its project folder under the repository root."""
+    folder = os.path.join(root, project)
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    return importlib.import_module(name)
+
+
+# -------------------- LEGO --------------------
+
+def _lego(root: str):
+    """LegoData of the data folder (lego_analysis.load memoizes it per process)."""
+    return _module(root, "LEGO-Dataset-Analysis", "lego_analysis").load(os.path.join(root, LEGO_DATA))
+
+
+def lego_by_year(root: str) -> pd.DataFrame:
+    """Sets, distinct themes and average parts per year (LegoData.yearly)."""
+    return _lego(root).yearly[["nr_sets", "nr_themes", "avg_parts"]]
+
+
+def lego_theme_counts(root: str) -> pd.DataFrame:
+    """Number of sets per theme with the theme name, most sets first (LegoData.theme_set_counts)."""
+    return _lego(root).theme_set_counts.set_index("name")
+
+
+# -------------------- PROGRAMMING LANGUAGES --------------------
+
+@lru_cache(maxsize=4)
+def _post_matrix(root: str):
+    """PostMatrix of the posts CSV with the notebook's 6-month rolling window."""
+    matrix = _module(root, "Programming-Languages", "post_matrix").PostMatrix(window=6)
+    matrix.ingest(os.path.join(root, LANGUAGE_POSTS))
+    return matrix
+
+
+@lru_cache(maxsize=4)
+def _trend_index(root: str):
+    return _module(root, "Programming-Languages", "trend_index").TrendIndex(_post_matrix(root))
+
+
+def language_posts(root: str) -> pd.DataFrame:
+    """Posts per month (rows) and tag (columns), missing months as 0."""
+    return _post_matrix(root).to_frame()
+
+
+def language_posts_smoothed(root: str) -> pd.DataFrame:
+    """6-month rolling mean of the posts per tag."""
+    return _post_matrix(root).to_frame(smoothed=True)
+
+
+def language_totals(root: str, start: str, end: str) -> pd.DataFrame:
+    """Total posts per tag between two dates (inclusive months), most first (TrendIndex.top)."""
+    index = _trend_index(root)
+    return index.top(len(index.tags), start, end).to_frame("posts")
+
+
+# -------------------- SALARIES --------------------
+
+def _salary_analysis(root: str) -> ModuleType:
+    return _module(root, "Payscale-Salary-Analysis", "salary_analysis")
+
+
+@lru_cache(maxsize=4)
+def _salary_table(root: str):
+    """Cleaned SalaryTable of the survey CSV."""
+    return _salary_analysis(root).load(os.path.join(root, SALARIES))
+
+
+def salaries(root: str) -> pd.DataFrame:
+    """Cleaned salaries per major with the degree group and the 10th-90th percentile spread."""
+    analysis = _salary_analysis(root)
+    table = _salary_table(root)
+    frame = pd.DataFrame(table.salaries, columns=analysis.SALARY_COLUMNS,
+                         index=pd.Index(table.majors, name=analysis.MAJOR))
+    frame[analysis.GROUP] = [table.group_names[code] for code in table.groups]
+    frame[analysis.SPREAD] = table.salaries[:, 3] - table.salaries[:, 2]
+    return frame
+
+
+def salary_groups(root: str) -> pd.DataFrame:
+    """Number of majors, mean salaries and mean spread per degree group (SalaryReport.groups)."""
+    return _salary_analysis(root).analyze(_salary_table(root)).groups
+
+
+def salary_spread(root: str) -> pd.DataFrame:
+    """Majors ranked by spread, smallest (lowest risk) first (SalaryReport.lowest_risk)."""
+    analysis = _salary_analysis(root)
+    table = _salary_table(root)
+    return analysis.analyze(table, top=len(table)).lowest_risk.set_index(analysis.MAJOR)
+
+
+# Dataset name -> (builder, source files relative to the repository root)
+DATASETS: Dict[str, Tuple[Callable[..., pd.DataFrame], Tuple[str, ...]]] = {
+    "lego.by_year": (lego_by_year, (LEGO_COLORS, LEGO_SETS, LEGO_THEMES)),
+    "lego.theme_counts": (lego_theme_counts, (LEGO_COLORS, LEGO_SETS, LEGO_THEMES)),
+    "languages.posts": (language_posts, (LANGUAGE_POSTS,)),
+    "languages.posts_smoothed": (language_posts_smoothed, (LANGUAGE_POSTS,)),
+    "languages.totals": (language_totals, (LANGUAGE_POSTS,)),
+    "salaries.majors": (salaries, (SALARIES,)),
+    "salaries.groups": (salary_groups, (SALARIES,)),
+    "salaries.spread": (salary_spread, (SALARIES,)),
+}
+
+
+def sources(name: str) -> Tuple[str, ...]:
+    """Source files of a dataset (KeyError for unknown datasets)."""
+    return DATASETS[name][1]
+
+
+@lru_cache(maxsize=32)
+def build(root: str, name: str, params: Tuple[Tuple[str, str], ...] = ()) -> pd.DataFrame:
+    """
+    Builds a dataset, memoized per process (treat the result as read-only).
+
+    Args:
+        root (str): Repository root.
+        name (str): Dataset name, e.g. "lego.by_year".
+        params (Tuple): Extra builder arguments as sorted (name, value) pairs.
+
+    Returns:
+        pd.DataFrame: The chart data.
+    """
+    builder, _ = DATASETS[name]
+    return builder(root, **dict(params))
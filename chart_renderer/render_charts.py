@@ -0,0 +1,353 @@
+"""
+render_charts.py
+----------------
+Headless batch renderer for the charts of the analysis notebooks:
+1. Charts are declared in charts.json (dataset, kind, columns, labels, size, output formats)
+   instead of inline pyplot cells; datasets.py builds the data behind each one.
+2. Every chart gets an input hash (its spec plus the bytes of its source CSVs). Charts whose
+   hash matches the manifest of the last run and whose files exist are skipped.
+3. The remaining charts are rendered with the Agg backend across a process pool; charts built
+   from the same source files are submitted as one task, so their data is loaded once.
+   Multi-series line charts draw all columns with one plot call on the values matrix instead
+   of one call per column.
+4. PNG/SVG files go to the output folder (or a spec's own path) and a timing report is printed
+   and written to render_report.json.
+
+Usage:
+    python render_charts.py [--root ..] [--output charts] [--workers 4] [--force] [--only NAME ...]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.figure import Figure  # noqa: E402
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import datasets  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SPEC_PATH = os.path.join(HERE, "charts.json")
+MANIFEST_NAME = ".chart_manifest.json"
+REPORT_NAME = "render_report.json"
+# Bump when the drawing code changes so every chart is re-rendered once
+RENDERER_VERSION = 1
+
+KINDS = ("line", "dual_line", "scatter", "bar")
+
+
+def load_specs(path: str = SPEC_PATH) -> List[Dict]:
+    """
+    Reads the chart specs and applies the defaults block to each.
+
+    Args:
+        path (str): charts.json.
+
+    Returns:
+        List[Dict]: One dict per chart, in file order.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        document = json.load(file)
+    defaults = document.get("defaults", {})
+    specs = [{**defaults, **chart} for chart in document["charts"]]
+
+    names = set()
+    for spec in specs:
+        if spec["name"] in names:
+            raise ValueError(f"duplicate chart name {spec['name']!r}")
+        if spec["kind"] not in KINDS:
+            raise ValueError(f"{spec['name']}: unknown kind {spec['kind']!r} (expected one of {KINDS})")
+        datasets.sources(spec["dataset"])
+        names.add(spec["name"])
+    return specs
+
+
+def output_paths(spec: Dict, root: str, output_dir: str) -> List[str]:
+    """Files a chart writes: one per format, under output_dir or next to the spec's own path."""
+    if "path" in spec:
+        stem = os.path.splitext(os.path.join(root, spec["path"]))[0]
+    else:
+        stem = os.path.join(output_dir, spec["name"])
+    return [f"{stem}.{fmt}" for fmt in spec["formats"]]
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def input_hash(spec: Dict, root: str, digests: Dict[str, str]) -> str:
+    """
+    Hash of everything a chart depends on: the renderer version, the spec and its source files.
+
+    Args:
+        spec (Dict): Chart spec.
+        root (str): Repository root.
+        digests (Dict[str, str]): Source file digests computed so far (filled in as needed).
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"version": RENDERER_VERSION, "spec": spec}, sort_keys=True).encode())
+    for source in datasets.sources(spec["dataset"]):
+        if source not in digests:
+            digests[source] = file_digest(os.path.join(root, source))
+        digest.update(source.encode())
+        digest.update(digests[source].encode())
+    return digest.hexdigest()
+
+
+def read_json(path: str) -> Dict:
+    """Reads a JSON file, {} when it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_json(path: str, data: Dict) -> None:
+    """Writes JSON through a temporary file so an interrupted run never leaves a truncated file."""
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        json.dump(data, file, indent=2)
+    os.replace(temporary, path)
+
+
+# -------------------- DRAWING --------------------
+
+def chart_data(spec: Dict, root: str) -> pd.DataFrame:
+    """The rows and columns a chart plots: the dataset, trimmed by head/drop_last."""
+    params = tuple(sorted(spec.get("params", {}).items()))
+    frame = datasets.build(root, spec["dataset"], params)
+    if spec.get("drop_last"):
+        frame = frame.iloc[:-spec["drop_last"]]
+    if spec.get("head"):
+        frame = frame.iloc[:spec["head"]]
+    columns = list(frame.columns) if spec["y"] == "*" else spec["y"]
+    missing = [column for column in columns if column not in frame.columns]
+    if missing:
+        raise KeyError(f"{spec['name']}: columns {missing} not in dataset {spec['dataset']!r}")
+    return frame[columns]
+
+
+def draw(spec: Dict, frame: pd.DataFrame, x: Optional[np.ndarray] = None) -> Figure:
+    """
+    Draws one chart on a new Figure (no pyplot state, so workers never leak figures).
+
+    Args:
+        spec (Dict): Chart spec.
+        frame (pd.DataFrame): Columns to plot, one series per column.
+        x (np.ndarray, optional): x values for scatter charts with an "x" column.
+
+    Returns:
+        Figure: The drawn figure.
+    """
+    figure = Figure(figsize=tuple(spec["figsize"]))
+    ax = figure.add_subplot()
+    kind = spec["kind"]
+    labels = spec.get("labels", [str(column) for column in frame.columns])
+    colors = spec.get("colors")
+    index = frame.index if x is None else x
+    ylabel = spec.get("ylabel", "")
+
+    if kind == "line":
+        # One call draws every column of the values matrix (one Line2D per column)
+        lines = ax.plot(index, frame.to_numpy(dtype=float), marker=spec.get("marker"),
+                        linewidth=spec.get("linewidth", 1.5), label=labels)
+        for line, color in zip(lines, colors or []):
+            line.set_color(color)
+    elif kind == "dual_line":
+        left, right = frame.columns[:2]
+        twin = ax.twinx()
+        colors = colors or ["C0", "C1"]
+        ax.plot(index, frame[left].to_numpy(), color=colors[0], label=labels[0])
+        twin.plot(index, frame[right].to_numpy(), color=colors[1], label=labels[1])
+        ax.set_ylabel(ylabel[0], color=colors[0])
+        twin.set_ylabel(ylabel[1], color=colors[1])
+        ax.legend(ax.get_lines() + twin.get_lines(), labels[:2], loc="upper left")
+        ylabel = None
+    elif kind == "scatter":
+        for position, column in enumerate(frame.columns):
+            ax.scatter(index, frame[column].to_numpy(), label=labels[position],
+                       color=colors[position] if colors else None)
+    elif kind == "bar":
+        positions = np.arange(len(frame))
+        width = 0.8 / len(frame.columns)
+        for offset, column in enumerate(frame.columns):
+            shift = (offset - (len(frame.columns) - 1) / 2) * width
+            color = colors if colors and len(frame.columns) == 1 else (colors[offset] if colors else None)
+            values = frame[column].to_numpy()
+            ax.bar(positions + shift, values, width=width, color=color, label=labels[offset])
+            if spec.get("annotate"):
+                lift = 0.01 * np.nanmax(values)
+                for position, value in zip(positions + shift, values):
+                    ax.text(position, value + lift, f"{value:,.0f}", ha="center", fontsize=12)
+        rotation = spec.get("rotation", 0)
+        ax.set_xticks(positions, [str(label) for label in frame.index], rotation=rotation,
+                      ha="right" if rotation else "center")
+
+    fontsize = spec.get("fontsize")
+    if ylabel is not None:
+        ax.set_ylabel(ylabel, fontsize=fontsize)
+    ax.set_xlabel(spec.get("xlabel", ""), fontsize=fontsize)
+    ax.set_title(spec.get("title", spec["name"]), fontsize=fontsize + 2 if fontsize else None)
+    if fontsize:
+        ax.tick_params(labelsize=fontsize)
+    if "ylim" in spec:
+        ax.set_ylim(*spec["ylim"])
+    if "grid" in spec:
+        ax.grid(alpha=spec["grid"])
+    if spec.get("legend"):
+        ax.legend(fontsize=12)
+    figure.tight_layout()
+    return figure
+
+
+def render_chart(spec: Dict, root: str, output_dir: str) -> Dict:
+    """
+    Builds the data of one chart, draws it and saves every format (runs in a worker process).
+
+    Returns:
+        Dict: name, outputs and the seconds spent on data, drawing and saving.
+    """
+    start = time.perf_counter()
+    frame = chart_data(spec, root)
+    x = None
+    if "x" in spec:
+        x = chart_data({**spec, "y": [spec["x"]]}, root)[spec["x"]].to_numpy()
+    built = time.perf_counter()
+
+    figure = draw(spec, frame, x)
+    drawn = time.perf_counter()
+
+    outputs = output_paths(spec, root, output_dir)
+    for path in outputs:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        figure.savefig(path, dpi=spec["dpi"])
+    saved = time.perf_counter()
+    return {
+        "name": spec["name"],
+        "outputs": outputs,
+        "data_s": built - start,
+        "draw_s": drawn - built,
+        "save_s": saved - drawn,
+    }
+
+
+def render_group(specs: List[Dict], root: str, output_dir: str) -> List[Dict]:
+    """Renders charts that share source files in one worker, so their data is loaded once."""
+    return [render_chart(spec, root, output_dir) for spec in specs]
+
+
+# -------------------- PIPELINE --------------------
+
+def render_all(
+    specs: List[Dict],
+    root: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    force: bool = False
+) -> Dict:
+    """
+    Renders every chart whose inputs changed since the last run, in parallel.
+
+    Args:
+        specs (List[Dict]): Chart specs (see load_specs).
+        root (str): Repository root the dataset paths are relative to.
+        output_dir (str): Folder for the charts, the manifest and the report.
+        workers (int, optional): Worker processes (defaults to the number of CPUs).
+        force (bool): Render every chart even when its inputs are unchanged.
+
+    Returns:
+        Dict: The timing report (also written to render_report.json).
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    manifest = read_json(manifest_path)
+
+    digests: Dict[str, str] = {}
+    hashes = {spec["name"]: input_hash(spec, root, digests) for spec in specs}
+    pending, skipped = [], []
+    for spec in specs:
+        entry = manifest.get(spec["name"], {})
+        current = entry.get("hash") == hashes[spec["name"]] and all(
+            os.path.exists(path) for path in output_paths(spec, root, output_dir))
+        (skipped if current and not force else pending).append(spec)
+    hashing = time.perf_counter() - start
+
+    # One task per set of source files: its charts share the worker's loaded data
+    groups: Dict[Tuple[str, ...], List[Dict]] = {}
+    for spec in pending:
+        groups.setdefault(datasets.sources(spec["dataset"]), []).append(spec)
+    if len(groups) <= 1 or workers == 1:
+        grouped = [render_group(group, root, output_dir) for group in groups.values()]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            grouped = list(executor.map(render_group, groups.values(), [root] * len(groups),
+                                        [output_dir] * len(groups)))
+    pending = [spec for group in groups.values() for spec in group]
+    results = [result for group in grouped for result in group]
+
+    for spec, result in zip(pending, results):
+        manifest[spec["name"]] = {"hash": hashes[spec["name"]], "outputs": result["outputs"]}
+    write_json(manifest_path, manifest)
+
+    report = {
+        "rendered": results,
+        "skipped": [spec["name"] for spec in skipped],
+        "hash_s": hashing,
+        "total_s": time.perf_counter() - start,
+    }
+    write_json(os.path.join(output_dir, REPORT_NAME), report)
+    return report
+
+
+def print_report(report: Dict) -> None:
+    """Prints the per-chart timings and the totals of a run."""
+    print(f"{'chart':<28} {'data':>9} {'draw':>9} {'save':>9}")
+    for result in report["rendered"]:
+        print(f"{result['name']:<28} {result['data_s'] * 1000:>6.1f} ms {result['draw_s'] * 1000:>6.1f} ms "
+              f"{result['save_s'] * 1000:>6.1f} ms")
+    for name in report["skipped"]:
+        print(f"{name:<28} {'skipped (inputs unchanged)':>29}")
+    print(f"{len(report['rendered'])} rendered, {len(report['skipped'])} skipped "
+          f"(hashing {report['hash_s'] * 1000:.1f} ms) in {report['total_s']:.2f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Render the notebook charts headlessly.")
+    parser.add_argument("--root", default=os.path.dirname(HERE), help="Repository root")
+    parser.add_argument("--specs", default=SPEC_PATH, help="Chart spec file")
+    parser.add_argument("--output", default=os.path.join(HERE, "charts"), help="Folder for the charts")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--force", action="store_true", help="Re-render unchanged charts")
+    parser.add_argument("--only", nargs="+", default=None, help="Render only these charts")
+    args = parser.parse_args()
+
+    specs = load_specs(args.specs)
+    if args.only:
+        unknown = set(args.only) - {spec["name"] for spec in specs}
+        if unknown:
+            parser.error(f"unknown charts: {', '.join(sorted(unknown))}")
+        specs = [spec for spec in specs if spec["name"] in args.only]
+    print_report(render_all(specs, os.path.abspath(args.root), args.output, args.workers, args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+alert_store.py
+----------------
+Persistent alert state (SQLite) shared across runs:
+1. Which deals were already notified, keyed on (route, dates, price bucket), with TTL expiry.
+2. The last notified price per route, so only real price drops trigger a new alert.
+3. Hashes of sent message bodies, to skip duplicate SMS/WhatsApp sends.
+
+A small in-memory LRU in front of the database keeps repeated checks cheap while
+bounding memory use in long-running processes.
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from flight_data import FlightData
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 days
+DEFAULT_PRICE_BUCKET = 10.0  # GBP
+DEFAULT_MAX_MEMORY_ENTRIES = 1024
+
+
+class AlertStateStore:
+    """
+    SQLite-backed store of alert state with TTL expiry and a bounded in-memory cache.
+    """
+
+    def __init__(
+        self,
+        path: str = "alert_state.sqlite3",
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        price_bucket: float = DEFAULT_PRICE_BUCKET,
+        max_memory_entries: int = DEFAULT_MAX_MEMORY_ENTRIES
+    ) -> None:
+        """
+        Args:
+            path (str): Location of the SQLite database file (":memory:" for a throwaway store).
+            ttl_seconds (float): How long a sent alert (and the route's last price) is remembered.
+            price_bucket (float): Prices within the same bucket count as the same deal.
+            max_memory_entries (int): Size of the in-memory LRU of recently seen keys.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.price_bucket = price_bucket
+        self.max_memory_entries = max_memory_entries
+
+        # key -> expiry time of keys known to be in the database
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS sent_alerts ("
+                " key TEXT PRIMARY KEY,"
+                " expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS route_prices ("
+                " route TEXT PRIMARY KEY,"
+                " price REAL NOT NULL,"
+                " notified_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    # -------------------- KEYS --------------------
+
+    @staticmethod
+    def route(flight: FlightData) -> str:
+        """Returns the route label of a flight, e.g. "LHR-CDG"."""
+        return f"{flight.origin_airport}-{flight.destination_airport}"
+
+    def alert_key(self, flight: FlightData) -> str:
+        """
+        Returns the dedup key of a deal: route, travel dates and price bucket.
+        """
+        bucket = math.floor(float(flight.price) / self.price_bucket)
+        return f"deal:{self.route(flight)}:{flight.out_date}:{flight.return_date}:{bucket}"
+
+    @staticmethod
+    def message_key(message_body: str) -> str:
+        """Returns the dedup key of a message body."""
+        return "message:" + hashlib.sha256(message_body.encode("utf-8")).hexdigest()
+
+    # -------------------- SENT KEYS --------------------
+
+    def _remember(self, key: str, expires_at: float) -> None:
+        # Caller holds the lock
+        self._recent[key] = expires_at
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_memory_entries:
+            self._recent.popitem(last=False)
+
+    def was_sent(self, key: str) -> bool:
+        """
+        Checks whether a key was marked as sent and has not expired.
+        Served from memory when possible, without touching the database.
+        """
+        now = time.time()
+        with self._lock:
+            expires_at = self._recent.get(key)
+            if expires_at is None:
+                row = self._connection.execute(
+                    "SELECT expires_at FROM sent_alerts WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return False
+                expires_at = row[0]
+                self._remember(key, expires_at)
+            return expires_at > now
+
+    def mark_sent(self, key: str) -> None:
+        """Marks a key as sent until the TTL expires."""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO sent_alerts (key, expires_at) VALUES (?, ?)", (key, expires_at)
+            )
+            self._remember(key, expires_at)
+
+    # -------------------- PRICE HISTORY --------------------
+
+    def last_notified_price(self, route: str) -> Optional[float]:
+        """
+        Returns the last price an alert was sent for on a route, or None if unknown or expired.
+
+        Args:
+            route (str): Route label as returned by route().
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT price FROM route_prices WHERE route = ? AND expires_at > ?", (route, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def should_notify(self, flight: FlightData) -> bool:
+        """
+        Decides whether a deal is worth a notification: it must not have been sent already
+        and must be cheaper than the last price notified for the same route.
+
+        Args:
+            flight (FlightData): Cheapest flight found.
+
+        Returns:
+            bool: True if an alert should be sent.
+        """
+        if flight.price == "N/A":
+            return False
+        if self.was_sent(self.alert_key(flight)):
+            return False
+        last_price = self.last_notified_price(self.route(flight))
+        return last_price is None or float(flight.price) < last_price
+
+    def record_alert(self, flight: FlightData) -> None:
+        """
+        Records that an alert was sent for a deal and remembers its price for the route.
+
+        Args:
+            flight (FlightData): Flight the alert was sent for.
+        """
+        self.mark_sent(self.alert_key(flight))
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO route_prices (route, price, notified_at, expires_at) VALUES (?, ?, ?, ?)",
+                (self.route(flight), float(flight.price), now, now + self.ttl_seconds)
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Deletes expired alert state.
+
+        Returns:
+            int: Number of rows removed.
+        """
+        now = time.time()
+        with self._lock, self._connection:
+            removed = self._connection.execute("DELETE FROM sent_alerts WHERE expires_at <= ?", (now,)).rowcount
+            removed += self._connection.execute("DELETE FROM route_prices WHERE expires_at <= ?", (now,)).rowcount
+            for key in [key for key, expires_at in self._recent.items() if expires_at <= now]:
+                del self._recent[key]
+        return removed
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._connection.close()
@@ -0,0 +1,144 @@
+"""
+benchmark_offers.py
+--------------------
+Micro-benchmark of the single-pass top-k offer extractor (and its ijson streaming
+mode) against the previous dict-walking find_cheapest_flight, on synthetic
+Amadeus responses. Reports time per response and peak memory per response.
+
+Usage:
+    python benchmark_offers.py [--offers 250] [--destinations 200] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+from flight_data import FlightData, top_offers, find_cheapest_flight
+
+
+def legacy_find_cheapest_flight(data: Dict[str, Any]) -> FlightData:
+    """
+    The original implementation (parse everything, rebuild FlightData on every improvement),
+    kept here as the benchmark baseline with its prints removed.
+    """
+    if not data or not data.get('data'):
+        return FlightData("N/A", "N/A", "N/A", "N/A", "N/A", "N/A")
+
+    first_flight = data['data'][0]
+    lowest_price = float(first_flight["price"]["grandTotal"])
+    nr_stops = len(first_flight["itineraries"][0]["segments"]) - 1
+    origin = first_flight["itineraries"][0]["segments"][0]["departure"]["iataCode"]
+    destination = first_flight["itineraries"][0]["segments"][nr_stops]["arrival"]["iataCode"]
+    out_date = first_flight["itineraries"][0]["segments"][0]["departure"]["at"].split("T")[0]
+    return_date = first_flight["itineraries"][1]["segments"][0]["departure"]["at"].split("T")[0]
+    cheapest_flight = FlightData(lowest_price, origin, destination, out_date, return_date, nr_stops)
+
+    for flight in data["data"]:
+        price = float(flight["price"]["grandTotal"])
+        if price < lowest_price:
+            lowest_price = price
+            nr_stops = len(flight["itineraries"][0]["segments"]) - 1
+            origin = flight["itineraries"][0]["segments"][0]["departure"]["iataCode"]
+            destination = flight["itineraries"][0]["segments"][nr_stops]["arrival"]["iataCode"]
+            out_date = flight["itineraries"][0]["segments"][0]["departure"]["at"].split("T")[0]
+            return_date = flight["itineraries"][1]["segments"][0]["departure"]["at"].split("T")[0]
+            cheapest_flight = FlightData(lowest_price, origin, destination, out_date, return_date, nr_stops)
+
+    return cheapest_flight
+
+
+def make_response(nr_offers: int, rng: random.Random) -> bytes:
+    """
+    Builds a synthetic flight-offers response body shaped like the Amadeus API output.
+    """
+    def segment(origin: str, destination: str, day: int) -> Dict[str, Any]:
+        return {
+            "departure": {"iataCode": origin, "at": f"2026-03-{day:02d}T08:15:00"},
+            "arrival": {"iataCode": destination, "at": f"2026-03-{day:02d}T13:40:00"},
+            "carrierCode": "BA",
+            "number": str(rng.randint(100, 999)),
+            "aircraft": {"code": "320"},
+            "duration": "PT5H25M",
+        }
+
+    offers = []
+    for offer_id in range(nr_offers):
+        stops = rng.choice([0, 0, 1, 1, 2])
+        hubs = ["LHR"] + ["FRA", "AMS"][:stops] + ["JFK"]
+        outbound = [segment(hubs[i], hubs[i + 1], 10) for i in range(len(hubs) - 1)]
+        inbound = [segment(hubs[i + 1], hubs[i], 20) for i in reversed(range(len(hubs) - 1))]
+        offers.append({
+            "type": "flight-offer",
+            "id": str(offer_id),
+            "itineraries": [
+                {"duration": f"PT{6 + 3 * stops}H{rng.randint(0, 59)}M", "segments": outbound},
+                {"duration": f"PT{6 + 3 * stops}H{rng.randint(0, 59)}M", "segments": inbound},
+            ],
+            "price": {"currency": "GBP", "total": "0", "grandTotal": f"{rng.uniform(150, 1500):.2f}"},
+            "travelerPricings": [{"travelerId": "1", "fareOption": "STANDARD"}],
+        })
+    return json.dumps({"meta": {"count": nr_offers}, "data": offers}).encode("utf-8")
+
+
+def time_it(label: str, function: Callable[[], Any], repeat: int, nr_responses: int) -> float:
+    """Runs `function` `repeat` times and prints the best time per response."""
+    best = min(_timed(function) for _ in range(repeat))
+    print(f"{label:<45} {best / nr_responses * 1000:8.3f} ms/response")
+    return best
+
+
+def _timed(function: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def peak_memory(function: Callable[[], Any]) -> int:
+    """Returns the peak number of bytes allocated while running `function`."""
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--offers", type=int, default=250, help="offers per response")
+    parser.add_argument("--destinations", type=int, default=200, help="number of responses")
+    parser.add_argument("--repeat", type=int, default=5, help="best-of repetitions")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    responses: List[bytes] = [make_response(args.offers, rng) for _ in range(args.destinations)]
+    print(f"{args.destinations} responses x {args.offers} offers "
+          f"({sum(map(len, responses)) / len(responses) / 1024:.0f} KiB each)\n")
+
+    # Results must agree before timings mean anything
+    for body in responses:
+        assert legacy_find_cheapest_flight(json.loads(body)) == find_cheapest_flight(body)
+
+    baseline = time_it("legacy: json.loads + find_cheapest_flight",
+                       lambda: [legacy_find_cheapest_flight(json.loads(body)) for body in responses],
+                       args.repeat, len(responses))
+    single_pass = time_it("top_offers(body, k=1)",
+                          lambda: [top_offers(body, k=1) for body in responses],
+                          args.repeat, len(responses))
+    time_it("top_offers(body, k=5, rank_by='duration')",
+            lambda: [top_offers(body, k=5, rank_by="duration") for body in responses],
+            args.repeat, len(responses))
+    time_it("top_offers(body, k=1, stream=True) [ijson]",
+            lambda: [top_offers(body, k=1, stream=True) for body in responses],
+            args.repeat, len(responses))
+    peak_legacy = peak_memory(lambda: legacy_find_cheapest_flight(json.loads(responses[0])))
+    peak_stream = peak_memory(lambda: top_offers(responses[0], k=1, stream=True))
+    print(f"\nPeak memory per response: legacy {peak_legacy / 1024:.0f} KiB, "
+          f"streaming {peak_stream / 1024:.0f} KiB")
+    print(f"Speed-up of top_offers over legacy: {baseline / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+benchmark_pipeline.py
+----------------------
+End-to-end benchmark of the Flight Deal Finder pipeline against the local stub server,
+so performance changes can be measured without Amadeus, Sheety or Twilio credentials.
+
+Runs sheet read, IATA lookup, sheet write, flight search, offer parsing and notification
+for every destination and reports destinations/sec, API calls per destination and
+p50/p99 latency per stage.
+
+Usage:
+    python benchmark_pipeline.py [--destinations 100] [--mode sync|single|async]
+                                 [--latency-ms 50] [--jitter-ms 20] [--error-rate 0]
+                                 [--rate-limit 0] [--fixtures recorded.json]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Dict
+
+from http_client import LatencyRecorder
+from replay import FixtureStore, ReplayTwilioClient, synthetic_fixtures
+from stub_server import StubServer
+
+SHEETY_PATH = "/sheety/flightDeals"
+ORIGIN_CITY_IATA = "LON"
+
+
+def configure_environment(base_url: str) -> None:
+    """
+    Points every API client at the stub server. Must run before the pipeline modules are
+    imported, because the Amadeus endpoints are resolved at import time.
+    """
+    os.environ.update({
+        "AMADEUS_BASE_URL": base_url,
+        "AMADEUS_API_KEY": "replay",
+        "AMADEUS_SECRET": "replay",
+        "SHEETY_USERNAME": "replay",
+        "SHEETY_PASSWORD": "replay",
+        "SHEETY_PRICES_ENDPOINT": f"{base_url}{SHEETY_PATH}/prices",
+        "SHEETY_USERS_ENDPOINT": f"{base_url}{SHEETY_PATH}/users",
+        "EMAIL_PROVIDER_SMTP_ADDRESS": "127.0.0.1",
+        "MY_EMAIL": "benchmark@example.com",
+        "MY_EMAIL_PASSWORD": "replay",
+        "TWILIO_VIRTUAL_NUMBER": "+10000000000",
+        "TWILIO_VERIFIED_NUMBER": "+10000000001",
+        "TWILIO_WHATSAPP_NUMBER": "+10000000002",
+        "TWILIO_SID": "ACreplay",
+        "TWILIO_AUTH_TOKEN": "replay",
+    })
+
+
+def run_pipeline(mode: str, twilio_latency: float) -> Dict[str, float]:
+    """
+    Runs one full pipeline pass and records stage timings.
+
+    Args:
+        mode (str): "sync" (direct, then indirect fallback), "single" (one non-direct search)
+                    or "async" (AsyncFlightSearch over all destinations).
+        twilio_latency (float): Simulated Twilio round-trip time in seconds.
+
+    Returns:
+        Dict[str, float]: Wall time of the search phase and number of destinations.
+    """
+    # Imported after configure_environment so the modules pick up the stub server URLs
+    from alert_store import AlertStateStore
+    from data_manager import DataManager
+    from flight_data import find_cheapest_flight
+    from flight_search import AsyncFlightSearch, FlightSearch, select_cheapest_flight
+    from http_client import PooledSession, build_async_client
+    from iata_cache import IataCodeCache
+    from metrics import registry
+    from notification_manager import NotificationManager, format_deal_message
+
+    stages = LatencyRecorder()
+    session = PooledSession()
+
+    with stages.timer("token fetch"):
+        flight_search = FlightSearch(iata_cache=IataCodeCache(":memory:"), session=session,
+                                     lookup_requests_per_second=1000)
+    data_manager = DataManager(session=session)
+    notification_manager = NotificationManager(
+        alert_store=AlertStateStore(":memory:"),
+        twilio_client=ReplayTwilioClient(latency=twilio_latency)
+    )
+
+    with stages.timer("sheet read"):
+        sheet_data = data_manager.get_destination_data()
+
+    missing_cities = [row["city"] for row in sheet_data if row["iataCode"] == ""]
+    for city in missing_cities:
+        with stages.timer("iata lookup"):
+            code = flight_search.get_destination_codes([city])[city]
+        for row in sheet_data:
+            if row["city"] == city:
+                row["iataCode"] = code
+
+    with stages.timer("sheet write"):
+        data_manager.update_destination_codes()
+
+    tomorrow = datetime.now() + timedelta(days=1)
+    six_months_from_today = datetime.now() + timedelta(days=6 * 30)
+    codes = [row["iataCode"] for row in sheet_data]
+    cheapest_flights = {}
+
+    search_start = time.perf_counter()
+    if mode == "async":
+        async def search_all() -> None:
+            async_client = build_async_client(latency=session.latency)
+            async with async_client, AsyncFlightSearch(
+                token_manager=flight_search.token_manager, client=async_client, requests_per_second=1000
+            ) as async_search:
+                async def search_one(code: str) -> None:
+                    with stages.timer("flight search"):
+                        body = await async_search.fetch_offers(
+                            ORIGIN_CITY_IATA, code, tomorrow, six_months_from_today, is_direct=False
+                        )
+                    with stages.timer("offer parsing"):
+                        cheapest_flights[code] = select_cheapest_flight(body)
+
+                await asyncio.gather(*(search_one(code) for code in codes))
+
+        asyncio.run(search_all())
+    else:
+        for code in codes:
+            with stages.timer("flight search"):
+                body = flight_search.fetch_offers(
+                    ORIGIN_CITY_IATA, code, tomorrow, six_months_from_today, is_direct=(mode == "sync")
+                )
+            with stages.timer("offer parsing"):
+                cheapest = select_cheapest_flight(body) if mode == "single" else find_cheapest_flight(body)
+            if mode == "sync" and cheapest.price == "N/A":
+                with stages.timer("flight search"):
+                    body = flight_search.fetch_offers(
+                        ORIGIN_CITY_IATA, code, tomorrow, six_months_from_today, is_direct=False
+                    )
+                with stages.timer("offer parsing"):
+                    cheapest = find_cheapest_flight(body)
+            cheapest_flights[code] = cheapest
+    search_seconds = time.perf_counter() - search_start
+
+    for row in sheet_data:
+        flight = cheapest_flights[row["iataCode"]]
+        if flight.price != "N/A" and flight.price < row["lowestPrice"]:
+            notification_manager.queue_deal(format_deal_message(flight), flight)
+    with stages.timer("notification send"):
+        notification_manager.flush_deals([])
+
+    print("\nStage latency (ms):")
+    print(f"{'stage':<20}{'count':>7}{'p50':>10}{'p99':>10}{'total':>11}")
+    for stage, stats in stages.summary().items():
+        print(f"{stage:<20}{stats['count']:>7}{stats['p50'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}"
+              f"{stats['mean'] * stats['count'] * 1000:>11.1f}")
+    print("\nInstrumented stages (per attempt, including retries):")
+    registry.print_summary()
+
+    return {"search_seconds": search_seconds, "destinations": len(codes)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--destinations", type=int, default=100, help="rows in the synthetic sheet")
+    parser.add_argument("--offers", type=int, default=50, help="offers per synthetic response")
+    parser.add_argument("--fixtures", help="replay recorded fixtures instead of synthetic ones")
+    parser.add_argument("--mode", choices=["sync", "single", "async"], default="sync")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="stub server base latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0, help="stub server random extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of HTTP 500 responses")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="stub requests/sec before HTTP 429 (0 = off)")
+    parser.add_argument("--twilio-latency-ms", type=float, default=150.0, help="simulated Twilio round trip")
+    args = parser.parse_args()
+
+    store = (FixtureStore.load(args.fixtures) if args.fixtures
+             else synthetic_fixtures(args.destinations, args.offers, sheety_path=SHEETY_PATH))
+    server = StubServer(store, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                        error_rate=args.error_rate, rate_limit=args.rate_limit or None, seed=1)
+
+    with server:
+        configure_environment(server.base_url)
+        wall_start = time.perf_counter()
+        result = run_pipeline(args.mode, args.twilio_latency_ms / 1000)
+        wall_seconds = time.perf_counter() - wall_start
+
+    destinations = result["destinations"]
+    total_calls = sum(server.request_counts.values())
+    search_calls = server.request_counts["GET /v2/shopping/flight-offers"]
+    print(f"\nMode: {args.mode}, {destinations} destinations, stub latency {args.latency_ms:.0f}"
+          f"±{args.jitter_ms:.0f} ms")
+    print(f"Search throughput: {destinations / result['search_seconds']:.1f} destinations/sec")
+    print(f"End-to-end: {wall_seconds:.2f}s ({destinations / wall_seconds:.1f} destinations/sec)")
+    print(f"API calls per destination: {search_calls / destinations:.2f} flight searches, "
+          f"{total_calls / destinations:.2f} total")
+    print(f"Stub responses by status: {dict(server.status_counts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+"""
+daemon.py
+----------
+Long-running scheduler mode of the Flight Deal Finder.
+
+Instead of one pass per cron invocation, the daemon builds its clients and caches once
+and keeps re-checking destinations from a priority queue:
+1. Destinations priced close to their `lowestPrice` threshold, or whose price moves a lot
+   between checks, are re-checked more often than stable, far-off ones.
+2. A token bucket spreads the daily search budget evenly over the day.
+3. The sheet (destinations and customer emails) is re-read periodically, and deals are sent
+   as a digest after every cycle.
+
+Usage:
+    python daemon.py [--daily-budget 2000] [--base-interval 21600] [--single-search]
+"""
+
+import argparse
+import heapq
+import signal
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Deque, Dict, List, Optional, Tuple
+
+from data_manager import DataManager
+from flight_data import FlightData
+from flight_search import FlightSearch
+from http_client import PooledSession
+from iata_cache import IataCodeCache
+from metrics import registry
+from notification_manager import NotificationManager, format_deal_message
+from offer_cache import FlightOfferCache
+from rate_limiter import TokenBucket
+
+ORIGIN_CITY_IATA = "LON"
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+@dataclass
+class DestinationState:
+    """
+    Scheduling state of one destination.
+
+    Attributes:
+        row (Dict): Destination row from the sheet (city, iataCode, lowestPrice, id).
+        prices (Deque[float]): Recent cheapest prices, newest last.
+        last_checked (float): Time of the last check (epoch seconds), 0 if never checked.
+    """
+    row: Dict
+    prices: Deque[float] = field(default_factory=lambda: deque(maxlen=8))
+    last_checked: float = 0.0
+
+    @property
+    def threshold(self) -> float:
+        return float(self.row["lowestPrice"])
+
+    def volatility(self) -> float:
+        """Relative price volatility (stdev / mean) of the recent checks, 0 if too few."""
+        if len(self.prices) < 2:
+            return 0.0
+        return statistics.pstdev(self.prices) / statistics.fmean(self.prices)
+
+    def threshold_gap(self) -> Optional[float]:
+        """How far above its threshold the last price was, relative to the threshold."""
+        if not self.prices:
+            return None
+        return max(0.0, (self.prices[-1] - self.threshold) / self.threshold)
+
+
+class DealScheduler:
+    """
+    Priority scheduler: computes when each destination is due and pops the due ones in order.
+    """
+
+    def __init__(
+        self,
+        base_interval: float = 6 * 60 * 60,
+        min_interval: float = 30 * 60,
+        max_interval: float = 2 * SECONDS_PER_DAY
+    ) -> None:
+        """
+        Args:
+            base_interval (float): Re-check interval for a destination priced at twice its threshold.
+            min_interval (float): Shortest allowed interval between two checks of one destination.
+            max_interval (float): Longest allowed interval between two checks of one destination.
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.states: Dict[str, DestinationState] = {}
+        self._queue: List[Tuple[float, int, str]] = []
+        self._sequence = 0
+        # Sequence number of each destination's live queue entry; older entries are stale
+        self._live: Dict[str, int] = {}
+
+    def interval(self, state: DestinationState) -> float:
+        """
+        Returns the re-check interval of a destination: short when the price is near the
+        threshold or volatile, long when it is far above the threshold and stable.
+        """
+        gap = state.threshold_gap()
+        if gap is None:
+            return self.min_interval
+        closeness_factor = 0.25 + min(gap, 1.0) * 0.75
+        volatility_factor = 1.0 + 10.0 * state.volatility()
+        interval = self.base_interval * closeness_factor / volatility_factor
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def schedule(self, code: str, due_at: float) -> None:
+        """Queues a destination to be checked at `due_at`, replacing its earlier entry."""
+        self._sequence += 1
+        self._live[code] = self._sequence
+        heapq.heappush(self._queue, (due_at, self._sequence, code))
+
+    def _is_live(self, sequence: int, code: str) -> bool:
+        return code in self.states and self._live.get(code) == sequence
+
+    def _drop_stale(self) -> None:
+        while self._queue and not self._is_live(self._queue[0][1], self._queue[0][2]):
+            heapq.heappop(self._queue)
+
+    def sync_destinations(self, rows: List[Dict], now: float) -> None:
+        """
+        Adds new destinations from the sheet (due immediately), refreshes known ones
+        and drops destinations that were removed from the sheet.
+        """
+        codes = set()
+        for row in rows:
+            code = row["iataCode"]
+            if not code or code in ("N/A", "Not Found"):
+                continue
+            codes.add(code)
+            if code in self.states:
+                self.states[code].row = row
+            else:
+                self.states[code] = DestinationState(row=row)
+                self.schedule(code, now)
+        for code in set(self.states) - codes:
+            del self.states[code]
+            # Its queue entries go stale; a re-added code gets a fresh entry
+            self._live.pop(code, None)
+
+    def pop_due(self, now: float) -> List[str]:
+        """Returns the destinations due at `now`, most overdue first."""
+        due: List[str] = []
+        while self._queue and self._queue[0][0] <= now:
+            _, sequence, code = heapq.heappop(self._queue)
+            if self._is_live(sequence, code):
+                del self._live[code]
+                due.append(code)
+        return due
+
+    def next_due(self) -> Optional[float]:
+        """Returns the time the next destination is due, or None if nothing is scheduled."""
+        self._drop_stale()
+        return self._queue[0][0] if self._queue else None
+
+    def record_price(self, code: str, flight: FlightData, now: float) -> float:
+        """
+        Records the outcome of a check and reschedules the destination.
+
+        Returns:
+            float: Seconds until the destination's next check.
+        """
+        state = self.states[code]
+        if flight.price != "N/A":
+            state.prices.append(float(flight.price))
+        state.last_checked = now
+        interval = self.interval(state)
+        self.schedule(code, now + interval)
+        return interval
+
+
+class DealDaemon:
+    """
+    Keeps warm clients and caches and runs scheduled destination checks until stopped.
+    """
+
+    def __init__(
+        self,
+        daily_search_budget: int = 2000,
+        base_interval: float = 6 * 60 * 60,
+        sheet_refresh_interval: float = 6 * 60 * 60,
+        single_search: bool = False,
+        metrics_path: Optional[str] = None
+    ) -> None:
+        """
+        Args:
+            daily_search_budget (int): Maximum number of flight searches per day.
+            base_interval (float): Base re-check interval (see DealScheduler).
+            sheet_refresh_interval (float): How often destinations and customers are re-read.
+            single_search (bool): Use one non-direct search per check instead of direct + indirect.
+            metrics_path (str, optional): File the metrics are exported to after every cycle
+                                          (see MetricsRegistry.export).
+        """
+        self.http_session = PooledSession()
+        self.data_manager = DataManager(session=self.http_session)
+        self.offer_cache = FlightOfferCache(directory=".offer_cache")
+        # Spread the daily budget evenly; allow a small burst at start-up.
+        # Only searches that reach the API take a token, offer-cache hits are free.
+        self.budget = TokenBucket(daily_search_budget / SECONDS_PER_DAY, capacity=10)
+        self.flight_search = FlightSearch(
+            iata_cache=IataCodeCache(), session=self.http_session, offer_cache=self.offer_cache,
+            search_budget=self.budget
+        )
+        self.notification_manager = NotificationManager()
+
+        self.single_search = single_search
+        self.metrics_path = metrics_path
+        self.scheduler = DealScheduler(base_interval=base_interval)
+        self.sheet_refresh_interval = sheet_refresh_interval
+        self.customer_email_list: List[str] = []
+        self._last_sheet_refresh = 0.0
+        self._running = False
+        self._stop_requested = False
+
+    def refresh_sheet(self) -> None:
+        """Re-reads destinations and customers, resolving and writing back missing IATA codes."""
+        sheet_data = self.data_manager.get_destination_data()
+        missing_cities = [row["city"] for row in sheet_data if row["iataCode"] == ""]
+        if missing_cities:
+            resolved_codes = self.flight_search.get_destination_codes(missing_cities)
+            for row in sheet_data:
+                if row["iataCode"] == "":
+                    row["iataCode"] = resolved_codes[row["city"]]
+            self.data_manager.update_destination_codes()
+
+        customer_data = self.data_manager.get_customer_emails()
+        self.customer_email_list = [row["whatIsYourEmail?"] for row in customer_data]
+
+        # Keep the on-disk offer cache within its age and size limits (runs at start-up too)
+        self.offer_cache.purge_expired()
+
+        self._last_sheet_refresh = time.time()
+        self.scheduler.sync_destinations(sheet_data, self._last_sheet_refresh)
+        print(f"Sheet refreshed: {len(self.scheduler.states)} destinations, "
+              f"{len(self.customer_email_list)} customers.")
+
+    def check_destination(self, code: str) -> None:
+        """Searches one destination and queues a deal if it beats the threshold."""
+        state = self.scheduler.states[code]
+        tomorrow = datetime.now() + timedelta(days=1)
+        six_months_from_today = datetime.now() + timedelta(days=6 * 30)
+        cheapest_flight = self.flight_search.find_cheapest_flight(
+            origin_city_code=ORIGIN_CITY_IATA,
+            destination_city_code=code,
+            from_time=tomorrow,
+            to_time=six_months_from_today,
+            single_search=self.single_search
+        )
+
+        interval = self.scheduler.record_price(code, cheapest_flight, time.time())
+        print(f"{state.row['city']}: £{cheapest_flight.price} "
+              f"(threshold £{state.threshold}, next check in {interval / 60:.0f} min)")
+
+        if cheapest_flight.price != "N/A" and cheapest_flight.price < state.threshold:
+            self.notification_manager.queue_deal(format_deal_message(cheapest_flight), cheapest_flight)
+
+    def run_cycle(self) -> int:
+        """
+        Runs every check that is due and sends the resulting deals.
+        A failing sheet refresh or deal flush is logged, counted in `daemon_errors_total`
+        and retried on the next cycle.
+
+        Returns:
+            int: Number of destinations checked.
+        """
+        if time.time() - self._last_sheet_refresh >= self.sheet_refresh_interval:
+            try:
+                self.refresh_sheet()
+            except Exception as error:
+                # Keep the previous destinations and customers; _last_sheet_refresh is unchanged
+                print(f"Sheet refresh failed: {error!r}")
+                registry.increment("daemon_errors_total", stage="sheet_refresh")
+
+        due = self.scheduler.pop_due(time.time())
+        checked = 0
+        for position, code in enumerate(due):
+            if self._stop_requested:
+                # Put the unchecked destinations back, still due
+                for remaining in due[position:]:
+                    self.scheduler.schedule(remaining, time.time())
+                break
+            checked += 1
+            try:
+                self.check_destination(code)
+            except Exception as error:
+                # Keep the daemon alive; retry this destination after the minimum interval
+                print(f"Check failed for {code}: {error!r}")
+                self.scheduler.schedule(code, time.time() + self.scheduler.min_interval)
+
+        self.flush_deals()
+        registry.increment("destinations_checked_total", checked)
+        registry.increment("cycles_total")
+        if self.metrics_path:
+            registry.export(self.metrics_path)
+        return checked
+
+    def flush_deals(self) -> None:
+        """Sends the queued deals; on failure they are queued again for the next attempt."""
+        pending = list(self.notification_manager.pending_deals)
+        try:
+            self.notification_manager.flush_deals(self.customer_email_list)
+        except Exception as error:
+            print(f"Sending deals failed: {error!r}")
+            registry.increment("daemon_errors_total", stage="notification")
+            # Messages already delivered are skipped on retry by the alert store
+            self.notification_manager.pending_deals = pending + self.notification_manager.pending_deals
+
+    def stop(self, *_) -> None:
+        """Asks the daemon to stop after the current check."""
+        print("Stopping deal daemon...")
+        self._stop_requested = True
+        self._running = False
+
+    def run_forever(self, poll_interval: float = 30) -> None:
+        """
+        Runs scheduling cycles until SIGINT/SIGTERM.
+
+        Args:
+            poll_interval (float): Longest sleep between cycles, so sheet refreshes and stop
+                                   requests are noticed promptly.
+        """
+        self._running = True
+        self._stop_requested = False
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+        print("Deal daemon started.")
+
+        try:
+            while self._running:
+                try:
+                    self.run_cycle()
+                except Exception as error:
+                    # Never let one bad cycle end the daemon; the next cycle retries
+                    print(f"Cycle failed: {error!r}")
+                    registry.increment("daemon_errors_total", stage="cycle")
+                next_due = self.scheduler.next_due()
+                sleep_for = poll_interval if next_due is None else min(poll_interval, next_due - time.time())
+                if sleep_for > 0 and self._running:
+                    time.sleep(sleep_for)
+        finally:
+            self.flush_deals()
+            self.notification_manager.close()
+            self.http_session.latency.print_summary()
+            registry.print_summary()
+            print(f"Flight offer cache: {self.offer_cache.hits} hits, {self.offer_cache.misses} misses.")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the Flight Deal Finder as a long-running daemon.")
+    parser.add_argument("--daily-budget", type=int, default=2000, help="maximum flight searches per day")
+    parser.add_argument("--base-interval", type=float, default=6 * 60 * 60,
+                        help="base re-check interval in seconds")
+    parser.add_argument("--sheet-refresh", type=float, default=6 * 60 * 60,
+                        help="seconds between re-reading the Google Sheet")
+    parser.add_argument("--single-search", action="store_true",
+                        help="one non-direct search per check instead of direct + indirect")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="export metrics after every cycle (.prom = Prometheus text, else JSON lines)")
+    args = parser.parse_args()
+
+    DealDaemon(
+        daily_search_budget=args.daily_budget,
+        base_interval=args.base_interval,
+        sheet_refresh_interval=args.sheet_refresh,
+        single_search=args.single_search,
+        metrics_path=args.metrics
+    ).run_forever()
+
+
+if __name__ == "__main__":
+    main()
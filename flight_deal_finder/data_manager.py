@@ -7,22 +7,51 @@ Handles interaction with the Sheety API for retrieving and updating:
 """
 
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional
 import requests
 from requests.auth import HTTPBasicAuth
 from dotenv import load_dotenv
 from tenacity import retry, wait_exponential, stop_after_attempt
 
+from http_client import PooledSession
+from metrics import SHEET_READ, SHEET_WRITE, registry
+
 # Load environment variables from .env file
 load_dotenv()
 
 
+@dataclass
+class SyncReport:
+    """
+    Summary of a destination-code sync to the Google Sheet.
+
+    Attributes:
+        updated (List[str]): Cities whose rows were written successfully.
+        failed (Dict[str, str]): City -> error message for rows that still failed after retries.
+        unchanged (int): Number of rows skipped because their IATA code did not change.
+    """
+    updated: List[str] = field(default_factory=list)
+    failed: Dict[str, str] = field(default_factory=dict)
+    unchanged: int = 0
+
+    def __str__(self) -> str:
+        return (f"Sheet sync: {len(self.updated)} updated, {len(self.failed)} failed, "
+                f"{self.unchanged} unchanged.")
+
+
 class DataManager:
     """
     Manages all operations related to data stored in Google Sheets via Sheety API.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, session: Optional[requests.Session] = None) -> None:
+        """
+        Args:
+            session (requests.Session, optional): Shared keep-alive session (a PooledSession by default).
+        """
+        self.session: requests.Session = session or PooledSession()
         self._user: str = os.environ["SHEETY_USERNAME"]
         self._password: str = os.environ["SHEETY_PASSWORD"]
 
@@ -37,7 +66,12 @@ class DataManager:
         self.destination_data: List[Dict] = []
         self.customer_data: List[Dict] = []
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
+        # IATA code of each row as last read from / written to the sheet (row id -> code)
+        self._synced_codes: Dict[int, str] = {}
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(SHEET_READ))
+    @registry.timed(SHEET_READ)
     def get_destination_data(self) -> List[Dict]:
         """
         Fetches destination data from the Sheety API.
@@ -45,29 +79,79 @@ class DataManager:
         Returns:
             List[Dict]: List of destination dictionaries with city, IATA code, and lowest price.
         """
-        response = requests.get(url=self.prices_endpoint, auth=self._authorization)
+        response = self.session.get(url=self.prices_endpoint, auth=self._authorization)
         response.raise_for_status()  # Raises HTTPError for bad responses
         data = response.json()
         self.destination_data = data.get("prices", [])
+        self._synced_codes = {row["id"]: row["iataCode"] for row in self.destination_data}
         return self.destination_data
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
-    def update_destination_codes(self) -> None:
+    def dirty_rows(self) -> List[Dict]:
+        """
+        Returns the destination rows whose IATA code differs from what is stored in the sheet.
+
+        Returns:
+            List[Dict]: Rows that need to be written back.
+        """
+        return [
+            row for row in self.destination_data
+            if self._synced_codes.get(row["id"]) != row["iataCode"]
+        ]
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3), reraise=True,
+           before_sleep=registry.count_retry(SHEET_WRITE))
+    @registry.timed(SHEET_WRITE)
+    def _update_row(self, row: Dict) -> None:
         """
-        Updates the IATA codes for each destination in the Google Sheet via Sheety API.
-        Loops through the stored destination_data and performs PUT requests.
+        Writes the IATA code of a single destination row (retried on its own).
+
+        Args:
+            row (Dict): Destination row with "id" and "iataCode".
         """
-        for city in self.destination_data:
-            new_data = {"price": {"iataCode": city["iataCode"]}}
-            response = requests.put(
-                url=f"{self.prices_endpoint}/{city['id']}",
-                json=new_data,
-                auth=self._authorization
-            )
-            response.raise_for_status()
-            print(f"Updated {city['city']} with IATA code {city['iataCode']}")
-
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
+        new_data = {"price": {"iataCode": row["iataCode"]}}
+        response = self.session.put(
+            url=f"{self.prices_endpoint}/{row['id']}",
+            json=new_data,
+            auth=self._authorization
+        )
+        response.raise_for_status()
+
+    def update_destination_codes(self, max_workers: int = 4) -> SyncReport:
+        """
+        Updates the IATA codes in the Google Sheet via Sheety API.
+        Only rows whose code changed since they were read are written, in parallel,
+        and each row is retried independently so one failure does not resend the others.
+
+        Args:
+            max_workers (int): Maximum number of concurrent PUT requests.
+
+        Returns:
+            SyncReport: Which rows were updated, which failed, and how many were unchanged.
+        """
+        dirty = self.dirty_rows()
+        report = SyncReport(unchanged=len(self.destination_data) - len(dirty))
+
+        if dirty:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(self._update_row, row): row for row in dirty}
+                for future in as_completed(futures):
+                    row = futures[future]
+                    try:
+                        future.result()
+                    except Exception as error:
+                        report.failed[row["city"]] = str(error)
+                        print(f"Failed to update {row['city']}: {error}")
+                    else:
+                        self._synced_codes[row["id"]] = row["iataCode"]
+                        report.updated.append(row["city"])
+                        print(f"Updated {row['city']} with IATA code {row['iataCode']}")
+
+        print(report)
+        return report
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(SHEET_READ))
+    @registry.timed(SHEET_READ)
     def get_customer_emails(self) -> List[Dict]:
         """
         Fetches customer emails from Sheety API.
@@ -75,7 +159,7 @@ class DataManager:
         Returns:
             List[Dict]: List of customer dictionaries including email addresses.
         """
-        response = requests.get(url=self.users_endpoint, auth=self._authorization)
+        response = self.session.get(url=self.users_endpoint, auth=self._authorization)
         response.raise_for_status()
         data = response.json()
         self.customer_data = data.get("users", [])
@@ -0,0 +1,234 @@
+"""
+fare_calendar.py
+----------------
+Fare-calendar mode: scans a grid of departure dates x trip lengths per destination
+instead of a single fixed window.
+
+The scan is adaptive: it first samples departure dates coarsely, then repeatedly
+probes the dates around the cheapest cells at half the previous step, so most API
+calls are spent where fares are low. All destinations share one global request budget.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from flight_data import FlightData, find_cheapest_flight
+from flight_search import FlightSearch
+
+DEFAULT_TRIP_LENGTHS = (3, 7, 14)
+
+
+class RequestBudget:
+    """
+    Thread-safe global budget of API requests shared by all calendar scans.
+    """
+
+    def __init__(self, total: int) -> None:
+        """
+        Args:
+            total (int): Maximum number of flight searches allowed.
+        """
+        self.total = total
+        self.spent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def remaining(self) -> int:
+        return self.total - self.spent
+
+    def try_spend(self, amount: int = 1) -> bool:
+        """
+        Reserves `amount` requests if the budget allows it.
+
+        Returns:
+            bool: True if the requests may be made, False if the budget is exhausted.
+        """
+        with self._lock:
+            if self.spent + amount > self.total:
+                return False
+            self.spent += amount
+            return True
+
+
+@dataclass
+class FareCalendar:
+    """
+    Cheapest fares found for one destination, per (departure date, trip length) cell.
+
+    Attributes:
+        destination (str): IATA code of the destination.
+        trip_lengths (List[int]): Trip lengths (nights) that were scanned.
+        fares (Dict[Tuple[date, int], FlightData]): Cheapest flight per probed cell.
+        searches (int): Number of API searches spent on this destination.
+    """
+    destination: str
+    trip_lengths: List[int]
+    fares: Dict[Tuple[date, int], FlightData] = field(default_factory=dict)
+    searches: int = 0
+
+    def price(self, departure: date, trip_length: int) -> Optional[float]:
+        """Returns the cheapest price for a cell, or None if it was not probed or had no flights."""
+        flight = self.fares.get((departure, trip_length))
+        if flight is None or flight.price == "N/A":
+            return None
+        return flight.price
+
+    def cheapest_flight(self) -> FlightData:
+        """
+        Returns the cheapest flight over the whole calendar (all fields "N/A" if none was found).
+        """
+        priced = [flight for flight in self.fares.values() if flight.price != "N/A"]
+        if not priced:
+            return find_cheapest_flight(None)
+        return min(priced, key=lambda flight: flight.price)
+
+    def matrix(self) -> Tuple[List[date], List[List[Optional[float]]]]:
+        """
+        Builds the price matrix: one row per probed departure date, one column per trip length.
+
+        Returns:
+            Tuple[List[date], List[List[Optional[float]]]]: Row dates and the matrix of prices
+                                                            (None where not probed or no flights).
+        """
+        departures = sorted({departure for departure, _ in self.fares})
+        rows = [[self.price(departure, length) for length in self.trip_lengths] for departure in departures]
+        return departures, rows
+
+    def format_matrix(self) -> str:
+        """Renders the price matrix as a text table."""
+        departures, rows = self.matrix()
+        header = "departure   " + "".join(f"{length:>5}n  " for length in self.trip_lengths)
+        lines = [f"Fare calendar for {self.destination} ({self.searches} searches)", header]
+        for departure, row in zip(departures, rows):
+            cells = "".join(f"{price:>7.0f} " if price is not None else "      - " for price in row)
+            lines.append(f"{departure.isoformat()}  {cells}")
+        return "\n".join(lines)
+
+
+class FareCalendarScanner:
+    """
+    Scans departure-date x trip-length grids with FlightSearch under a global request budget.
+    """
+
+    def __init__(
+        self,
+        flight_search: FlightSearch,
+        budget: RequestBudget,
+        origin_city_code: str,
+        trip_lengths: Sequence[int] = DEFAULT_TRIP_LENGTHS,
+        coarse_step_days: int = 16,
+        refine_top: int = 2
+    ) -> None:
+        """
+        Args:
+            flight_search (FlightSearch): Search client (its offer cache is reused if configured).
+            budget (RequestBudget): Global budget shared by all destinations.
+            origin_city_code (str): IATA code of the origin city.
+            trip_lengths (Sequence[int]): Trip lengths in nights to scan.
+            coarse_step_days (int): Spacing of departure dates in the first, coarse pass.
+            refine_top (int): Number of cheapest cells refined around in each pass.
+        """
+        self.flight_search = flight_search
+        self.budget = budget
+        self.origin_city_code = origin_city_code
+        self.trip_lengths = list(trip_lengths)
+        self.coarse_step_days = coarse_step_days
+        self.refine_top = refine_top
+
+    def _probe(self, calendar: FareCalendar, departure: date, trip_length: int, cap: int) -> bool:
+        """
+        Searches one cell unless it was already probed.
+
+        Returns:
+            bool: False if the per-destination cap or the global budget is exhausted.
+        """
+        if (departure, trip_length) in calendar.fares:
+            return True
+        if calendar.searches >= cap or not self.budget.try_spend():
+            return False
+
+        out_time = datetime.combine(departure, datetime.min.time())
+        flights = self.flight_search.fetch_offers(
+            origin_city_code=self.origin_city_code,
+            destination_city_code=calendar.destination,
+            from_time=out_time,
+            to_time=out_time + timedelta(days=trip_length),
+            is_direct=False
+        )
+        calendar.fares[(departure, trip_length)] = find_cheapest_flight(flights)
+        calendar.searches += 1
+        return True
+
+    def scan(
+        self,
+        destination_city_code: str,
+        start: date,
+        horizon_days: int = 180,
+        max_searches: Optional[int] = None
+    ) -> FareCalendar:
+        """
+        Scans the fare calendar for one destination.
+
+        Args:
+            destination_city_code (str): IATA code of the destination.
+            start (date): First departure date to consider.
+            horizon_days (int): Number of days after `start` to consider for departure.
+            max_searches (int, optional): Cap on searches for this destination (default: no cap
+                                          other than the global budget).
+
+        Returns:
+            FareCalendar: Prices for every probed cell.
+        """
+        calendar = FareCalendar(destination=destination_city_code, trip_lengths=self.trip_lengths)
+        cap = max_searches if max_searches is not None else self.budget.total
+        last_departure = start + timedelta(days=horizon_days)
+
+        # Coarse pass: evenly spaced departure dates for every trip length
+        step = self.coarse_step_days
+        departure = start
+        while departure <= last_departure:
+            for trip_length in self.trip_lengths:
+                if not self._probe(calendar, departure, trip_length, cap):
+                    return calendar
+            departure += timedelta(days=step)
+
+        # Refinement passes: halve the step around the cheapest cells found so far
+        while step > 1:
+            step //= 2
+            priced = sorted(
+                (flight.price, cell) for cell, flight in calendar.fares.items() if flight.price != "N/A"
+            )
+            for _, (departure, trip_length) in priced[:self.refine_top]:
+                for neighbour in (departure - timedelta(days=step), departure + timedelta(days=step)):
+                    if start <= neighbour <= last_departure:
+                        if not self._probe(calendar, neighbour, trip_length, cap):
+                            return calendar
+
+        return calendar
+
+    def scan_all(
+        self,
+        destination_codes: Sequence[str],
+        start: date,
+        horizon_days: int = 180
+    ) -> Dict[str, FareCalendar]:
+        """
+        Scans every destination, sharing the remaining budget fairly between them.
+
+        Args:
+            destination_codes (Sequence[str]): IATA codes of the destinations.
+            start (date): First departure date to consider.
+            horizon_days (int): Number of days after `start` to consider for departure.
+
+        Returns:
+            Dict[str, FareCalendar]: Fare calendar per destination code.
+        """
+        unique_codes = list(dict.fromkeys(destination_codes))
+        calendars: Dict[str, FareCalendar] = {}
+        for index, code in enumerate(unique_codes):
+            fair_share = max(1, self.budget.remaining // (len(unique_codes) - index))
+            calendars[code] = self.scan(code, start, horizon_days, max_searches=fair_share)
+            print(calendars[code].format_matrix())
+        return calendars
@@ -1,12 +1,29 @@
 """
 flight_data.py
 ----------------
-Defines FlightData class to store flight details and a helper function to find the cheapest flight
+Defines FlightData class to store flight details and helpers to find the cheapest flights
 from API response data.
+
+Offers are extracted in a single pass that keeps only the running top-k offers as compact
+OfferRecord objects. Large response bodies are parsed incrementally with ijson (when installed)
+so the full document is never held in memory; smaller ones go through the C json parser,
+which is faster than per-event streaming at typical response sizes.
 """
 
+import heapq
+import io
+import json
+import re
 from dataclasses import dataclass
-from typing import Any, Dict
+from itertools import count
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import ijson
+except ImportError:  # Fall back to parsing the whole document with the json module
+    ijson = None
+
+from metrics import OFFER_PARSING, registry
 
 
 @dataclass
@@ -30,19 +47,205 @@ class FlightData:
     stops: int | str
 
 
-def find_cheapest_flight(data: Dict[str, Any]) -> FlightData:
+# Ranking keys: primary criterion first, price as tie-breaker
+RANK_KEYS = ("price", "stops", "duration")
+
+# Bodies larger than this are parsed incrementally instead of with json.loads
+STREAMING_THRESHOLD_BYTES = 4 * 1024 * 1024
+
+_DURATION_PATTERN = re.compile(r"PT(?:(\d+)H)?(?:(\d+)M)?")
+
+
+class OfferRecord:
+    """
+    Compact record of a single flight offer (uses __slots__ to keep many of them cheap).
+
+    Attributes:
+        price (float): Grand total price in the requested currency.
+        origin_airport (str): IATA code of the first departure airport.
+        destination_airport (str): IATA code of the final outbound arrival airport.
+        out_date (str): Departure date (YYYY-MM-DD).
+        return_date (str): Return date (YYYY-MM-DD), or "N/A" for one-way offers.
+        stops (int): Number of stops on the outbound leg.
+        duration_minutes (int): Outbound travel time in minutes (0 if unknown).
+    """
+    __slots__ = ("price", "origin_airport", "destination_airport", "out_date", "return_date",
+                 "stops", "duration_minutes")
+
+    def __init__(
+        self,
+        price: float,
+        origin_airport: str,
+        destination_airport: str,
+        out_date: str,
+        return_date: str,
+        stops: int,
+        duration_minutes: int
+    ) -> None:
+        self.price = price
+        self.origin_airport = origin_airport
+        self.destination_airport = destination_airport
+        self.out_date = out_date
+        self.return_date = return_date
+        self.stops = stops
+        self.duration_minutes = duration_minutes
+
+    def rank_key(self, rank_by: str = "price") -> Tuple[float, ...]:
+        """
+        Returns the sort key for the given ranking ("price", "stops" or "duration").
+        """
+        if rank_by == "price":
+            return (self.price,)
+        if rank_by == "stops":
+            return (self.stops, self.price)
+        if rank_by == "duration":
+            return (self.duration_minutes, self.price)
+        raise ValueError(f"rank_by must be one of {RANK_KEYS}, got {rank_by!r}")
+
+    def to_flight_data(self) -> FlightData:
+        """Converts the record into the FlightData used by the rest of the app."""
+        return FlightData(self.price, self.origin_airport, self.destination_airport,
+                          self.out_date, self.return_date, self.stops)
+
+    def __repr__(self) -> str:
+        return (f"OfferRecord(price={self.price}, {self.origin_airport}->{self.destination_airport}, "
+                f"out={self.out_date}, return={self.return_date}, stops={self.stops}, "
+                f"duration={self.duration_minutes}m)")
+
+
+def _parse_duration(duration: Optional[str]) -> int:
+    """Converts an ISO-8601 duration such as "PT7H30M" into minutes."""
+    match = _DURATION_PATTERN.match(duration or "")
+    if not match:
+        return 0
+    hours, minutes = match.groups()
+    return int(hours or 0) * 60 + int(minutes or 0)
+
+
+def _iter_offers(
+    source: Union[bytes, Dict[str, Any], None],
+    stream: Optional[bool] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the offers in an Amadeus response one at a time.
+    Raw bytes are parsed incrementally with ijson when `stream` is set (by default: when the
+    body exceeds STREAMING_THRESHOLD_BYTES), so the whole document is never materialized;
+    an already parsed dict is simply walked.
+    """
+    if not source:
+        return
+    if stream is None:
+        stream = len(source) > STREAMING_THRESHOLD_BYTES if isinstance(source, bytes) else False
+    if isinstance(source, dict):
+        yield from source.get("data") or []
+    elif stream and ijson is not None:
+        yield from ijson.items(io.BytesIO(source), "data.item", use_float=True)
+    else:
+        yield from json.loads(source).get("data") or []
+
+
+def _to_record(offer: Dict[str, Any]) -> OfferRecord:
+    """Builds an OfferRecord from one offer of the Amadeus response."""
+    itineraries = offer["itineraries"]
+    outbound = itineraries[0]["segments"]
+    return OfferRecord(
+        price=float(offer["price"]["grandTotal"]),
+        origin_airport=outbound[0]["departure"]["iataCode"],
+        destination_airport=outbound[-1]["arrival"]["iataCode"],
+        out_date=outbound[0]["departure"]["at"].split("T")[0],
+        return_date=itineraries[1]["segments"][0]["departure"]["at"].split("T")[0] if len(itineraries) > 1 else "N/A",
+        stops=len(outbound) - 1,
+        duration_minutes=_parse_duration(itineraries[0].get("duration")),
+    )
+
+
+@registry.timed(OFFER_PARSING)
+def top_offers(
+    source: Union[bytes, Dict[str, Any], None],
+    k: int = 1,
+    rank_by: str = "price",
+    max_stops: Optional[int] = None,
+    stream: Optional[bool] = None
+) -> List[OfferRecord]:
+    """
+    Extracts the best `k` offers from an Amadeus flight search response in a single pass.
+
+    Args:
+        source (bytes | dict | None): Raw response body or already parsed JSON.
+        k (int): Number of offers to keep.
+        rank_by (str): "price", "stops" or "duration" (ties broken by price, then response order).
+        max_stops (int, optional): Ignore offers whose outbound leg has more stops than this.
+        stream (bool, optional): Force (True) or disable (False) incremental parsing of raw bytes.
+                                 By default only bodies above STREAMING_THRESHOLD_BYTES are streamed.
+
+    Returns:
+        List[OfferRecord]: Up to `k` offers, best first.
+    """
+    if rank_by not in RANK_KEYS:
+        raise ValueError(f"rank_by must be one of {RANK_KEYS}, got {rank_by!r}")
+
+    # Max-heap (via negated keys) of the best k offers seen so far
+    heap: List[Tuple[Tuple[float, ...], int, OfferRecord]] = []
+    order = count()
+    for offer in _iter_offers(source, stream):
+        stops = len(offer["itineraries"][0]["segments"]) - 1
+        if max_stops is not None and stops > max_stops:
+            continue
+        if len(heap) == k:
+            # Cheap pre-check on price before building a record for offers that cannot enter the top k
+            worst_key = tuple(-value for value in heap[0][0])
+            if rank_by == "price" and float(offer["price"]["grandTotal"]) >= worst_key[0]:
+                continue
+        record = _to_record(offer)
+        entry = (tuple(-value for value in record.rank_key(rank_by)), -next(order), record)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+    return [record for _, _, record in sorted(heap, reverse=True)]
+
+
+def top_offers_by_destination(
+    responses: Iterable[Tuple[str, Union[bytes, Dict[str, Any], None]]],
+    k: int = 3,
+    rank_by: str = "price"
+) -> Dict[str, List[OfferRecord]]:
+    """
+    Keeps the running top-k offers per destination over many responses.
+
+    Args:
+        responses (Iterable[Tuple[str, bytes | dict | None]]): (destination code, response) pairs.
+        k (int): Number of offers to keep per destination.
+        rank_by (str): "price", "stops" or "duration".
+
+    Returns:
+        Dict[str, List[OfferRecord]]: Best offers per destination, best first.
+    """
+    best: Dict[str, List[OfferRecord]] = {}
+    for destination, response in responses:
+        merged = best.get(destination, []) + top_offers(response, k, rank_by)
+        best[destination] = sorted(merged, key=lambda record: record.rank_key(rank_by))[:k]
+    return best
+
+
+def find_cheapest_flight(data: Union[bytes, Dict[str, Any], None], max_stops: Optional[int] = None) -> FlightData:
     """
     Finds the cheapest flight from a given Amadeus API response.
     
     Args:
-        data (dict): JSON data returned by Amadeus flight search API.
+        data (bytes | dict): Raw or parsed JSON returned by Amadeus flight search API.
+        max_stops (int, optional): Ignore offers whose outbound leg has more stops than this
+                                   (0 picks the cheapest direct offer out of a non-direct search).
     
     Returns:
         FlightData: Object representing the cheapest flight found.
                     If no valid flights are found, all fields are "N/A".
     """
+    cheapest = top_offers(data, k=1, rank_by="price", max_stops=max_stops)
+
     # Handle empty or invalid data
-    if not data or not data.get('data'):
+    if not cheapest:
         print("No flight data available.")
         return FlightData(
             price="N/A",
@@ -53,29 +256,4 @@ def find_cheapest_flight(data: Dict[str, Any]) -> FlightData:
             stops="N/A"
         )
 
-    # Start with the first flight as the initial cheapest
-    first_flight = data['data'][0]
-    lowest_price = float(first_flight["price"]["grandTotal"])
-    nr_stops = len(first_flight["itineraries"][0]["segments"]) - 1
-    origin = first_flight["itineraries"][0]["segments"][0]["departure"]["iataCode"]
-    destination = first_flight["itineraries"][0]["segments"][nr_stops]["arrival"]["iataCode"]
-    out_date = first_flight["itineraries"][0]["segments"][0]["departure"]["at"].split("T")[0]
-    return_date = first_flight["itineraries"][1]["segments"][0]["departure"]["at"].split("T")[0]
-
-    cheapest_flight = FlightData(lowest_price, origin, destination, out_date, return_date, nr_stops)
-
-    # Loop through all flights to find the cheapest one
-    for flight in data["data"]:
-        price = float(flight["price"]["grandTotal"])
-        if price < lowest_price:
-            lowest_price = price
-            nr_stops = len(flight["itineraries"][0]["segments"]) - 1
-            origin = flight["itineraries"][0]["segments"][0]["departure"]["iataCode"]
-            destination = flight["itineraries"][0]["segments"][nr_stops]["arrival"]["iataCode"]
-            out_date = flight["itineraries"][0]["segments"][0]["departure"]["at"].split("T")[0]
-            return_date = flight["itineraries"][1]["segments"][0]["departure"]["at"].split("T")[0]
-
-            cheapest_flight = FlightData(lowest_price, origin, destination, out_date, return_date, nr_stops)
-            print(f"New lowest price to {destination}: £{lowest_price}")
-
-    return cheapest_flight
\ No newline at end of file
+    return cheapest[0].to_flight_data()
@@ -4,22 +4,100 @@ flight_search.py
 Handles all interactions with the Amadeus API for:
 1. Retrieving IATA codes for cities.
 2. Searching for flights (direct and indirect) between origin and destination.
+3. Searching many destinations concurrently (AsyncFlightSearch).
+4. Caching flight-offer responses and de-duplicating identical searches.
 """
 
+import asyncio
+import json
 import os
 from datetime import datetime
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Union
+import httpx
 import requests
 from dotenv import load_dotenv
 from tenacity import retry, wait_exponential, stop_after_attempt
 
+from flight_data import FlightData, find_cheapest_flight, top_offers
+from http_client import PooledSession, build_async_client
+from iata_cache import IataCodeCache
+from metrics import FLIGHT_SEARCH, IATA_LOOKUP, registry
+from offer_cache import FlightOfferCache, query_key
+from rate_limiter import TokenBucket
+from token_manager import AMADEUS_BASE_URL, TokenManager
+
 # Load environment variables from .env file
 load_dotenv()
 
 # Amadeus API endpoints
-IATA_ENDPOINT = "https://test.api.amadeus.com/v1/reference-data/locations/cities"
-FLIGHT_ENDPOINT = "https://test.api.amadeus.com/v2/shopping/flight-offers"
-TOKEN_ENDPOINT = "https://test.api.amadeus.com/v1/security/oauth2/token"
+IATA_ENDPOINT = f"{AMADEUS_BASE_URL}/v1/reference-data/locations/cities"
+FLIGHT_ENDPOINT = f"{AMADEUS_BASE_URL}/v2/shopping/flight-offers"
+
+
+def build_token_manager(session: Optional[requests.Session] = None) -> TokenManager:
+    """
+    Creates a TokenManager from the AMADEUS_API_KEY / AMADEUS_SECRET environment variables.
+
+    Args:
+        session (requests.Session, optional): Session used for token requests.
+
+    Returns:
+        TokenManager: Token manager to share between FlightSearch and AsyncFlightSearch.
+    """
+    return TokenManager(os.environ["AMADEUS_API_KEY"], os.environ["AMADEUS_SECRET"], session=session)
+
+
+def select_cheapest_flight(flights: Union[bytes, Dict, None]) -> FlightData:
+    """
+    Picks the preferred offer out of a single non-direct search: the cheapest direct
+    flight if the response contains one, otherwise the overall cheapest flight.
+    Note that a non-direct search only returns the cheapest `max` offers, so direct
+    flights that are much more expensive than connecting ones may not be included.
+
+    Args:
+        flights (bytes | dict | None): Raw or parsed response of a non-direct flight search.
+
+    Returns:
+        FlightData: Cheapest direct flight, or cheapest flight overall if there is no direct one.
+    """
+    # top_offers stays quiet when there is no direct offer; find_cheapest_flight only
+    # reports missing data when the response has no offer at all
+    cheapest_direct = top_offers(flights, k=1, rank_by="price", max_stops=0)
+    if cheapest_direct:
+        return cheapest_direct[0].to_flight_data()
+    return find_cheapest_flight(flights)
+
+
+def build_flight_query(
+    origin_city_code: str,
+    destination_city_code: str,
+    from_time: datetime,
+    to_time: datetime,
+    is_direct: bool = True
+) -> Dict:
+    """
+    Builds the query parameters for the Amadeus flight-offers endpoint.
+
+    Args:
+        origin_city_code (str): IATA code of the origin city.
+        destination_city_code (str): IATA code of the destination city.
+        from_time (datetime): Departure date.
+        to_time (datetime): Return date.
+        is_direct (bool): Whether to search only direct flights.
+
+    Returns:
+        Dict: Query parameters for the flight search request.
+    """
+    return {
+        "originLocationCode": origin_city_code,
+        "destinationLocationCode": destination_city_code,
+        "departureDate": from_time.strftime("%Y-%m-%d"),
+        "returnDate": to_time.strftime("%Y-%m-%d"),
+        "adults": 1,
+        "nonStop": "true" if is_direct else "false",
+        "currencyCode": "GBP",
+        "max": "10",
+    }
 
 
 class FlightSearch:
@@ -27,36 +105,46 @@ class FlightSearch:
     Provides methods to search flights and get IATA codes using Amadeus API.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        iata_cache: Optional[IataCodeCache] = None,
+        lookup_requests_per_second: float = 0.5,
+        session: Optional[requests.Session] = None,
+        token_manager: Optional[TokenManager] = None,
+        offer_cache: Optional[FlightOfferCache] = None,
+        search_budget: Optional[TokenBucket] = None
+    ) -> None:
         """
         Initialize FlightSearch instance.
         Retrieves API credentials from environment variables and obtains a new access token.
-        """
-        self._api_key: str = os.environ["AMADEUS_API_KEY"]
-        self._api_secret: str = os.environ["AMADEUS_SECRET"]
-        self._token: str = self._get_new_token()
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
-    def _get_new_token(self) -> str:
+        Args:
+            iata_cache (IataCodeCache, optional): Persistent cache used by get_destination_codes.
+            lookup_requests_per_second (float): Pace of IATA lookups that miss the cache.
+            session (requests.Session, optional): Shared keep-alive session (a PooledSession by default).
+            token_manager (TokenManager, optional): Shared token manager; built from the environment by default.
+            offer_cache (FlightOfferCache, optional): Cache of flight-offer responses used by check_flights.
+            search_budget (TokenBucket, optional): Budget charged one token per flight-offer request
+                                                   that reaches the API (offer-cache hits are free).
         """
-        Generates a new OAuth2 token for Amadeus API.
+        self.offer_cache: Optional[FlightOfferCache] = offer_cache
+        self.search_budget: Optional[TokenBucket] = search_budget
+        self.session: requests.Session = session or PooledSession()
+        self.token_manager: TokenManager = token_manager or build_token_manager(self.session)
+        # Fetch the first token up front so credential problems surface immediately
+        self.token_manager.get_token()
+        self.iata_cache: Optional[IataCodeCache] = iata_cache
+        self._lookup_rate_limiter = TokenBucket(lookup_requests_per_second, capacity=1)
 
-        Returns:
-            str: Access token for API calls.
-        """
-        headers = {"Content-Type": "application/x-www-form-urlencoded"}
-        body = {
-            'grant_type': 'client_credentials',
-            'client_id': self._api_key,
-            'client_secret': self._api_secret
-        }
-        response = requests.post(url=TOKEN_ENDPOINT, headers=headers, data=body)
-        response.raise_for_status()
-        token_data = response.json()
-        print(f"New Amadeus token obtained. Expires in {token_data['expires_in']} seconds.")
-        return token_data['access_token']
+    def _auth_headers(self) -> Dict[str, str]:
+        """
+        Returns the Authorization header, refreshing the token ahead of expiry when needed.
+        """
+        return {"Authorization": f"Bearer {self.token_manager.get_token()}"}
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(IATA_LOOKUP))
+    @registry.timed(IATA_LOOKUP)
     def get_destination_code(self, city_name: str) -> str:
         """
         Retrieves the IATA airport code for a given city.
@@ -68,10 +156,11 @@ class FlightSearch:
             str: IATA code if found, "N/A" if not found due to IndexError,
                  or "Not Found" if key is missing.
         """
-        headers = {"Authorization": f"Bearer {self._token}"}
         params = {"keyword": city_name, "max": "2", "include": "AIRPORTS"}
 
-        response = requests.get(IATA_ENDPOINT, headers=headers, params=params)
+        response = self.session.get(IATA_ENDPOINT, headers=self._auth_headers(), params=params)
+        if response.status_code == 401:
+            self.token_manager.invalidate()
         response.raise_for_status()
 
         try:
@@ -85,7 +174,88 @@ class FlightSearch:
 
         return code
 
-    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3))
+    def get_destination_codes(self, city_names: List[str]) -> Dict[str, str]:
+        """
+        Resolves IATA codes for many cities, only calling the API for cache misses.
+
+        Args:
+            city_names (List[str]): Names of the cities to resolve.
+
+        Returns:
+            Dict[str, str]: City name -> IATA code, "N/A" or "Not Found" (see get_destination_code).
+        """
+        unique_names = list(dict.fromkeys(city_names))
+        codes: Dict[str, str] = self.iata_cache.get_many(unique_names) if self.iata_cache else {}
+
+        misses = [name for name in unique_names if name not in codes]
+        if self.iata_cache:
+            registry.record_cache("iata", hits=len(codes), misses=len(misses))
+        if codes:
+            print(f"IATA codes: {len(codes)} from cache, {len(misses)} to look up.")
+
+        resolved: Dict[str, str] = {}
+        for city_name in misses:
+            # Avoid hitting API rate limits
+            self._lookup_rate_limiter.acquire()
+            resolved[city_name] = self.get_destination_code(city_name)
+
+        if self.iata_cache and resolved:
+            self.iata_cache.set_many(resolved)
+
+        codes.update(resolved)
+        return codes
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(FLIGHT_SEARCH))
+    def fetch_offers(
+        self,
+        origin_city_code: str,
+        destination_city_code: str,
+        from_time: datetime,
+        to_time: datetime,
+        is_direct: bool = True
+    ) -> Optional[bytes]:
+        """
+        Fetches the raw flight-offer response for a search, using the offer cache when fresh.
+
+        Args:
+            origin_city_code (str): IATA code of the origin city.
+            destination_city_code (str): IATA code of the destination city.
+            from_time (datetime): Departure date.
+            to_time (datetime): Return date.
+            is_direct (bool): Whether to search only direct flights.
+
+        Returns:
+            Optional[bytes]: Raw JSON flight offers from Amadeus API (or the offer cache),
+                             or None if error occurs.
+        """
+        query = build_flight_query(origin_city_code, destination_city_code, from_time, to_time, is_direct)
+
+        if self.offer_cache is not None:
+            cached = self.offer_cache.get(query)
+            if cached is not None:
+                return cached
+
+        if self.search_budget is not None:
+            self.search_budget.acquire()
+        with registry.timer(FLIGHT_SEARCH):
+            response = self.session.get(FLIGHT_ENDPOINT, headers=self._auth_headers(), params=query)
+
+        # Expired or revoked token: drop it and let the retry fetch a fresh one
+        if response.status_code == 401:
+            self.token_manager.invalidate()
+            response.raise_for_status()
+
+        if response.status_code != 200:
+            print(f"Flight search failed for {origin_city_code} -> {destination_city_code}. "
+                  f"Status code: {response.status_code}")
+            print("Response:", response.text)
+            return None
+
+        if self.offer_cache is not None:
+            self.offer_cache.put(query, response.content)
+        return response.content
+
     def check_flights(
         self,
         origin_city_code: str,
@@ -107,24 +277,257 @@ class FlightSearch:
         Returns:
             Optional[Dict]: Flight offers data from Amadeus API, or None if error occurs.
         """
-        headers = {"Authorization": f"Bearer {self._token}"}
-        query = {
-            "originLocationCode": origin_city_code,
-            "destinationLocationCode": destination_city_code,
-            "departureDate": from_time.strftime("%Y-%m-%d"),
-            "returnDate": to_time.strftime("%Y-%m-%d"),
-            "adults": 1,
-            "nonStop": "true" if is_direct else "false",
-            "currencyCode": "GBP",
-            "max": "10",
-        }
+        body = self.fetch_offers(origin_city_code, destination_city_code, from_time, to_time, is_direct)
+        return json.loads(body) if body is not None else None
+
+    def find_cheapest_flight(
+        self,
+        origin_city_code: str,
+        destination_city_code: str,
+        from_time: datetime,
+        to_time: datetime,
+        single_search: bool = False
+    ) -> FlightData:
+        """
+        Finds the cheapest direct flight, falling back to indirect flights if none exist.
+
+        Args:
+            origin_city_code (str): IATA code of the origin city.
+            destination_city_code (str): IATA code of the destination city.
+            from_time (datetime): Departure date.
+            to_time (datetime): Return date.
+            single_search (bool): Run one non-direct search and take both the cheapest direct
+                                  and the overall cheapest offer from it (one API call instead of two).
+
+        Returns:
+            FlightData: Cheapest flight found, with all fields "N/A" if there is none.
+        """
+        if single_search:
+            flights = self.fetch_offers(
+                origin_city_code, destination_city_code, from_time, to_time, is_direct=False
+            )
+            return select_cheapest_flight(flights)
+
+        flights = self.fetch_offers(
+            origin_city_code, destination_city_code, from_time, to_time, is_direct=True
+        )
+        cheapest_flight = find_cheapest_flight(flights)
+
+        if cheapest_flight.price == "N/A":
+            flights = self.fetch_offers(
+                origin_city_code, destination_city_code, from_time, to_time, is_direct=False
+            )
+            cheapest_flight = find_cheapest_flight(flights)
+
+        return cheapest_flight
+
+
+class AsyncFlightSearch:
+    """
+    Asynchronous counterpart of FlightSearch for searching many destinations at once.
+
+    All requests share one HTTP client. At most `max_concurrency` searches are in flight,
+    and a token bucket paces requests to `requests_per_second` instead of fixed sleeps.
+
+    Usage:
+        async with AsyncFlightSearch() as search:
+            results = await search.search_destinations("LON", ["PAR", "BER"], from_time, to_time)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 5,
+        requests_per_second: float = 5.0,
+        burst: Optional[int] = None,
+        token_manager: Optional[TokenManager] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        offer_cache: Optional[FlightOfferCache] = None
+    ) -> None:
+        """
+        Args:
+            max_concurrency (int): Maximum number of requests in flight at the same time.
+            requests_per_second (float): Sustained request rate allowed by the rate limiter.
+            burst (int, optional): Maximum burst size of the rate limiter.
+            token_manager (TokenManager, optional): Shared token manager (e.g. FlightSearch.token_manager).
+            client (httpx.AsyncClient, optional): Shared client; if given, it is not closed on exit.
+            offer_cache (FlightOfferCache, optional): Cache of flight-offer responses.
+        """
+        self.offer_cache: Optional[FlightOfferCache] = offer_cache
+        # Searches currently in flight, so identical concurrent queries share one request
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.token_manager: TokenManager = token_manager or build_token_manager()
+        self._client: Optional[httpx.AsyncClient] = client
+        self._owns_client: bool = client is None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._rate_limiter = TokenBucket(requests_per_second, burst)
 
-        response = requests.get(FLIGHT_ENDPOINT, headers=headers, params=query)
+    async def __aenter__(self) -> "AsyncFlightSearch":
+        if self._client is None:
+            self._client = build_async_client()
+        await self.token_manager.get_token_async(self._client)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(FLIGHT_SEARCH))
+    async def _request_offers(self, query: Dict) -> Optional[bytes]:
+        """
+        Sends one flight-offer request (rate limited and concurrency capped).
+
+        Args:
+            query (Dict): Query parameters as built by build_flight_query.
+
+        Returns:
+            Optional[bytes]: Raw JSON response body, or None if the search failed.
+        """
+        async with self._semaphore:
+            token = await self.token_manager.get_token_async(self._client)
+            headers = {"Authorization": f"Bearer {token}"}
+            await self._rate_limiter.acquire_async()
+            with registry.timer(FLIGHT_SEARCH):
+                response = await self._client.get(FLIGHT_ENDPOINT, headers=headers, params=query)
+
+        if response.status_code == 401:
+            self.token_manager.invalidate()
+            response.raise_for_status()
 
         if response.status_code != 200:
-            print(f"Flight search failed for {origin_city_code} -> {destination_city_code}. "
-                  f"Status code: {response.status_code}")
+            print(f"Flight search failed for {query['originLocationCode']} -> "
+                  f"{query['destinationLocationCode']}. Status code: {response.status_code}")
             print("Response:", response.text)
             return None
 
-        return response.json()
\ No newline at end of file
+        if self.offer_cache is not None:
+            self.offer_cache.put(query, response.content)
+        return response.content
+
+    async def fetch_offers(
+        self,
+        origin_city_code: str,
+        destination_city_code: str,
+        from_time: datetime,
+        to_time: datetime,
+        is_direct: bool = True
+    ) -> Optional[bytes]:
+        """
+        Returns the raw flight-offer response for a search, served from the offer cache
+        when fresh and shared with any identical search that is already in flight.
+
+        Returns:
+            Optional[bytes]: Raw JSON flight offers, or None if error occurs.
+        """
+        query = build_flight_query(origin_city_code, destination_city_code, from_time, to_time, is_direct)
+
+        if self.offer_cache is not None:
+            cached = self.offer_cache.get(query)
+            if cached is not None:
+                return cached
+
+        key = query_key(query)
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(self._request_offers(query))
+            self._inflight[key] = pending
+            pending.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(pending)
+
+    async def check_flights(
+        self,
+        origin_city_code: str,
+        destination_city_code: str,
+        from_time: datetime,
+        to_time: datetime,
+        is_direct: bool = True
+    ) -> Optional[Dict]:
+        """
+        Searches for flights between two cities within the given date range.
+
+        Args:
+            origin_city_code (str): IATA code of the origin city.
+            destination_city_code (str): IATA code of the destination city.
+            from_time (datetime): Departure date.
+            to_time (datetime): Return date.
+            is_direct (bool): Whether to search only direct flights.
+
+        Returns:
+            Optional[Dict]: Flight offers data from Amadeus API, or None if error occurs.
+        """
+        body = await self.fetch_offers(origin_city_code, destination_city_code, from_time, to_time, is_direct)
+        return json.loads(body) if body is not None else None
+
+    async def find_cheapest_flight(
+        self,
+        origin_city_code: str,
+        destination_city_code: str,
+        from_time: datetime,
+        to_time: datetime,
+        single_search: bool = False
+    ) -> FlightData:
+        """
+        Finds the cheapest direct flight, falling back to indirect flights if none exist.
+        With `single_search`, one non-direct search is used for both (see select_cheapest_flight).
+
+        Returns:
+            FlightData: Cheapest flight found, with all fields "N/A" if there is none.
+        """
+        if single_search:
+            flights = await self.fetch_offers(
+                origin_city_code, destination_city_code, from_time, to_time, is_direct=False
+            )
+            return select_cheapest_flight(flights)
+
+        flights = await self.fetch_offers(
+            origin_city_code, destination_city_code, from_time, to_time, is_direct=True
+        )
+        cheapest_flight = find_cheapest_flight(flights)
+
+        if cheapest_flight.price == "N/A":
+            flights = await self.fetch_offers(
+                origin_city_code, destination_city_code, from_time, to_time, is_direct=False
+            )
+            cheapest_flight = find_cheapest_flight(flights)
+
+        return cheapest_flight
+
+    async def search_destinations(
+        self,
+        origin_city_code: str,
+        destination_codes: List[str],
+        from_time: datetime,
+        to_time: datetime,
+        single_search: bool = False
+    ) -> Dict[str, FlightData]:
+        """
+        Searches all destinations concurrently.
+
+        Args:
+            origin_city_code (str): IATA code of the origin city.
+            destination_codes (List[str]): IATA codes of the destinations to search.
+            from_time (datetime): Departure date.
+            to_time (datetime): Return date.
+            single_search (bool): Use one non-direct search per destination instead of two searches.
+
+        Returns:
+            Dict[str, FlightData]: Cheapest flight per destination IATA code. Destinations
+                                   whose search failed map to an all-"N/A" FlightData.
+        """
+        unique_codes = list(dict.fromkeys(destination_codes))
+        results = await asyncio.gather(
+            *(
+                self.find_cheapest_flight(origin_city_code, code, from_time, to_time, single_search)
+                for code in unique_codes
+            ),
+            return_exceptions=True
+        )
+
+        cheapest_flights: Dict[str, FlightData] = {}
+        for code, result in zip(unique_codes, results):
+            if isinstance(result, BaseException):
+                print(f"Flight search failed for {origin_city_code} -> {code}: {result!r}")
+                result = find_cheapest_flight(None)
+            cheapest_flights[code] = result
+        return cheapest_flights
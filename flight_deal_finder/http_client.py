@@ -0,0 +1,152 @@
+"""
+http_client.py
+----------------
+Shared, pooled HTTP clients for all API classes:
+1. PooledSession: a keep-alive requests.Session that records per-endpoint latency.
+2. build_async_client: an httpx.AsyncClient with matching connection limits.
+3. LatencyRecorder: collects request timings per endpoint.
+"""
+
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Path segments that are row ids (e.g. Sheety's /prices/12) are grouped into one endpoint
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """
+    Builds a stable endpoint label such as "GET test.api.amadeus.com/v2/shopping/flight-offers".
+
+    Args:
+        method (str): HTTP method.
+        url (str): Full request URL (query string is ignored).
+
+    Returns:
+        str: Endpoint label used as the latency key.
+    """
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.netloc}{_ID_SEGMENT.sub('/{id}', parts.path)}"
+
+
+class LatencyRecorder:
+    """
+    Thread-safe collection of request latencies, keyed by endpoint.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        """Adds one latency sample for an endpoint."""
+        with self._lock:
+            self._samples.setdefault(endpoint, []).append(seconds)
+
+    @contextmanager
+    def timer(self, endpoint: str) -> Iterator[None]:
+        """Context manager that records how long the wrapped block took."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(endpoint, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Summarizes latencies per endpoint.
+
+        Returns:
+            Dict[str, Dict[str, float]]: count, mean, p50, p95, p99 and max (in seconds) per endpoint.
+        """
+        with self._lock:
+            samples = {endpoint: sorted(values) for endpoint, values in self._samples.items()}
+
+        report: Dict[str, Dict[str, float]] = {}
+        for endpoint, values in samples.items():
+            count = len(values)
+            report[endpoint] = {
+                "count": count,
+                "mean": sum(values) / count,
+                "p50": values[int(0.50 * (count - 1))],
+                "p95": values[int(0.95 * (count - 1))],
+                "p99": values[int(0.99 * (count - 1))],
+                "max": values[-1],
+            }
+        return report
+
+    def print_summary(self) -> None:
+        """Prints a one-line latency summary per endpoint."""
+        for endpoint, stats in sorted(self.summary().items()):
+            print(f"{endpoint}: {stats['count']} calls, mean {stats['mean'] * 1000:.0f} ms, "
+                  f"p95 {stats['p95'] * 1000:.0f} ms")
+
+
+class PooledSession(requests.Session):
+    """
+    requests.Session with a sized keep-alive connection pool and per-endpoint latency recording.
+    Safe to share between DataManager, FlightSearch and worker threads.
+    """
+
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        latency: Optional[LatencyRecorder] = None,
+        timeout: float = 30
+    ) -> None:
+        """
+        Args:
+            pool_maxsize (int): Maximum number of kept-alive connections per host.
+            latency (LatencyRecorder, optional): Where to record latencies (a new one by default).
+            timeout (float): Default request timeout in seconds.
+        """
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.latency: LatencyRecorder = latency or LatencyRecorder()
+        self.timeout = timeout
+
+    def request(self, method, url, *args, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        with self.latency.timer(endpoint_name(method, url)):
+            return super().request(method, url, *args, **kwargs)
+
+
+def build_async_client(max_connections: int = 10, latency: Optional[LatencyRecorder] = None) -> httpx.AsyncClient:
+    """
+    Creates a keep-alive httpx.AsyncClient that records latency per endpoint.
+
+    Args:
+        max_connections (int): Maximum number of open connections.
+        latency (LatencyRecorder, optional): Where to record latencies.
+
+    Returns:
+        httpx.AsyncClient: Client to share between async API classes.
+    """
+    recorder = latency or LatencyRecorder()
+
+    async def start_timer(request: httpx.Request) -> None:
+        request.extensions["start_time"] = time.perf_counter()
+
+    async def stop_timer(response: httpx.Response) -> None:
+        request = response.request
+        started = request.extensions.get("start_time")
+        if started is not None:
+            recorder.record(endpoint_name(request.method, str(request.url)), time.perf_counter() - started)
+
+    client = httpx.AsyncClient(
+        timeout=30,
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        event_hooks={"request": [start_timer], "response": [stop_timer]},
+    )
+    client.latency = recorder
+    return client
@@ -0,0 +1,124 @@
+"""
+iata_cache.py
+----------------
+Persistent on-disk cache (SQLite) of city name -> IATA code lookups.
+Negative results such as "N/A" and "Not Found" are cached too, so cities that
+have no airport are not looked up again on every run.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+# Results that mean "the API had no code for this city"
+NEGATIVE_RESULTS = ("N/A", "Not Found")
+
+# Default time-to-live for cached entries
+DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 days
+DEFAULT_NEGATIVE_TTL_SECONDS = 7 * 24 * 60 * 60  # 7 days
+
+
+class IataCodeCache:
+    """
+    SQLite-backed cache of IATA codes with TTL eviction.
+    """
+
+    def __init__(
+        self,
+        path: str = "iata_cache.sqlite3",
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_NEGATIVE_TTL_SECONDS
+    ) -> None:
+        """
+        Args:
+            path (str): Location of the SQLite database file (":memory:" for a throwaway cache).
+            ttl_seconds (float): How long a found IATA code stays valid.
+            negative_ttl_seconds (float): How long a negative result ("N/A"/"Not Found") stays valid.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS iata_codes ("
+                " city TEXT PRIMARY KEY,"
+                " code TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def _normalize(city_name: str) -> str:
+        return " ".join(city_name.split()).casefold()
+
+    def get(self, city_name: str) -> Optional[str]:
+        """
+        Returns the cached IATA code (or negative result) for a city, or None on a cache miss.
+        """
+        return self.get_many([city_name]).get(city_name)
+
+    def get_many(self, city_names: Iterable[str]) -> Dict[str, str]:
+        """
+        Looks up several cities at once.
+
+        Args:
+            city_names (Iterable[str]): City names to look up.
+
+        Returns:
+            Dict[str, str]: Cached codes for the cities that were found and not expired.
+        """
+        keys: Dict[str, str] = {name: self._normalize(name) for name in city_names}
+        if not keys:
+            return {}
+
+        unique_keys = list(set(keys.values()))
+        placeholders = ",".join("?" * len(unique_keys))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT city, code FROM iata_codes WHERE expires_at > ? AND city IN ({placeholders})",
+                (time.time(), *unique_keys)
+            ).fetchall()
+        found = dict(rows)
+        return {name: found[key] for name, key in keys.items() if key in found}
+
+    def set(self, city_name: str, code: str) -> None:
+        """Stores the IATA code (or negative result) for a city."""
+        self.set_many({city_name: code})
+
+    def set_many(self, codes: Dict[str, str]) -> None:
+        """
+        Stores several lookups in a single transaction.
+
+        Args:
+            codes (Dict[str, str]): Mapping of city name to IATA code or negative result.
+        """
+        now = time.time()
+        rows = [
+            (
+                self._normalize(city),
+                code,
+                now + (self.negative_ttl_seconds if code in NEGATIVE_RESULTS else self.ttl_seconds)
+            )
+            for city, code in codes.items()
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO iata_codes (city, code, expires_at) VALUES (?, ?, ?)",
+                rows
+            )
+
+    def purge_expired(self) -> int:
+        """
+        Deletes expired entries.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        with self._lock, self._connection:
+            cursor = self._connection.execute("DELETE FROM iata_codes WHERE expires_at <= ?", (time.time(),))
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Closes the underlying database connection."""
+        self._connection.close()
@@ -5,26 +5,48 @@ Orchestrates the workflow of the Flight Deal Finder:
 1. Retrieves destinations and customer data.
 2. Updates missing IATA codes.
 3. Searches for direct and indirect flights.
-4. Finds cheapest flights.
-5. Sends notifications (SMS, WhatsApp, Email) to customers.
+4. Finds cheapest flights (optionally for all destinations concurrently with --async).
+5. Sends notifications (WhatsApp, Email) to customers as one digest per run.
 """
 
+import asyncio
+import sys
 import time
 from datetime import datetime, timedelta
 from typing import List, Dict
 
 from data_manager import DataManager
-from flight_search import FlightSearch
+from flight_search import FlightSearch, AsyncFlightSearch
+from fare_calendar import FareCalendarScanner, RequestBudget
 from flight_data import FlightData, find_cheapest_flight
-from notification_manager import NotificationManager
+from http_client import PooledSession, build_async_client
+from iata_cache import IataCodeCache
+from metrics import registry
+from offer_cache import FlightOfferCache
+from notification_manager import NotificationManager, format_deal_message
+from replay import FixtureStore, RecordingSession, RecordingTwilioClient
 
 
 # -------------------- SETUP --------------------
 
-# Initialize modules
-data_manager = DataManager()
-flight_search = FlightSearch()
+# Export stage timings, retries and cache hit rates with: python main.py --metrics run.prom
+# (Prometheus text for .prom files, otherwise one JSON line appended per run)
+METRICS_PATH = sys.argv[sys.argv.index("--metrics") + 1] if "--metrics" in sys.argv else None
+# Record every Sheety/Amadeus/Twilio response for offline replay with: python main.py --record fixtures.json
+RECORD_PATH = sys.argv[sys.argv.index("--record") + 1] if "--record" in sys.argv else None
+fixture_store = FixtureStore()
+
+# Initialize modules; all API classes share one keep-alive session and token manager
+http_session = RecordingSession(fixture_store) if RECORD_PATH else PooledSession()
+data_manager = DataManager(session=http_session)
+# Recording bypasses the offer cache so every search reaches the API and gets captured
+offer_cache = None if RECORD_PATH else FlightOfferCache(directory=".offer_cache")
+if offer_cache is not None:
+    offer_cache.purge_expired()
+flight_search = FlightSearch(iata_cache=IataCodeCache(), session=http_session, offer_cache=offer_cache)
 notification_manager = NotificationManager()
+if RECORD_PATH:
+    notification_manager.client = RecordingTwilioClient(notification_manager.client, fixture_store)
 
 # Define origin airport
 ORIGIN_CITY_IATA = "LON"
@@ -33,11 +55,13 @@ ORIGIN_CITY_IATA = "LON"
 
 sheet_data: List[Dict] = data_manager.get_destination_data()
 
-for row in sheet_data:
-    if row["iataCode"] == "":
-        row["iataCode"] = flight_search.get_destination_code(row["city"])
-        # Avoid hitting API rate limits
-        time.sleep(2)
+# Resolve all missing codes in one batch; only cache misses go to the API
+missing_cities = [row["city"] for row in sheet_data if row["iataCode"] == ""]
+if missing_cities:
+    resolved_codes = flight_search.get_destination_codes(missing_cities)
+    for row in sheet_data:
+        if row["iataCode"] == "":
+            row["iataCode"] = resolved_codes[row["city"]]
 
 data_manager.destination_data = sheet_data
 data_manager.update_destination_codes()
@@ -55,60 +79,110 @@ customer_email_list: List[str] = [row["whatIsYourEmail?"] for row in customer_da
 tomorrow = datetime.now() + timedelta(days=1)
 six_months_from_today = datetime.now() + timedelta(days=6 * 30)
 
-for destination in sheet_data:
-    print(f"Searching flights to {destination['city']}...")
-
-    # Search direct flights first
-    flights = flight_search.check_flights(
-        origin_city_code=ORIGIN_CITY_IATA,
-        destination_city_code=destination["iataCode"],
-        from_time=tomorrow,
-        to_time=six_months_from_today,
-        is_direct=True
-    )
+# Run all destination searches concurrently with: python main.py --async
+USE_ASYNC_SEARCH = "--async" in sys.argv
+# Use one non-direct search per destination instead of direct + indirect: --single-search
+SINGLE_SEARCH = "--single-search" in sys.argv
+# Scan a grid of departure dates and trip lengths per destination: --calendar
+USE_FARE_CALENDAR = "--calendar" in sys.argv
+# Total number of searches the fare calendar may spend across all destinations
+FARE_CALENDAR_BUDGET = 50 * len(sheet_data)
+
+cheapest_flights: Dict[str, FlightData] = {}
+if USE_ASYNC_SEARCH:
+    async def search_all_destinations() -> Dict[str, FlightData]:
+        async_client = build_async_client(latency=http_session.latency)
+        async with async_client, AsyncFlightSearch(
+            token_manager=flight_search.token_manager, client=async_client, offer_cache=offer_cache
+        ) as async_flight_search:
+            return await async_flight_search.search_destinations(
+                origin_city_code=ORIGIN_CITY_IATA,
+                destination_codes=[destination["iataCode"] for destination in sheet_data],
+                from_time=tomorrow,
+                to_time=six_months_from_today,
+                single_search=SINGLE_SEARCH
+            )
 
-    cheapest_flight: FlightData = find_cheapest_flight(flights)
+    print(f"Searching flights to {len(sheet_data)} destinations concurrently...")
+    cheapest_flights = asyncio.run(search_all_destinations())
+elif USE_FARE_CALENDAR:
+    scanner = FareCalendarScanner(flight_search, RequestBudget(FARE_CALENDAR_BUDGET), ORIGIN_CITY_IATA)
+    fare_calendars = scanner.scan_all(
+        destination_codes=[destination["iataCode"] for destination in sheet_data],
+        start=tomorrow.date(),
+        horizon_days=(six_months_from_today - tomorrow).days
+    )
+    cheapest_flights = {code: calendar.cheapest_flight() for code, calendar in fare_calendars.items()}
 
-    print(f"{destination['city']} - Direct flight: £{cheapest_flight.price}")
+for destination in sheet_data:
+    if USE_ASYNC_SEARCH or USE_FARE_CALENDAR:
+        cheapest_flight: FlightData = cheapest_flights[destination["iataCode"]]
+        print(f"{destination['city']} - Cheapest flight: £{cheapest_flight.price}")
+    elif SINGLE_SEARCH:
+        print(f"Searching flights to {destination['city']}...")
+        cheapest_flight = flight_search.find_cheapest_flight(
+            origin_city_code=ORIGIN_CITY_IATA,
+            destination_city_code=destination["iataCode"],
+            from_time=tomorrow,
+            to_time=six_months_from_today,
+            single_search=True
+        )
+        print(f"{destination['city']} - Cheapest flight: £{cheapest_flight.price}")
+    else:
+        print(f"Searching flights to {destination['city']}...")
 
-    # If no direct flight found, search for indirect flights
-    if cheapest_flight.price == "N/A":
-        print(f"No direct flights to {destination['city']}. Checking indirect flights...")
-        flights = flight_search.check_flights(
+        # Search direct flights first
+        flights = flight_search.fetch_offers(
             origin_city_code=ORIGIN_CITY_IATA,
             destination_city_code=destination["iataCode"],
             from_time=tomorrow,
             to_time=six_months_from_today,
-            is_direct=False
+            is_direct=True
         )
+
         cheapest_flight = find_cheapest_flight(flights)
-        print(f"{destination['city']} - Cheapest indirect flight: £{cheapest_flight.price}")
 
-    # -------------------- SEND NOTIFICATIONS --------------------
-    if cheapest_flight.price != "N/A" and cheapest_flight.price < destination["lowestPrice"]:
-        # Customize message based on number of stops
-        if cheapest_flight.stops == 0:
-            message = (
-                f"Low price alert! Only GBP {cheapest_flight.price} to fly direct "
-                f"from {cheapest_flight.origin_airport} to {cheapest_flight.destination_airport}, "
-                f"departing on {cheapest_flight.out_date} and returning on {cheapest_flight.return_date}."
-            )
-        else:
-            message = (
-                f"Low price alert! Only GBP {cheapest_flight.price} to fly "
-                f"from {cheapest_flight.origin_airport} to {cheapest_flight.destination_airport} "
-                f"with {cheapest_flight.stops} stop(s), "
-                f"departing on {cheapest_flight.out_date} and returning on {cheapest_flight.return_date}."
+        print(f"{destination['city']} - Direct flight: £{cheapest_flight.price}")
+
+        # If no direct flight found, search for indirect flights
+        if cheapest_flight.price == "N/A":
+            print(f"No direct flights to {destination['city']}. Checking indirect flights...")
+            flights = flight_search.fetch_offers(
+                origin_city_code=ORIGIN_CITY_IATA,
+                destination_city_code=destination["iataCode"],
+                from_time=tomorrow,
+                to_time=six_months_from_today,
+                is_direct=False
             )
+            cheapest_flight = find_cheapest_flight(flights)
+            print(f"{destination['city']} - Cheapest indirect flight: £{cheapest_flight.price}")
+
+    # -------------------- QUEUE NOTIFICATIONS --------------------
+    if cheapest_flight.price != "N/A" and cheapest_flight.price < destination["lowestPrice"]:
+        message = format_deal_message(cheapest_flight)
+
+        # Deals are sent together after the search loop, one digest per recipient;
+        # deals already notified in earlier runs (and not cheaper since) are skipped
+        if notification_manager.queue_deal(message, cheapest_flight):
+            print(f"Lower price found for {destination['city']}. Queued for the notification digest.\n")
+
+    # Respect API rate limits (the async search paces itself with a token bucket,
+    # the fare calendar already ran all its searches above)
+    if not (USE_ASYNC_SEARCH or USE_FARE_CALENDAR):
+        time.sleep(2)
 
-        print(f"Lower price found for {destination['city']}. Sending notifications...")
+# -------------------- SEND NOTIFICATIONS --------------------
 
-        # Send notifications
-        # notification_manager.send_sms(message)  # Uncomment if SMS is configured
-        notification_manager.send_whatsapp(message)
-        notification_manager.send_emails(customer_email_list, message)
+notification_manager.flush_deals(customer_email_list)
+notification_manager.close()
 
-        print(f"Notifications sent for {destination['city']}.\n")
+# -------------------- REQUEST LATENCY & METRICS --------------------
 
-    # Respect API rate limits
-    time.sleep(2)
\ No newline at end of file
+http_session.latency.print_summary()
+registry.print_summary()
+if METRICS_PATH:
+    registry.export(METRICS_PATH)
+if offer_cache is not None:
+    print(f"Flight offer cache: {offer_cache.hits} hits, {offer_cache.misses} misses.")
+if RECORD_PATH:
+    fixture_store.save(RECORD_PATH)
@@ -0,0 +1,263 @@
+"""
+metrics.py
+----------------
+Lightweight run instrumentation for the Flight Deal Finder:
+1. Stage timers (token fetch, IATA lookup, sheet read/write, flight search, offer parsing,
+   notification send) with count, total, errors and recent p50/p95/p99.
+2. Counters, including tenacity retries (via before_sleep hooks) and cache hits/misses.
+3. Export as Prometheus text (node_exporter textfile format) or JSON lines.
+
+All modules record into the shared `registry`; main.py and daemon.py export it at the end
+of each run or cycle.
+"""
+
+import asyncio
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Tuple
+
+# Stage names used across the project
+TOKEN_FETCH = "token_fetch"
+IATA_LOOKUP = "iata_lookup"
+SHEET_READ = "sheet_read"
+SHEET_WRITE = "sheet_write"
+FLIGHT_SEARCH = "flight_search"
+OFFER_PARSING = "offer_parsing"
+NOTIFICATION_SEND = "notification_send"
+
+METRIC_PREFIX = "deal_finder"
+# Quantiles are computed over the most recent samples, so long-running daemons stay bounded
+RECENT_SAMPLES = 1024
+
+LabelSet = Tuple[Tuple[str, str], ...]
+
+
+class StageStats:
+    """
+    Running totals for one stage plus a window of recent durations for quantiles.
+    """
+
+    __slots__ = ("count", "total", "errors", "max", "recent")
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.errors: int = 0
+        self.max: float = 0.0
+        self.recent: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+
+    def quantile(self, q: float) -> float:
+        """Returns the q-quantile of the recent samples (0.0 if there are none)."""
+        values = sorted(self.recent)
+        return values[int(q * (len(values) - 1))] if values else 0.0
+
+
+class MetricsRegistry:
+    """
+    Thread-safe store of stage timings and labelled counters.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageStats] = {}
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        self.started_at: float = time.time()
+
+    # -------------------- RECORDING --------------------
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        """Records one execution of a stage."""
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.count += 1
+            stats.total += seconds
+            stats.max = max(stats.max, seconds)
+            stats.recent.append(seconds)
+            if error:
+                stats.errors += 1
+
+    @contextmanager
+    def timer(self, stage: str) -> Iterator[None]:
+        """Context manager that records how long the wrapped block took (and whether it raised)."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.observe(stage, time.perf_counter() - start, error=True)
+            raise
+        self.observe(stage, time.perf_counter() - start)
+
+    def timed(self, stage: str) -> Callable:
+        """
+        Decorator that times every call of a function or coroutine function as `stage`.
+        Placed below a tenacity @retry decorator, each attempt is timed separately.
+        """
+        def decorator(function: Callable) -> Callable:
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.timer(stage):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(stage):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def increment(self, name: str, amount: float = 1, **labels: str) -> None:
+        """Adds `amount` to the counter `name` with the given labels."""
+        key = (name, tuple(sorted((label, str(value)) for label, value in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def count_retry(self, stage: str) -> Callable[[Any], None]:
+        """
+        Builds a tenacity `before_sleep` hook that counts retries of a stage, e.g.
+        @retry(..., before_sleep=registry.count_retry(FLIGHT_SEARCH)).
+        """
+        def before_sleep(retry_state: Any) -> None:
+            self.increment("retries_total", stage=stage)
+        return before_sleep
+
+    def record_cache(self, cache: str, hits: int = 0, misses: int = 0) -> None:
+        """Counts cache lookups; hit rates are derived at export time."""
+        if hits:
+            self.increment("cache_requests_total", hits, cache=cache, result="hit")
+        if misses:
+            self.increment("cache_requests_total", misses, cache=cache, result="miss")
+
+    def reset(self) -> None:
+        """Drops all recorded data."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self.started_at = time.time()
+
+    # -------------------- EXPORT --------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns all metrics as plain data.
+
+        Returns:
+            Dict[str, Any]: "stages" (per-stage count, total/mean/max seconds, errors and
+                            p50/p95/p99), "counters" and "cache_hit_rate" per cache.
+        """
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": stats.count,
+                    "errors": stats.errors,
+                    "total_seconds": stats.total,
+                    "mean_seconds": stats.total / stats.count,
+                    "max_seconds": stats.max,
+                    "p50_seconds": stats.quantile(0.50),
+                    "p95_seconds": stats.quantile(0.95),
+                    "p99_seconds": stats.quantile(0.99),
+                }
+                for stage, stats in self._stages.items()
+            }
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+
+        lookups: Dict[str, Dict[str, float]] = {}
+        for counter in counters:
+            if counter["name"] == "cache_requests_total":
+                cache = lookups.setdefault(counter["labels"]["cache"], {"hit": 0, "miss": 0})
+                cache[counter["labels"]["result"]] += counter["value"]
+        hit_rates = {cache: counts["hit"] / (counts["hit"] + counts["miss"]) for cache, counts in lookups.items()}
+
+        return {
+            "timestamp": time.time(),
+            "uptime_seconds": time.time() - self.started_at,
+            "stages": stages,
+            "counters": counters,
+            "cache_hit_rate": hit_rates,
+        }
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: Metric families for stage summaries, stage errors, counters and cache hit rates.
+        """
+        snapshot = self.snapshot()
+        stage_metric = f"{METRIC_PREFIX}_stage_duration_seconds"
+        lines = [f"# HELP {stage_metric} Wall time spent per pipeline stage.",
+                 f"# TYPE {stage_metric} summary"]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            for quantile, key in (("0.5", "p50_seconds"), ("0.95", "p95_seconds"), ("0.99", "p99_seconds")):
+                lines.append(f'{stage_metric}{{stage="{stage}",quantile="{quantile}"}} {stats[key]:.6f}')
+            lines.append(f'{stage_metric}_sum{{stage="{stage}"}} {stats["total_seconds"]:.6f}')
+            lines.append(f'{stage_metric}_count{{stage="{stage}"}} {stats["count"]}')
+
+        error_metric = f"{METRIC_PREFIX}_stage_errors_total"
+        lines += [f"# HELP {error_metric} Stage executions that raised an exception.",
+                  f"# TYPE {error_metric} counter"]
+        lines += [f'{error_metric}{{stage="{stage}"}} {stats["errors"]}'
+                  for stage, stats in sorted(snapshot["stages"].items())]
+
+        counter_names = list(dict.fromkeys(counter["name"] for counter in snapshot["counters"]))
+        for name in counter_names:
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} counter")
+            for counter in snapshot["counters"]:
+                if counter["name"] == name:
+                    labels = ",".join(f'{label}="{value}"' for label, value in counter["labels"].items())
+                    lines.append(f"{METRIC_PREFIX}_{name}{{{labels}}} {counter['value']:g}")
+
+        if snapshot["cache_hit_rate"]:
+            hit_metric = f"{METRIC_PREFIX}_cache_hit_ratio"
+            lines += [f"# HELP {hit_metric} Fraction of cache lookups that were hits.",
+                      f"# TYPE {hit_metric} gauge"]
+            lines += [f'{hit_metric}{{cache="{cache}"}} {rate:.4f}'
+                      for cache, rate in sorted(snapshot["cache_hit_rate"].items())]
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str) -> None:
+        """
+        Writes the metrics to a file: Prometheus text for paths ending in ".prom"
+        (replaced atomically, for a node_exporter textfile collector), otherwise one JSON
+        line per call is appended.
+
+        Args:
+            path (str): Output file.
+        """
+        if path.endswith(".prom"):
+            temporary_path = f"{path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                file.write(self.to_prometheus())
+            os.replace(temporary_path, path)
+        else:
+            with open(path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(self.snapshot()) + "\n")
+        print(f"Metrics written to {path}.")
+
+    def print_summary(self) -> None:
+        """Prints one line per stage with call count, total time and tail latency."""
+        snapshot = self.snapshot()
+        for stage, stats in sorted(snapshot["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+            print(f"{stage}: {stats['count']} calls, {stats['total_seconds']:.2f}s total, "
+                  f"p50 {stats['p50_seconds'] * 1000:.0f} ms, p99 {stats['p99_seconds'] * 1000:.0f} ms, "
+                  f"{stats['errors']} errors")
+        for counter in snapshot["counters"]:
+            if counter["name"] == "retries_total":
+                print(f"Retries in {counter['labels']['stage']}: {counter['value']:g}")
+        for cache, rate in sorted(snapshot["cache_hit_rate"].items()):
+            print(f"{cache} cache hit rate: {rate:.0%}")
+
+
+# Shared registry used by all modules
+registry = MetricsRegistry()
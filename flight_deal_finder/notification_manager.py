@@ -5,29 +5,111 @@ Handles sending notifications to customers via:
 1. SMS
 2. WhatsApp
 3. Email
+
+Deals found during a run can be queued with queue_deal and sent together with
+flush_deals: one digest per recipient, delivered by a worker pool over pooled,
+reconnecting SMTP sessions. Deals and messages that were already sent (in this or
+an earlier run) are skipped using the persistent AlertStateStore.
 """
 
 import os
 import smtplib
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
 from twilio.rest import Client
 from dotenv import load_dotenv
+from tenacity import retry, retry_if_exception, wait_exponential, stop_after_attempt
+
+from alert_store import AlertStateStore
+from flight_data import FlightData
+from metrics import NOTIFICATION_SEND, registry
+from smtp_pool import SmtpPool, is_transient
 
 # Load environment variables from .env
 load_dotenv()
 
+# Twilio rejects WhatsApp/SMS bodies longer than this
+TWILIO_MAX_BODY_LENGTH = 1600
+
+
+def format_deal_message(flight: FlightData) -> str:
+    """
+    Builds the low-price alert text for a flight, worded by number of stops.
+
+    Args:
+        flight (FlightData): Cheapest flight found.
+
+    Returns:
+        str: Message body for SMS, WhatsApp and email.
+    """
+    if flight.stops == 0:
+        return (
+            f"Low price alert! Only GBP {flight.price} to fly direct "
+            f"from {flight.origin_airport} to {flight.destination_airport}, "
+            f"departing on {flight.out_date} and returning on {flight.return_date}."
+        )
+    return (
+        f"Low price alert! Only GBP {flight.price} to fly "
+        f"from {flight.origin_airport} to {flight.destination_airport} "
+        f"with {flight.stops} stop(s), "
+        f"departing on {flight.out_date} and returning on {flight.return_date}."
+    )
+
+
+@dataclass
+class DispatchMetrics:
+    """
+    Throughput report of one notification dispatch.
+
+    Attributes:
+        sent (int): Emails delivered.
+        failed (Dict[str, str]): Recipient -> error for emails that could not be delivered.
+        deals (int): Number of deals included in each digest.
+        seconds (float): Wall time of the dispatch.
+        connections_opened (int): SMTP connections opened so far by the pool.
+    """
+    sent: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    deals: int = 0
+    seconds: float = 0.0
+    connections_opened: int = 0
+
+    @property
+    def emails_per_second(self) -> float:
+        return self.sent / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        return (f"Notifications: {self.deals} deal(s), {self.sent} email(s) sent, {len(self.failed)} failed "
+                f"in {self.seconds:.2f}s ({self.emails_per_second:.1f} emails/s, "
+                f"{self.connections_opened} SMTP connection(s)).")
+
 
 class NotificationManager:
     """
     Manages sending notifications for flight deals via SMS, WhatsApp, and email.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        max_workers: int = 4,
+        alert_store: Optional[AlertStateStore] = None,
+        twilio_client: Optional[Client] = None
+    ) -> None:
         """
-        Initializes Twilio client and email SMTP connection using environment variables.
+        Initializes Twilio client and the pool of SMTP connections using environment variables.
+
+        Args:
+            max_workers (int): Number of worker threads (and SMTP connections) used to send emails.
+            alert_store (AlertStateStore, optional): Persistent dedup and price-drop state
+                                                     (an on-disk store by default).
+            twilio_client (Client, optional): Twilio client to use instead of one built from
+                                              TWILIO_SID / TWILIO_AUTH_TOKEN (e.g. a recording or replay client).
         """
         # Email configuration
         self.smtp_address: str = os.environ["EMAIL_PROVIDER_SMTP_ADDRESS"]
+        self.smtp_port: int = int(os.environ.get("EMAIL_PROVIDER_SMTP_PORT", "0"))
         self.email: str = os.environ["MY_EMAIL"]
         self.email_password: str = os.environ["MY_EMAIL_PASSWORD"]
 
@@ -35,13 +117,23 @@ class NotificationManager:
         self.twilio_virtual_number: str = os.environ["TWILIO_VIRTUAL_NUMBER"]
         self.twilio_verified_number: str = os.environ["TWILIO_VERIFIED_NUMBER"]
         self.whatsapp_number: str = os.environ["TWILIO_WHATSAPP_NUMBER"]
-        self.client = Client(os.environ["TWILIO_SID"], os.environ["TWILIO_AUTH_TOKEN"])
+        self.client = twilio_client or Client(os.environ["TWILIO_SID"], os.environ["TWILIO_AUTH_TOKEN"])
+
+        # SMTP connections are opened lazily and reused across sends
+        self.max_workers = max_workers
+        self.smtp_pool = SmtpPool(
+            host=self.smtp_address,
+            port=self.smtp_port,
+            user=self.email,
+            password=self.email_password,
+            size=max_workers
+        )
 
-        # SMTP connection (initialized lazily)
-        self.connection = smtplib.SMTP(self.smtp_address)
+        # Deals queued during the current run, sent together by flush_deals
+        self.pending_deals: List[Tuple[str, Optional[FlightData]]] = []
 
-        # Track already sent messages to avoid duplicates
-        self.sent_messages: set[str] = set()
+        # Track already sent messages and deals across runs to avoid duplicates
+        self.alert_store: AlertStateStore = alert_store or AlertStateStore()
 
     def send_sms(self, message_body: str) -> None:
         """
@@ -50,16 +142,18 @@ class NotificationManager:
         Args:
             message_body (str): Text content of the SMS.
         """
-        if message_body in self.sent_messages:
+        message_key = self.alert_store.message_key(message_body)
+        if self.alert_store.was_sent(message_key):
             print("SMS already sent, skipping duplicate.")
             return
 
-        message = self.client.messages.create(
-            from_=self.twilio_virtual_number,
-            body=message_body,
-            to=self.twilio_verified_number
-        )
-        self.sent_messages.add(message_body)
+        with registry.timer(NOTIFICATION_SEND):
+            message = self.client.messages.create(
+                from_=self.twilio_virtual_number,
+                body=message_body,
+                to=self.twilio_verified_number
+            )
+        self.alert_store.mark_sent(message_key)
         print(f"SMS sent successfully. SID: {message.sid}")
 
     def send_whatsapp(self, message_body: str) -> None:
@@ -69,35 +163,151 @@ class NotificationManager:
         Args:
             message_body (str): Text content of the WhatsApp message.
         """
-        if message_body in self.sent_messages:
+        message_key = self.alert_store.message_key(message_body)
+        if self.alert_store.was_sent(message_key):
             print("WhatsApp message already sent, skipping duplicate.")
             return
 
-        message = self.client.messages.create(
-            from_=f'whatsapp:{self.whatsapp_number}',
-            body=message_body,
-            to=f'whatsapp:{self.twilio_verified_number}'
-        )
-        self.sent_messages.add(message_body)
+        with registry.timer(NOTIFICATION_SEND):
+            message = self.client.messages.create(
+                from_=f'whatsapp:{self.whatsapp_number}',
+                body=message_body,
+                to=f'whatsapp:{self.twilio_verified_number}'
+            )
+        self.alert_store.mark_sent(message_key)
         print(f"WhatsApp message sent successfully. SID: {message.sid}")
 
-    def send_emails(self, email_list: List[str], email_body: str, subject: str = "New Low Price Flight!") -> None:
+    @retry(
+        retry=retry_if_exception(is_transient),
+        wait=wait_exponential(min=1, max=10),
+        stop=stop_after_attempt(3),
+        reraise=True,
+        before_sleep=registry.count_retry(NOTIFICATION_SEND)
+    )
+    @registry.timed(NOTIFICATION_SEND)
+    def _send_email(self, recipient: str, email_body: str, subject: str) -> None:
         """
-        Sends emails to a list of recipients with the specified message body.
+        Sends one email over a pooled connection; dropped connections are reopened and retried.
+        Permanent SMTP errors (e.g. a refused recipient) are raised without a retry.
+        """
+        message_text = f"Subject:{subject}\n\n{email_body}"
+        with self.smtp_pool.connection() as connection:
+            connection.sendmail(
+                from_addr=self.email,
+                to_addrs=recipient,
+                msg=message_text.encode('utf-8')
+            )
+
+    def send_emails(
+        self,
+        email_list: List[str],
+        email_body: str,
+        subject: str = "New Low Price Flight!"
+    ) -> DispatchMetrics:
+        """
+        Sends emails to a list of recipients with the specified message body,
+        in parallel over pooled SMTP connections. Can be called any number of times per run.
 
         Args:
             email_list (List[str]): List of recipient email addresses.
             email_body (str): Content of the email message.
             subject (str): Email subject line (default: "New Low Price Flight!").
+
+        Returns:
+            DispatchMetrics: Delivery counts and throughput.
+        """
+        metrics = DispatchMetrics()
+        start = time.perf_counter()
+
+        recipients = list(dict.fromkeys(email_list))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._send_email, email, email_body, subject): email
+                for email in recipients
+            }
+            for future in as_completed(futures):
+                email = futures[future]
+                try:
+                    future.result()
+                except (smtplib.SMTPException, OSError) as error:
+                    metrics.failed[email] = str(error)
+                    print(f"Failed to send email to {email}: {error}")
+                else:
+                    metrics.sent += 1
+                    print(f"Email sent to {email}")
+
+        metrics.seconds = time.perf_counter() - start
+        metrics.connections_opened = self.smtp_pool.connections_opened
+        return metrics
+
+    def queue_deal(self, message: str, flight: Optional[FlightData] = None) -> bool:
+        """
+        Queues a deal message to be sent with the next flush_deals call.
+        If the flight is given, the deal is skipped when it was already notified or
+        is not cheaper than the last price notified for its route.
+
+        Args:
+            message (str): Formatted deal message.
+            flight (FlightData, optional): Flight the message is about.
+
+        Returns:
+            bool: True if the deal was queued, False if it was skipped.
         """
-        with self.connection:
-            self.connection.starttls()
-            self.connection.login(self.email, self.email_password)
-            for email in email_list:
-                message_text = f"Subject:{subject}\n\n{email_body}"
-                self.connection.sendmail(
-                    from_addr=self.email,
-                    to_addrs=email,
-                    msg=message_text.encode('utf-8')
-                )
-                print(f"Email sent to {email}")
\ No newline at end of file
+        if any(message == queued for queued, _ in self.pending_deals):
+            return False
+        if flight is not None and not self.alert_store.should_notify(flight):
+            print(f"Deal already notified (last price GBP "
+                  f"{self.alert_store.last_notified_price(self.alert_store.route(flight))}), skipping.")
+            return False
+        self.pending_deals.append((message, flight))
+        return True
+
+    def flush_deals(
+        self,
+        email_list: List[str],
+        subject: str = "New Low Price Flights!",
+        send_whatsapp: bool = True
+    ) -> DispatchMetrics:
+        """
+        Sends all queued deals as one digest per recipient (and one WhatsApp message),
+        then clears the queue.
+
+        Args:
+            email_list (List[str]): List of recipient email addresses.
+            subject (str): Subject line of the digest email.
+            send_whatsapp (bool): Also send the digest as a single WhatsApp message.
+
+        Returns:
+            DispatchMetrics: Delivery counts and throughput (empty if nothing was queued).
+        """
+        deals, self.pending_deals = self.pending_deals, []
+        if not deals:
+            return DispatchMetrics()
+
+        entries = [f"{number}. {message}" for number, (message, _) in enumerate(deals, start=1)]
+        digest = "\n\n".join(entries)
+        if send_whatsapp:
+            # Split into as few messages as Twilio's body limit allows
+            chunk: List[str] = []
+            for entry in entries:
+                if chunk and len("\n\n".join(chunk + [entry])) > TWILIO_MAX_BODY_LENGTH:
+                    self.send_whatsapp("\n\n".join(chunk))
+                    chunk = []
+                chunk.append(entry)
+            self.send_whatsapp("\n\n".join(chunk))
+
+        metrics = self.send_emails(email_list, digest, subject)
+        metrics.deals = len(deals)
+
+        # Remember what was notified so later runs only alert on real price drops
+        if metrics.sent or not email_list:
+            for _, flight in deals:
+                if flight is not None:
+                    self.alert_store.record_alert(flight)
+        print(metrics)
+        return metrics
+
+    def close(self) -> None:
+        """Closes pooled SMTP connections and the alert store."""
+        self.smtp_pool.close()
+        self.alert_store.close()
@@ -0,0 +1,199 @@
+"""
+offer_cache.py
+----------------
+Content-addressed cache of Amadeus flight-offer responses.
+Entries are keyed on a hash of the normalized check_flights query, expire after a
+freshness window, and are evicted least-recently-used once the cache is full.
+Optionally mirrored to a directory so later runs can reuse fresh responses; purge_expired
+keeps that directory within the same entry and size limits as the memory cache.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from metrics import registry
+
+DEFAULT_MAX_AGE_SECONDS = 60 * 60  # 1 hour
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+
+
+def query_key(query: Dict) -> str:
+    """
+    Builds the content address of a flight-offer query.
+    Parameter order, case of IATA codes and value types do not change the key.
+
+    Args:
+        query (Dict): Query parameters as built by build_flight_query.
+
+    Returns:
+        str: Hex SHA-256 digest identifying the query.
+    """
+    normalized = {name: str(value).strip().upper() for name, value in query.items()}
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FlightOfferCache:
+    """
+    Thread-safe LRU cache of raw flight-offer response bodies with a freshness window.
+    """
+
+    def __init__(
+        self,
+        max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        directory: Optional[str] = None
+    ) -> None:
+        """
+        Args:
+            max_age_seconds (float): How long a response is considered fresh.
+            max_entries (int): Maximum number of responses kept in memory.
+            max_bytes (int): Maximum total size of the responses kept in memory.
+            directory (str, optional): Directory to persist responses in, one file per query hash.
+        """
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size: int = 0
+        self._lock = threading.Lock()
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _is_fresh(self, stored_at: float) -> bool:
+        return time.time() - stored_at < self.max_age_seconds
+
+    def _insert(self, key: str, stored_at: float, body: bytes) -> None:
+        # Caller holds the lock
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key)[1])
+        self._entries[key] = (stored_at, body)
+        self._size += len(body)
+        while self._entries and (len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, query: Dict) -> Optional[bytes]:
+        """
+        Returns the cached response body for a query if it is still fresh.
+
+        Args:
+            query (Dict): Flight-offer query parameters.
+
+        Returns:
+            Optional[bytes]: Raw JSON response body, or None on a miss.
+        """
+        key = query_key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    registry.record_cache("offer", hits=1)
+                    return entry[1]
+                self._size -= len(self._entries.pop(key)[1])
+
+            if self.directory and os.path.exists(self._path(key)):
+                stored_at = os.path.getmtime(self._path(key))
+                if self._is_fresh(stored_at):
+                    with open(self._path(key), "rb") as file:
+                        body = file.read()
+                    self._insert(key, stored_at, body)
+                    self.hits += 1
+                    registry.record_cache("offer", hits=1)
+                    return body
+
+            self.misses += 1
+            registry.record_cache("offer", misses=1)
+            return None
+
+    def put(self, query: Dict, body: bytes) -> None:
+        """
+        Stores the response body for a query.
+
+        Args:
+            query (Dict): Flight-offer query parameters.
+            body (bytes): Raw JSON response body.
+        """
+        key = query_key(query)
+        with self._lock:
+            self._insert(key, time.time(), body)
+        if self.directory:
+            # A unique temporary file per writer, so concurrent puts of one query never interleave
+            with tempfile.NamedTemporaryFile(dir=self.directory, prefix=f"{key}.", suffix=".tmp",
+                                             delete=False) as file:
+                file.write(body)
+            os.replace(file.name, self._path(key))
+
+    def purge_expired(self) -> int:
+        """
+        Removes stale responses from memory and from the cache directory, then evicts the
+        oldest files until the directory is within max_entries and max_bytes.
+        Call it at start-up (and periodically in long-running processes).
+
+        Returns:
+            int: Number of entries removed.
+        """
+        removed = 0
+        with self._lock:
+            for key in [key for key, (stored_at, _) in self._entries.items() if not self._is_fresh(stored_at)]:
+                self._size -= len(self._entries.pop(key)[1])
+                removed += 1
+        if self.directory:
+            removed += self._purge_directory()
+        return removed
+
+    def _purge_directory(self) -> int:
+        """Deletes stale and over-limit files of the cache directory, oldest first."""
+        removed = 0
+        kept = []
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # Replaced or removed by a concurrent writer
+            if entry.name.endswith(".json") and self._is_fresh(stat.st_mtime):
+                kept.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.endswith(".json") or (entry.name.endswith(".tmp") and not self._is_fresh(stat.st_mtime)):
+                # Expired responses, and temporary files left behind by interrupted writers
+                removed += self._remove(entry.path)
+
+        kept.sort()
+        total_bytes = sum(size for _, size, _ in kept)
+        for _, size, path in kept[:max(0, len(kept) - self.max_entries)]:
+            removed += self._remove(path)
+            total_bytes -= size
+        kept = kept[max(0, len(kept) - self.max_entries):]
+        for _, size, path in kept:
+            if total_bytes <= self.max_bytes:
+                break
+            removed += self._remove(path)
+            total_bytes -= size
+        return removed
+
+    @staticmethod
+    def _remove(path: str) -> int:
+        try:
+            os.remove(path)
+            return 1
+        except FileNotFoundError:
+            return 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,77 @@
+"""
+rate_limiter.py
+----------------
+Token-bucket rate limiter used to pace calls to the Amadeus API.
+Works from both regular (threaded) code and asyncio code, so it can replace
+the fixed `time.sleep` calls between requests.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Classic token bucket: tokens refill continuously at `rate` per second up to `capacity`.
+    Each request consumes one token; callers wait only as long as needed for a token.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[int] = None) -> None:
+        """
+        Args:
+            rate (float): Tokens added per second (i.e. sustained requests per second).
+            capacity (int, optional): Maximum burst size. Defaults to max(1, rate).
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate: float = rate
+        self.capacity: float = float(capacity if capacity is not None else max(1, int(rate)))
+        self._tokens: float = self.capacity
+        self._last_refill: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """
+        Takes one token (possibly going into debt) and returns how long the caller must wait.
+
+        Returns:
+            float: Seconds to wait before the reserved token becomes valid.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def try_acquire(self) -> bool:
+        """
+        Takes a token only if one is available right now.
+
+        Returns:
+            bool: True if a token was taken, False if the caller would have to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def acquire(self) -> None:
+        """Blocks the current thread until a token is available."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Suspends the current coroutine until a token is available."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
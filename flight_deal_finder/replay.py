@@ -0,0 +1,215 @@
+"""
+replay.py
+----------
+Record/replay layer for offline runs and benchmarks:
+1. FixtureStore: recorded responses keyed by method, path and query (host independent).
+2. RecordingSession: a PooledSession that captures every Sheety/Amadeus response it receives.
+3. RecordingTwilioClient / ReplayTwilioClient: capture or fake Twilio message sends.
+4. synthetic_fixtures: builds a realistic fixture set without any credentials.
+
+Recorded fixtures are served back by stub_server.StubServer.
+"""
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+from http_client import PooledSession
+
+# Numeric path segments (Sheety row ids) are grouped into one route for fallback lookups
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+TWILIO_MESSAGES_KEY = "POST twilio:messages.create"
+
+
+def fixture_key(method: str, url: str) -> str:
+    """
+    Builds the lookup key of a request, e.g. "GET /v2/shopping/flight-offers?adults=1&...".
+    The host is dropped so fixtures recorded against the real APIs replay against a stub server.
+    """
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method.upper()} {parts.path}" + (f"?{query}" if query else "")
+
+
+def route_key(key: str) -> str:
+    """Drops the query and row ids from a fixture key, e.g. "PUT /sheet/prices/{id}"."""
+    method, _, path = key.partition(" ")
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.split('?')[0])}"
+
+
+class FixtureStore:
+    """
+    Thread-safe collection of recorded responses.
+    Lookups try the exact request first and fall back to any response recorded for the
+    same route, cycling through them, so a replay can cover more requests than were recorded.
+    """
+
+    def __init__(self, entries: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> None:
+        self.entries: Dict[str, List[Dict[str, Any]]] = entries or {}
+        self._lock = threading.Lock()
+        self._cursors: Dict[str, "itertools.cycle"] = {}
+        self._by_route: Dict[str, List[Dict[str, Any]]] = {}
+        for key, responses in self.entries.items():
+            self._by_route.setdefault(route_key(key), []).extend(responses)
+
+    @classmethod
+    def load(cls, path: str) -> "FixtureStore":
+        """Loads fixtures saved with save()."""
+        with open(path, encoding="utf-8") as file:
+            return cls(json.load(file)["entries"])
+
+    def save(self, path: str) -> None:
+        """Writes the fixtures to a JSON file."""
+        with self._lock:
+            payload = {"version": 1, "entries": self.entries}
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(payload, file, indent=1)
+        print(f"Saved {sum(map(len, self.entries.values()))} recorded responses to {path}.")
+
+    def add(self, key: str, status: int, body: str, content_type: str = "application/json") -> None:
+        """Records one response."""
+        response = {"status": status, "content_type": content_type, "body": body}
+        with self._lock:
+            self.entries.setdefault(key, []).append(response)
+            self._by_route.setdefault(route_key(key), []).append(response)
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns a recorded response for a request key, or None if nothing matches.
+        """
+        with self._lock:
+            if key in self.entries:
+                pool_key, responses = key, self.entries[key]
+            else:
+                pool_key = route_key(key)
+                responses = self._by_route.get(pool_key)
+                if not responses:
+                    return None
+            if pool_key not in self._cursors:
+                self._cursors[pool_key] = itertools.cycle(responses)
+            return next(self._cursors[pool_key])
+
+
+class RecordingSession(PooledSession):
+    """
+    PooledSession that also stores every response in a FixtureStore.
+    """
+
+    def __init__(self, store: FixtureStore, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.store = store
+
+    def request(self, method, url, *args, **kwargs):
+        response = super().request(method, url, *args, **kwargs)
+        self.store.add(
+            fixture_key(response.request.method, response.request.url),
+            response.status_code,
+            response.text,
+            response.headers.get("Content-Type", "application/json"),
+        )
+        return response
+
+
+class _RecordingMessages:
+    def __init__(self, messages: Any, store: FixtureStore) -> None:
+        self._messages = messages
+        self._store = store
+
+    def create(self, **kwargs) -> Any:
+        message = self._messages.create(**kwargs)
+        self._store.add(TWILIO_MESSAGES_KEY, 201, json.dumps({"sid": message.sid}))
+        return message
+
+
+class RecordingTwilioClient:
+    """
+    Wraps a twilio.rest.Client and records the result of every messages.create call.
+    """
+
+    def __init__(self, client: Any, store: FixtureStore) -> None:
+        self.messages = _RecordingMessages(client.messages, store)
+
+
+class _ReplayMessages:
+    def __init__(self, store: Optional[FixtureStore], latency: float) -> None:
+        self._store = store
+        self._latency = latency
+        self._counter = itertools.count(1)
+        self.sent: List[Dict[str, Any]] = []
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        if self._latency:
+            time.sleep(self._latency)
+        recorded = self._store.lookup(TWILIO_MESSAGES_KEY) if self._store else None
+        sid = json.loads(recorded["body"])["sid"] if recorded else f"SMREPLAY{next(self._counter):08d}"
+        self.sent.append(kwargs)
+        return SimpleNamespace(sid=sid, **kwargs)
+
+
+class ReplayTwilioClient:
+    """
+    Stand-in for twilio.rest.Client that returns recorded (or generated) message SIDs
+    after a configurable delay, without contacting Twilio.
+    """
+
+    def __init__(self, store: Optional[FixtureStore] = None, latency: float = 0.0) -> None:
+        self.messages = _ReplayMessages(store, latency)
+
+
+def synthetic_fixtures(
+    nr_destinations: int,
+    offers_per_response: int = 50,
+    sheety_path: str = "/sheety/flightDeals",
+    seed: int = 42
+) -> FixtureStore:
+    """
+    Builds fixtures for a full pipeline run without recording real traffic:
+    token, Sheety prices/users (with some missing IATA codes), IATA lookups,
+    row updates and flight-offer responses.
+
+    Args:
+        nr_destinations (int): Number of destination rows in the fake sheet.
+        offers_per_response (int): Offers in each flight-offer response.
+        sheety_path (str): Path prefix of the fake Sheety endpoints.
+        seed (int): Random seed, so runs are reproducible.
+
+    Returns:
+        FixtureStore: Fixtures ready to be served by StubServer.
+    """
+    # Imported here to keep the replay layer free of benchmark code at import time
+    from benchmark_offers import make_response
+
+    rng = random.Random(seed)
+    store = FixtureStore()
+    store.add("POST /v1/security/oauth2/token", 200, json.dumps(
+        {"access_token": "replay-token", "expires_in": 1799, "token_type": "Bearer"}
+    ))
+
+    rows = []
+    for row_id in range(2, nr_destinations + 2):
+        code = "".join(rng.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+        rows.append({
+            "city": f"City {row_id}",
+            # Every fourth row needs an IATA lookup
+            "iataCode": "" if row_id % 4 == 0 else code,
+            "lowestPrice": rng.randint(150, 600),
+            "id": row_id,
+        })
+    store.add(f"GET {sheety_path}/prices", 200, json.dumps({"prices": rows}))
+    store.add(f"GET {sheety_path}/users", 200, json.dumps({"users": [
+        {"firstName": "Test", "lastName": f"User {n}", "whatIsYourEmail?": f"user{n}@example.com", "id": n}
+        for n in range(2, 7)
+    ]}))
+    store.add(f"PUT {sheety_path}/prices/2", 200, json.dumps({"price": {"id": 2}}))
+    store.add("GET /v1/reference-data/locations/cities", 200, json.dumps({"data": [{"iataCode": "XYZ"}]}))
+    for _ in range(8):
+        store.add("GET /v2/shopping/flight-offers", 200,
+                  make_response(offers_per_response, rng).decode("utf-8"))
+    return store
@@ -0,0 +1,130 @@
+"""
+smtp_pool.py
+----------------
+Small pool of authenticated, reusable SMTP connections.
+Connections are opened lazily, checked with NOOP before reuse, and transparently
+re-established if the server dropped them, so many emails can be sent from
+several worker threads without a new TLS handshake and login per email.
+"""
+
+import queue
+import smtplib
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    True for errors that break the connection (a dropped session, a failed connect or a
+    socket error). SMTP replies such as a refused recipient (550) are permanent for that
+    message and leave the session usable.
+    """
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+class SmtpPool:
+    """
+    Thread-safe pool of logged-in smtplib.SMTP connections.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        port: int = 0,
+        size: int = 4,
+        use_starttls: bool = True,
+        timeout: float = 30
+    ) -> None:
+        """
+        Args:
+            host (str): SMTP server address.
+            user (str, optional): Login user; no login is attempted if omitted.
+            password (str, optional): Login password.
+            port (int): SMTP port (0 uses smtplib's default).
+            size (int): Maximum number of open connections.
+            use_starttls (bool): Upgrade connections with STARTTLS before logging in.
+            timeout (float): Socket timeout in seconds.
+        """
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_starttls = use_starttls
+        self.timeout = timeout
+        self.size = size
+
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.connections_opened: int = 0
+        self._counter_lock = threading.Lock()
+
+    def _open(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_starttls:
+            connection.starttls()
+        if self.user:
+            connection.login(self.user, self.password)
+        with self._counter_lock:
+            self.connections_opened += 1
+        return connection
+
+    @staticmethod
+    def _is_alive(connection: smtplib.SMTP) -> bool:
+        try:
+            return connection.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    @staticmethod
+    def _discard(connection: smtplib.SMTP) -> None:
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        """
+        Borrows a live connection for the duration of the with-block.
+        A connection that raised a transient error (see is_transient) inside the block is
+        discarded instead of being returned.
+        """
+        with self._slots:
+            connection: Optional[smtplib.SMTP] = None
+            while connection is None:
+                try:
+                    candidate = self._idle.get_nowait()
+                except queue.Empty:
+                    connection = self._open()
+                    break
+                if self._is_alive(candidate):
+                    connection = candidate
+                else:
+                    self._discard(candidate)
+
+            try:
+                yield connection
+            except BaseException as error:
+                if is_transient(error):
+                    self._discard(connection)
+                else:
+                    # e.g. a refused recipient: the session itself is still usable
+                    self._idle.put(connection)
+                raise
+            else:
+                self._idle.put(connection)
+
+    def close(self) -> None:
+        """Closes all idle connections."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
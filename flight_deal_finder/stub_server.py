@@ -0,0 +1,179 @@
+"""
+stub_server.py
+---------------
+Local HTTP server that replays recorded (or synthetic) Sheety and Amadeus responses,
+with configurable latency, random errors and rate limiting, so the pipeline can be
+run and benchmarked without credentials.
+
+Usage:
+    python stub_server.py fixtures.json [--port 8765] [--latency-ms 80] [--jitter-ms 20]
+                                        [--error-rate 0.01] [--rate-limit 10]
+    python stub_server.py --synthetic 200
+"""
+
+import argparse
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Tuple
+
+from rate_limiter import TokenBucket
+from replay import FixtureStore, fixture_key, route_key, synthetic_fixtures
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _serve(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        status, content_type, body = self.server.stub.respond(self.command, self.path)
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        if status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+    def log_message(self, format, *args) -> None:
+        # Keep benchmark output readable
+        pass
+
+
+class StubServer:
+    """
+    Threaded HTTP server replaying a FixtureStore.
+    """
+
+    def __init__(
+        self,
+        store: FixtureStore,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[float] = None,
+        seed: Optional[int] = None
+    ) -> None:
+        """
+        Args:
+            store (FixtureStore): Responses to replay.
+            host (str): Interface to listen on.
+            port (int): Port to listen on (0 picks a free port).
+            latency (float): Base delay added to every response, in seconds.
+            jitter (float): Maximum random extra delay, in seconds.
+            error_rate (float): Fraction of requests answered with HTTP 500.
+            rate_limit (float, optional): Requests per second allowed before answering HTTP 429.
+            seed (int, optional): Random seed for jitter and errors.
+        """
+        self.store = store
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._limiter = TokenBucket(rate_limit) if rate_limit else None
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        self.request_counts: Counter = Counter()
+        self.status_counts: Counter = Counter()
+        self._counts_lock = threading.Lock()
+
+        self._server = ThreadingHTTPServer((host, port), _StubHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, method: str, path: str) -> Tuple[int, str, str]:
+        """
+        Produces the (status, content type, body) for a request.
+        """
+        key = fixture_key(method, path)
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            fail = self._random.random() < self.error_rate
+
+        status, content_type, body = 404, "application/json", '{"errors": [{"detail": "No fixture"}]}'
+        if self._limiter is not None and not self._limiter.try_acquire():
+            status, body = 429, '{"errors": [{"status": 429, "title": "Too many requests"}]}'
+        elif fail:
+            status, body = 500, '{"errors": [{"status": 500, "title": "Injected error"}]}'
+        else:
+            recorded = self.store.lookup(key)
+            if recorded is not None:
+                status, content_type, body = recorded["status"], recorded["content_type"], recorded["body"]
+
+        if delay > 0:
+            time.sleep(delay)
+        with self._counts_lock:
+            self.request_counts[route_key(key)] += 1
+            self.status_counts[status] += 1
+        return status, content_type, body
+
+    def start(self) -> str:
+        """
+        Starts serving in a background thread.
+
+        Returns:
+            str: Base URL of the server, e.g. "http://127.0.0.1:53123".
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self) -> None:
+        """Stops the server."""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Replay recorded API responses locally.")
+    parser.add_argument("fixtures", nargs="?", help="fixture file written by replay.FixtureStore.save")
+    parser.add_argument("--synthetic", type=int, metavar="N", help="serve synthetic fixtures for N destinations")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=None, help="requests per second before HTTP 429")
+    args = parser.parse_args()
+
+    if args.fixtures:
+        store = FixtureStore.load(args.fixtures)
+    elif args.synthetic:
+        store = synthetic_fixtures(args.synthetic)
+    else:
+        parser.error("pass a fixture file or --synthetic N")
+
+    server = StubServer(store, port=args.port, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                        error_rate=args.error_rate, rate_limit=args.rate_limit)
+    print(f"Stub server listening on {server.base_url} (Ctrl+C to stop)")
+    print(f"Point the app at it with AMADEUS_BASE_URL={server.base_url} and "
+          f"SHEETY_*_ENDPOINT={server.base_url}/sheety/flightDeals/...")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
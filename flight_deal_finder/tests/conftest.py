@@ -0,0 +1,23 @@
+"""
+conftest.py
+----------------
+Makes the flat project modules importable from the tests and provides the fake
+credentials NotificationManager reads from the environment.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for name, value in {
+    "EMAIL_PROVIDER_SMTP_ADDRESS": "127.0.0.1",
+    "MY_EMAIL": "deals@example.com",
+    "MY_EMAIL_PASSWORD": "secret",
+    "TWILIO_VIRTUAL_NUMBER": "+15550000001",
+    "TWILIO_VERIFIED_NUMBER": "+15550000002",
+    "TWILIO_WHATSAPP_NUMBER": "+15550000003",
+    "TWILIO_SID": "ACtest",
+    "TWILIO_AUTH_TOKEN": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,180 @@
+"""
+test_daemon.py
+----------------
+Scheduler bookkeeping and cycle error handling of the deal daemon, with the API clients
+replaced by in-memory fakes.
+"""
+
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+
+import daemon
+from daemon import DealDaemon, DealScheduler
+from flight_data import FlightData
+from flight_search import FlightSearch
+from offer_cache import FlightOfferCache
+from rate_limiter import TokenBucket
+
+
+def row(code: str, threshold: float = 100) -> Dict:
+    return {"city": f"City {code}", "iataCode": code, "lowestPrice": threshold, "id": code}
+
+
+def flight(code: str, price: float) -> FlightData:
+    return FlightData(price, "LON", code, "2026-01-01", "2026-01-08", 0)
+
+
+# -------------------- SCHEDULER --------------------
+
+def test_readded_destination_is_checked_once():
+    scheduler = DealScheduler()
+    scheduler.sync_destinations([row("PAR"), row("BER")], now=0)
+    scheduler.sync_destinations([row("BER")], now=1)
+    scheduler.sync_destinations([row("PAR"), row("BER")], now=2)
+
+    assert scheduler.pop_due(now=10) == ["BER", "PAR"]
+    assert scheduler.pop_due(now=10) == []
+    assert scheduler.next_due() is None
+
+
+def test_reschedule_replaces_earlier_entry():
+    scheduler = DealScheduler(min_interval=60)
+    scheduler.sync_destinations([row("PAR")], now=0)
+    scheduler.schedule("PAR", 5)
+
+    assert scheduler.pop_due(now=10) == ["PAR"]
+    scheduler.record_price("PAR", flight("PAR", 150), now=10)
+    assert scheduler.pop_due(now=20) == []
+    assert scheduler.next_due() > 10
+
+
+# -------------------- DAEMON --------------------
+
+class FakeNotificationManager:
+    def __init__(self, *args, **kwargs) -> None:
+        self.pending_deals: List = []
+        self.flushed: List = []
+        self.failures = 0
+
+    def queue_deal(self, message, flight=None) -> bool:
+        self.pending_deals.append((message, flight))
+        return True
+
+    def flush_deals(self, email_list) -> None:
+        deals, self.pending_deals = self.pending_deals, []
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("twilio unavailable")
+        self.flushed.extend(deals)
+
+    def close(self) -> None:
+        pass
+
+
+class FakeDataManager:
+    def __init__(self, *args, **kwargs) -> None:
+        self.rows = [row("PAR"), row("BER"), row("ROM")]
+        self.failures = 0
+
+    def get_destination_data(self) -> List[Dict]:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("sheety unavailable")
+        return self.rows
+
+    def get_customer_emails(self) -> List[Dict]:
+        return [{"whatIsYourEmail?": "a@example.com"}]
+
+
+class FakeFlightSearch:
+    def __init__(self, *args, **kwargs) -> None:
+        self.checked: List[str] = []
+        self.on_check = None
+
+    def find_cheapest_flight(self, origin_city_code, destination_city_code, **kwargs) -> FlightData:
+        self.checked.append(destination_city_code)
+        if self.on_check:
+            self.on_check(destination_city_code)
+        return flight(destination_city_code, 80)
+
+
+@pytest.fixture
+def deal_daemon(monkeypatch, tmp_path):
+    monkeypatch.setattr(daemon, "PooledSession", lambda: None)
+    monkeypatch.setattr(daemon, "DataManager", FakeDataManager)
+    monkeypatch.setattr(daemon, "FlightSearch", FakeFlightSearch)
+    monkeypatch.setattr(daemon, "IataCodeCache", lambda: None)
+    monkeypatch.setattr(daemon, "NotificationManager", FakeNotificationManager)
+    monkeypatch.setattr(daemon, "FlightOfferCache", lambda directory: FlightOfferCache(directory=str(tmp_path)))
+    return DealDaemon(daily_search_budget=10 ** 6)
+
+
+def test_run_cycle_checks_every_due_destination_without_run_forever(deal_daemon):
+    assert deal_daemon.run_cycle() == 3
+    assert sorted(deal_daemon.flight_search.checked) == ["BER", "PAR", "ROM"]
+    assert len(deal_daemon.notification_manager.flushed) == 3
+
+
+def test_stop_requeues_unchecked_destinations(deal_daemon):
+    deal_daemon.flight_search.on_check = lambda code: deal_daemon.stop()
+
+    assert deal_daemon.run_cycle() == 1
+    assert sorted(deal_daemon.scheduler.pop_due(datetime.now().timestamp())) == \
+        sorted(set(["BER", "PAR", "ROM"]) - set(deal_daemon.flight_search.checked))
+
+
+def test_failed_sheet_refresh_is_retried_next_cycle(deal_daemon):
+    deal_daemon.data_manager.failures = 1
+
+    assert deal_daemon.run_cycle() == 0
+    assert deal_daemon.run_cycle() == 3
+
+
+def test_failed_flush_keeps_deals_for_next_cycle(deal_daemon):
+    deal_daemon.notification_manager.failures = 1
+
+    deal_daemon.run_cycle()
+    assert len(deal_daemon.notification_manager.pending_deals) == 3
+    deal_daemon.run_cycle()
+    assert len(deal_daemon.notification_manager.flushed) == 3
+    assert deal_daemon.notification_manager.pending_deals == []
+
+
+# -------------------- SEARCH BUDGET --------------------
+
+class FakeResponse:
+    status_code = 200
+    content = b'{"data": []}'
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.requests = 0
+
+    def get(self, *args, **kwargs) -> FakeResponse:
+        self.requests += 1
+        return FakeResponse()
+
+
+class FakeTokenManager:
+    def get_token(self) -> str:
+        return "token"
+
+    def invalidate(self) -> None:
+        pass
+
+
+def test_offer_cache_hits_do_not_use_search_budget(tmp_path):
+    budget = TokenBucket(rate=1e-6, capacity=2)
+    session = FakeSession()
+    search = FlightSearch(session=session, token_manager=FakeTokenManager(),
+                          offer_cache=FlightOfferCache(directory=str(tmp_path)), search_budget=budget)
+    departure, back = datetime(2026, 1, 1), datetime(2026, 1, 8)
+
+    for _ in range(5):
+        search.fetch_offers("LON", "PAR", departure, back)
+
+    assert session.requests == 1
+    assert budget.try_acquire() and not budget.try_acquire()
@@ -0,0 +1,45 @@
+"""
+test_flight_search.py
+----------------
+select_cheapest_flight on a single non-direct search: the cheapest direct offer wins, and a
+route with only connecting offers falls back to the cheapest one without reporting missing data.
+"""
+
+from typing import Dict, List
+
+from flight_search import select_cheapest_flight
+
+
+def segment(origin: str, destination: str, day: str) -> Dict:
+    return {"departure": {"iataCode": origin, "at": f"{day}T09:00:00"},
+            "arrival": {"iataCode": destination, "at": f"{day}T12:00:00"}}
+
+
+def offer(price: str, via: List[str]) -> Dict:
+    stops = ["LON", *via, "PAR"]
+    outbound = [segment(a, b, "2026-11-01") for a, b in zip(stops, stops[1:])]
+    return {"price": {"grandTotal": price},
+            "itineraries": [{"duration": "PT3H", "segments": outbound},
+                            {"duration": "PT3H", "segments": [segment("PAR", "LON", "2026-11-08")]}]}
+
+
+def test_prefers_cheapest_direct_offer():
+    flights = {"data": [offer("80.00", ["AMS"]), offer("120.00", []), offer("110.00", [])]}
+
+    cheapest = select_cheapest_flight(flights)
+
+    assert cheapest.price == 110.0 and cheapest.stops == 0
+
+
+def test_connecting_only_route_does_not_report_missing_data(capsys):
+    flights = {"data": [offer("95.00", ["AMS"]), offer("90.00", ["BRU"])]}
+
+    cheapest = select_cheapest_flight(flights)
+
+    assert cheapest.price == 90.0 and cheapest.stops == 1
+    assert "No flight data available." not in capsys.readouterr().out
+
+
+def test_empty_response_reports_missing_data(capsys):
+    assert select_cheapest_flight({"data": []}).price == "N/A"
+    assert capsys.readouterr().out.count("No flight data available.") == 1
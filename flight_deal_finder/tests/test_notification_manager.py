@@ -0,0 +1,155 @@
+"""
+test_notification_manager.py
+----------------
+Digest delivery against a local aiosmtpd server: one digest per recipient, reconnecting
+after the server drops the session, reusing one logged-in session across a flush and
+failing a refused recipient once without retrying it.
+"""
+
+import socket
+from email import message_from_bytes
+from typing import List, Set
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+from aiosmtpd.smtp import AuthResult  # noqa: E402
+
+from alert_store import AlertStateStore  # noqa: E402
+from notification_manager import NotificationManager  # noqa: E402
+
+
+class RecordingHandler:
+    """Keeps every delivered message, counts successful logins and refuses chosen recipients."""
+
+    def __init__(self) -> None:
+        self.messages: List = []
+        self.logins = 0
+        self.refused: Set[str] = set()
+        self.rcpt_attempts: List[str] = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options) -> str:
+        self.rcpt_attempts.append(address)
+        if address in self.refused:
+            return "550 5.1.1 Mailbox unavailable"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope) -> str:
+        self.messages.append(envelope)
+        return "250 Message accepted"
+
+    def authenticate(self, server, session, envelope, mechanism, auth_data) -> AuthResult:
+        self.logins += 1
+        return AuthResult(success=True)
+
+
+class SmtpServer:
+    """A local aiosmtpd server that can be stopped and restarted on the same port."""
+
+    def __init__(self) -> None:
+        self.handler = RecordingHandler()
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.controller = None
+
+    def start(self) -> None:
+        self.controller = aiosmtpd_controller.Controller(
+            self.handler, hostname="127.0.0.1", port=self.port,
+            authenticator=self.handler.authenticate, auth_require_tls=False
+        )
+        self.controller.start()
+
+    def stop(self) -> None:
+        self.controller.stop()
+
+
+@pytest.fixture
+def smtp_server():
+    server = SmtpServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def make_manager(server: SmtpServer, max_workers: int = 1) -> NotificationManager:
+    manager = NotificationManager(max_workers=max_workers, alert_store=AlertStateStore(":memory:"),
+                                  twilio_client=object())
+    # The stand-in speaks plain SMTP; the pool still logs in on every new connection
+    manager.smtp_pool.port = server.port
+    manager.smtp_pool.use_starttls = False
+    return manager
+
+
+def queue_deals(manager: NotificationManager, count: int) -> List[str]:
+    messages = [f"Low price alert! Only GBP {100 + number} to fly to CITY{number}." for number in range(count)]
+    for message in messages:
+        assert manager.queue_deal(message)
+    return messages
+
+
+def test_flush_sends_one_digest_per_recipient(smtp_server):
+    manager = make_manager(smtp_server, max_workers=2)
+    deals = queue_deals(manager, 3)
+
+    metrics = manager.flush_deals(["a@example.com", "b@example.com", "a@example.com"], send_whatsapp=False)
+    manager.close()
+
+    assert metrics.sent == 2 and metrics.deals == 3 and not metrics.failed
+    received = smtp_server.handler.messages
+    assert sorted(envelope.rcpt_tos[0] for envelope in received) == ["a@example.com", "b@example.com"]
+    for envelope in received:
+        body = message_from_bytes(envelope.content).get_payload()
+        assert all(deal in body for deal in deals)
+    assert manager.pending_deals == []
+
+
+def test_flush_reuses_one_login_for_many_messages(smtp_server):
+    manager = make_manager(smtp_server, max_workers=1)
+    queue_deals(manager, 2)
+
+    recipients = [f"user{number}@example.com" for number in range(5)]
+    metrics = manager.flush_deals(recipients, send_whatsapp=False)
+    manager.close()
+
+    assert metrics.sent == 5
+    assert len(smtp_server.handler.messages) == 5
+    assert smtp_server.handler.logins == 1
+    assert manager.smtp_pool.connections_opened == 1
+
+
+def test_reconnects_after_server_drops_session(smtp_server):
+    manager = make_manager(smtp_server, max_workers=1)
+    queue_deals(manager, 1)
+    assert manager.flush_deals(["a@example.com"], send_whatsapp=False).sent == 1
+
+    # The server goes away and comes back: the idle pooled session is dead
+    smtp_server.stop()
+    smtp_server.start()
+
+    queue_deals(manager, 1)
+    metrics = manager.flush_deals(["a@example.com"], send_whatsapp=False)
+    manager.close()
+
+    assert metrics.sent == 1 and not metrics.failed
+    assert len(smtp_server.handler.messages) == 2
+    assert manager.smtp_pool.connections_opened == 2
+    assert smtp_server.handler.logins == 2
+
+
+def test_refused_recipient_fails_once_and_keeps_session(smtp_server):
+    smtp_server.handler.refused.add("gone@example.com")
+    manager = make_manager(smtp_server, max_workers=1)
+    queue_deals(manager, 1)
+
+    recipients = ["a@example.com", "gone@example.com", "b@example.com"]
+    metrics = manager.flush_deals(recipients, send_whatsapp=False)
+    manager.close()
+
+    assert metrics.sent == 2 and list(metrics.failed) == ["gone@example.com"]
+    assert smtp_server.handler.rcpt_attempts.count("gone@example.com") == 1
+    assert sorted(envelope.rcpt_tos[0] for envelope in smtp_server.handler.messages) == \
+        ["a@example.com", "b@example.com"]
+    assert manager.smtp_pool.connections_opened == 1
+    assert smtp_server.handler.logins == 1
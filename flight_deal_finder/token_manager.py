@@ -0,0 +1,137 @@
+"""
+token_manager.py
+----------------
+Shared Amadeus OAuth2 token manager.
+Refreshes the access token shortly before it expires and can be used from
+worker threads (get_token) as well as asyncio code (get_token_async).
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import httpx
+import requests
+from dotenv import load_dotenv
+from tenacity import retry, wait_exponential, stop_after_attempt
+
+from metrics import TOKEN_FETCH, registry
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Base URL of the Amadeus API (overridable, e.g. to point at the local replay stub server)
+AMADEUS_BASE_URL = os.environ.get("AMADEUS_BASE_URL", "https://test.api.amadeus.com").rstrip("/")
+TOKEN_ENDPOINT = f"{AMADEUS_BASE_URL}/v1/security/oauth2/token"
+
+
+class TokenManager:
+    """
+    Caches the Amadeus access token and refreshes it `refresh_margin` seconds before expiry.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        api_secret: str,
+        session: Optional[requests.Session] = None,
+        refresh_margin: float = 60
+    ) -> None:
+        """
+        Args:
+            api_key (str): Amadeus API key.
+            api_secret (str): Amadeus API secret.
+            session (requests.Session, optional): Session used for synchronous token requests.
+            refresh_margin (float): Seconds before expiry at which the token is renewed.
+        """
+        self._api_key = api_key
+        self._api_secret = api_secret
+        self._session = session or requests.Session()
+        self.refresh_margin = refresh_margin
+
+        self._token: Optional[str] = None
+        self._expires_at: float = 0.0
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._async_lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _token_request(self) -> Dict:
+        headers = {"Content-Type": "application/x-www-form-urlencoded"}
+        body = {
+            'grant_type': 'client_credentials',
+            'client_id': self._api_key,
+            'client_secret': self._api_secret
+        }
+        return {"url": TOKEN_ENDPOINT, "headers": headers, "data": body}
+
+    def _store(self, token_data: Dict) -> str:
+        self._token = token_data['access_token']
+        self._expires_at = time.monotonic() + float(token_data['expires_in'])
+        print(f"New Amadeus token obtained. Expires in {token_data['expires_in']} seconds.")
+        return self._token
+
+    def _is_fresh(self) -> bool:
+        return self._token is not None and time.monotonic() < self._expires_at - self.refresh_margin
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(TOKEN_FETCH))
+    @registry.timed(TOKEN_FETCH)
+    def _fetch(self) -> Dict:
+        response = self._session.post(**self._token_request())
+        response.raise_for_status()
+        return response.json()
+
+    @retry(wait=wait_exponential(min=1, max=10), stop=stop_after_attempt(3),
+           before_sleep=registry.count_retry(TOKEN_FETCH))
+    @registry.timed(TOKEN_FETCH)
+    async def _fetch_async(self, client: httpx.AsyncClient) -> Dict:
+        response = await client.post(**self._token_request())
+        response.raise_for_status()
+        return response.json()
+
+    def get_token(self) -> str:
+        """
+        Returns a valid access token, fetching a new one if it is missing or about to expire.
+
+        Returns:
+            str: Access token for API calls.
+        """
+        if self._is_fresh():
+            return self._token
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not self._is_fresh():
+                self._store(self._fetch())
+            return self._token
+
+    async def get_token_async(self, client: httpx.AsyncClient) -> str:
+        """
+        Async version of get_token. Concurrent callers share a single refresh request.
+
+        Args:
+            client (httpx.AsyncClient): Client used for the token request.
+
+        Returns:
+            str: Access token for API calls.
+        """
+        if self._is_fresh():
+            return self._token
+        # asyncio locks belong to one event loop, so create a new one if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._async_lock is None or self._async_lock_loop is not loop:
+            self._async_lock = asyncio.Lock()
+            self._async_lock_loop = loop
+        async with self._async_lock:
+            if not self._is_fresh():
+                token_data = await self._fetch_async(client)
+                with self._lock:
+                    self._store(token_data)
+            return self._token
+
+    def invalidate(self) -> None:
+        """Forces the next call to fetch a new token (e.g. after a 401 response)."""
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
@@ -0,0 +1,314 @@
+"""
+backtest.py
+----------------
+Replays the stored daily histories (see price_store) through the alert logic to show what
+a threshold would have done without running it live day by day:
+1. Every session of every symbol is scored in one vectorized pass per chunk of symbols,
+   with the fixed rule (|daily move| > threshold) or the adaptive MoveDetector (--adaptive).
+2. Chunks of symbols are replayed in parallel in a process pool.
+3. The report shows alert counts, the News API calls, SMS and SMS cost they imply, the
+   Alpha Vantage calls of watching the same symbols, and hit rates overall and per symbol.
+
+An alert counts as a hit when the price keeps moving in the alert's direction over the
+next `--horizon` sessions, i.e. the move was not just noise that reverted.
+
+Usage:
+    python backtest.py [--store price_history] [--watchlist watchlist.txt]
+                       [--threshold 1 2 3] [--adaptive] [--horizon 1] [--since 2020-01-01]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from move_detector import MoveDetector, close_matrix, forward_fill
+from price_store import PriceStore
+from watchlist import load_watchlist
+
+# Free-tier quotas the live run has to fit in
+STOCK_CALLS_PER_DAY = 25
+NEWS_CALLS_PER_DAY = 100
+
+# Twilio price per SMS segment (US, check current pricing) and segments per alert: an alert
+# with headlines and emoji is sent as UCS-2, i.e. 67 characters per segment
+SMS_PRICE_PER_SEGMENT = 0.0079
+SEGMENTS_PER_ALERT = 4
+
+
+@dataclass
+class BacktestConfig:
+    """
+    What to replay.
+
+    Attributes:
+        thresholds (List[float]): Thresholds to compare: absolute daily move in percent for the
+                                  fixed rule, minimum score in standard deviations with a detector.
+        detector (MoveDetector, optional): Adaptive alert logic; None for the fixed rule.
+        horizon (int): Sessions after an alert used to judge whether it was a hit.
+        since (np.datetime64, optional): First session that may alert (earlier ones are lookback only).
+    """
+    thresholds: List[float]
+    detector: Optional[MoveDetector] = None
+    horizon: int = 1
+    since: Optional[np.datetime64] = None
+
+
+@dataclass
+class SymbolBacktest:
+    """
+    Backtest of one symbol; the lists hold one entry per threshold.
+
+    Attributes:
+        symbol (str): Ticker symbol.
+        sessions (int): Stored sessions replayed (each one is a quote call in a live run).
+        alert_days (List[np.ndarray]): Sessions that would have alerted.
+        hits (List[int]): Alerts the price followed through on.
+        evaluated (List[int]): Alerts with enough later sessions to judge.
+    """
+    symbol: str
+    sessions: int
+    alert_days: List[np.ndarray]
+    hits: List[int]
+    evaluated: List[int]
+
+    def hit_rate(self, index: int) -> float:
+        """Share of judged alerts that were hits (NaN without any)."""
+        return self.hits[index] / self.evaluated[index] if self.evaluated[index] else float("nan")
+
+
+def fixed_rule_alerts(closes: np.ndarray, thresholds: Sequence[float]) -> Dict[str, np.ndarray]:
+    """
+    The live fixed rule on every session at once.
+
+    Args:
+        closes (np.ndarray): symbols × days matrix of forward-filled closes.
+        thresholds (Sequence[float]): Absolute daily moves in percent.
+
+    Returns:
+        Dict[str, np.ndarray]: "alerts" (thresholds × symbols × days mask) and "move_percent"
+        (symbols × days daily change, NaN on the first day).
+    """
+    move_percent = np.full(closes.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        move_percent[:, 1:] = np.diff(closes, axis=1) / closes[:, :-1] * 100
+    score = np.abs(move_percent)
+    with np.errstate(invalid="ignore"):
+        alerts = score[None] > np.asarray(thresholds, dtype=np.float64)[:, None, None]
+    return {"alerts": alerts, "move_percent": move_percent}
+
+
+def detector_alerts(
+    closes: np.ndarray,
+    detector: MoveDetector,
+    thresholds: Sequence[float]
+) -> Dict[str, np.ndarray]:
+    """
+    The adaptive rule on every session at once: each session's lookback window becomes one
+    row of a single matrix scored by MoveDetector.score, exactly as a live run scores it.
+
+    Args:
+        closes (np.ndarray): symbols × days matrix of forward-filled closes.
+        detector (MoveDetector): Alert logic.
+        thresholds (Sequence[float]): Minimum scores (z_threshold) to compare.
+
+    Returns:
+        Dict[str, np.ndarray]: "alerts" (thresholds × symbols × days mask) and "move_percent"
+        (symbols × days move behind the strongest signal).
+    """
+    nr_symbols, nr_days = closes.shape
+    lookback = detector.sessions_needed
+    alerts = np.zeros((len(thresholds), nr_symbols, nr_days), dtype=bool)
+    move_percent = np.full(closes.shape, np.nan)
+    if nr_days < lookback:
+        return {"alerts": alerts, "move_percent": move_percent}
+
+    # (symbols × sessions) × lookback windows, the last column being the scored session
+    windows = np.lib.stride_tricks.sliding_window_view(closes, lookback, axis=1).reshape(-1, lookback)
+    scores = detector.score(windows)
+    scored_days = nr_days - lookback + 1
+    for index, threshold in enumerate(thresholds):
+        alerting, triggering_move = detector.alerting(scores, threshold)
+        alerts[index, :, lookback - 1:] = alerting.reshape(nr_symbols, scored_days)
+    move_percent[:, lookback - 1:] = triggering_move.reshape(nr_symbols, scored_days)
+    return {"alerts": alerts, "move_percent": move_percent}
+
+
+def backtest_chunk(directory: str, symbols: List[str], config: BacktestConfig) -> List[SymbolBacktest]:
+    """
+    Replays a chunk of symbols (runs in a worker process, so it reads the store itself).
+
+    Args:
+        directory (str): PriceStore directory.
+        symbols (List[str]): Symbols of this chunk.
+        config (BacktestConfig): Rule, thresholds and hit horizon.
+
+    Returns:
+        List[SymbolBacktest]: One result per symbol that has at least two sessions.
+    """
+    store = PriceStore(directory)
+    histories = {symbol: store.load(symbol) for symbol in symbols}
+    histories = {symbol: records for symbol, records in histories.items() if len(records) >= 2}
+    if not histories:
+        return []
+    symbols, days, raw = close_matrix(histories, sum(len(records) for records in histories.values()))
+    traded = ~np.isnan(raw)
+    closes = forward_fill(raw)
+
+    if config.detector is None:
+        replay = fixed_rule_alerts(closes, config.thresholds)
+    else:
+        replay = detector_alerts(closes, config.detector, config.thresholds)
+    # Only sessions the symbol actually traded can alert (gaps are forward-filled for scoring)
+    replayed = traded if config.since is None else traded & (days >= config.since)[None, :]
+    alerts = replay["alerts"] & replayed[None]
+
+    # Follow-through: return over the next `horizon` sessions in the direction of the alert
+    forward = np.full(closes.shape, np.nan)
+    if config.horizon < closes.shape[1]:
+        forward[:, :-config.horizon] = closes[:, config.horizon:] / closes[:, :-config.horizon] - 1
+    judged = ~np.isnan(forward)
+    hit = judged & (np.sign(forward) == np.sign(replay["move_percent"])) & (forward != 0)
+
+    return [
+        SymbolBacktest(
+            symbol=symbol,
+            sessions=int(replayed[row].sum()),
+            alert_days=[days[alerts[index, row]] for index in range(len(config.thresholds))],
+            hits=[int((alerts[index, row] & hit[row]).sum()) for index in range(len(config.thresholds))],
+            evaluated=[int((alerts[index, row] & judged[row]).sum()) for index in range(len(config.thresholds))],
+        )
+        for row, symbol in enumerate(symbols)
+    ]
+
+
+def run_backtest(
+    store: PriceStore,
+    symbols: List[str],
+    config: BacktestConfig,
+    workers: Optional[int] = None,
+    chunk_size: int = 50
+) -> List[SymbolBacktest]:
+    """
+    Replays all symbols in chunks across a process pool.
+
+    Args:
+        store (PriceStore): Stored histories.
+        symbols (List[str]): Symbols to replay.
+        config (BacktestConfig): Rule, thresholds and hit horizon.
+        workers (int, optional): Worker processes (defaults to the number of CPUs).
+        chunk_size (int): Symbols per task; bounds the memory of the windowed detector matrix.
+
+    Returns:
+        List[SymbolBacktest]: Results in the order of `symbols` (symbols without history are left out).
+    """
+    chunks = [symbols[start:start + chunk_size] for start in range(0, len(symbols), chunk_size)]
+    if len(chunks) <= 1:
+        results = [backtest_chunk(store.directory, chunk, config) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(backtest_chunk, [store.directory] * len(chunks), chunks,
+                                        [config] * len(chunks)))
+    return [result for chunk in results for result in chunk]
+
+
+def stored_symbols(store: PriceStore) -> List[str]:
+    """Returns every symbol that has a history file in the store."""
+    return sorted(name[:-len(".prices")] for name in os.listdir(store.directory) if name.endswith(".prices"))
+
+
+def print_report(
+    results: List[SymbolBacktest],
+    config: BacktestConfig,
+    sms_price: float = SMS_PRICE_PER_SEGMENT,
+    segments: int = SEGMENTS_PER_ALERT,
+    top: int = 20
+) -> None:
+    """
+    Prints totals per threshold (alerts, implied API calls, SMS cost, hit rate) and the
+    per-symbol alert counts and hit rates of the symbols that alerted most.
+    """
+    if not results:
+        print("No symbol has enough stored history to replay.")
+        return
+    sessions = sum(result.sessions for result in results)
+    trading_days = max((result.sessions for result in results), default=0)
+    print(f"Replayed {len(results)} symbol(s), {sessions:,} session(s); a live run would have made "
+          f"{sessions:,} Alpha Vantage quote call(s) (one per symbol per session, "
+          f"{len(results)} per day against a free quota of {STOCK_CALLS_PER_DAY}).")
+
+    unit = "σ" if config.detector is not None else "%"
+    print(f"\n{'threshold':>10} {'alerts':>8} {'per day':>8} {'peak/day':>9} {'news calls':>11} "
+          f"{'SMS':>7} {'SMS cost':>10} {'hit rate':>9}")
+    for index, threshold in enumerate(config.thresholds):
+        alert_days = np.concatenate([result.alert_days[index] for result in results])
+        alerts = len(alert_days)
+        _, per_day = np.unique(alert_days, return_counts=True)
+        hits = sum(result.hits[index] for result in results)
+        evaluated = sum(result.evaluated[index] for result in results)
+        hit_rate = f"{hits / evaluated:.0%}" if evaluated else "-"
+        peak = int(per_day.max()) if len(per_day) else 0
+        quota_note = " (above News API quota)" if peak > NEWS_CALLS_PER_DAY else ""
+        # News is cached per company and day and all headlines go in one SMS per symbol
+        print(f"{threshold:>9g}{unit} {alerts:>8,} {alerts / max(trading_days, 1):>8.2f} {peak:>9} "
+              f"{alerts:>11,} {alerts:>7,} ${alerts * segments * sms_price:>9.2f} {hit_rate:>9}{quota_note}")
+
+    ranked = sorted(results, key=lambda result: (-len(result.alert_days[0]), result.symbol))[:top]
+    if not ranked:
+        return
+    print(f"\nPer symbol (top {len(ranked)} by alerts at {config.thresholds[0]:g}{unit}); alerts / hit rate:")
+    headers = " ".join(f"{f'{threshold:g}{unit}':>14}" for threshold in config.thresholds)
+    print(f"{'symbol':<8} {'sessions':>8} {headers}")
+    for result in ranked:
+        cells = []
+        for index in range(len(config.thresholds)):
+            rate = result.hit_rate(index)
+            cells.append(f"{len(result.alert_days[index]):>6} / {'-' if np.isnan(rate) else f'{rate:.0%}':>5}")
+        print(f"{result.symbol:<8} {result.sessions:>8} " + " ".join(f"{cell:>14}" for cell in cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Backtest alert thresholds on the stored price histories.")
+    parser.add_argument("--store", default="price_history", help="PriceStore directory")
+    parser.add_argument("--watchlist", help="Only replay the symbols of this watchlist file")
+    parser.add_argument("--threshold", type=float, nargs="+", default=None,
+                        help="Thresholds to compare (percent, or σ with --adaptive)")
+    parser.add_argument("--adaptive", action="store_true", help="Replay the volatility-aware MoveDetector")
+    parser.add_argument("--horizon", type=int, default=1, help="Sessions after an alert used to judge a hit")
+    parser.add_argument("--since", help="First day that may alert (YYYY-MM-DD); earlier days are lookback only")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
+    parser.add_argument("--sms-price", type=float, default=SMS_PRICE_PER_SEGMENT, help="Price per SMS segment")
+    parser.add_argument("--segments", type=int, default=SEGMENTS_PER_ALERT, help="SMS segments per alert")
+    parser.add_argument("--top", type=int, default=20, help="Symbols listed in the per-symbol table")
+    args = parser.parse_args()
+
+    detector = MoveDetector() if args.adaptive else None
+    thresholds = args.threshold or ([detector.z_threshold] if detector else [1.0])
+    config = BacktestConfig(
+        thresholds=thresholds,
+        detector=detector,
+        horizon=args.horizon,
+        since=np.datetime64(args.since, "D") if args.since else None,
+    )
+
+    store = PriceStore(args.store)
+    if args.watchlist:
+        symbols = [watched.symbol for watched in load_watchlist(args.watchlist)]
+    else:
+        symbols = stored_symbols(store)
+    if not symbols:
+        print(f"No stored histories in {args.store}/ (run main.py first to backfill them).")
+        return
+
+    start = time.perf_counter()
+    results = run_backtest(store, symbols, config, workers=args.workers)
+    print(f"Backtest of {len(symbols)} symbol(s) took {time.perf_counter() - start:.2f}s.")
+    print_report(results, config, sms_price=args.sms_price, segments=args.segments, top=args.top)
+
+
+if __name__ == "__main__":
+    main()
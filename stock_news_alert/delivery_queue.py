@@ -0,0 +1,342 @@
+"""
+delivery_queue.py
+----------------
+Decouples alert generation from Twilio delivery:
+1. Outbox: durable SQLite outbox of messages keyed by an idempotency key, so a message
+   is queued at most once and survives crashes and restarts.
+2. DeliveryQueue: a pool of worker threads that claims due messages, sends them and
+   retries failures with exponential backoff; permanent errors are parked as failed.
+3. TwilioSender: sends one outbox message with a Twilio client.
+
+A message whose send was interrupted mid-flight (e.g. by a crash between the send and its
+acknowledgement) is claimed again after its lease expires. Before resending such an
+in-doubt message the queue asks the provider whether it was already accepted
+(TwilioSender.find_sent), so it is not delivered twice.
+"""
+
+import hashlib
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def idempotency_key(*parts: Any) -> str:
+    """
+    Builds a stable key from the parts that make a message unique,
+    e.g. idempotency_key(symbol, trading_day, to_number, body).
+    """
+    return hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+
+
+@dataclass
+class OutboxMessage:
+    """
+    One queued message.
+
+    Attributes:
+        key (str): Idempotency key.
+        to_number (str): Recipient phone number.
+        from_number (str): Sender phone number.
+        body (str): Message text.
+        attempts (int): Send attempts so far.
+        created_at (float): Time the message was queued (epoch seconds).
+        in_doubt (bool): Claimed again after an expired lease: an earlier attempt may have been sent.
+    """
+    key: str
+    to_number: str
+    from_number: str
+    body: str
+    attempts: int = 0
+    created_at: float = 0.0
+    in_doubt: bool = False
+
+
+class Outbox:
+    """
+    SQLite-backed outbox. Status goes pending -> sending -> sent (or back to pending
+    with a later next_attempt_at, or failed after the last attempt).
+    """
+
+    def __init__(self, path: str = "outbox.sqlite3", lease_seconds: float = 120) -> None:
+        """
+        Args:
+            path (str): SQLite database file.
+            lease_seconds (float): After this long a message stuck in "sending"
+                                   (its worker died) becomes due again.
+        """
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " key TEXT PRIMARY KEY, to_number TEXT, from_number TEXT, body TEXT,"
+            " status TEXT, attempts INTEGER, next_attempt_at REAL, last_error TEXT,"
+            " sid TEXT, created_at REAL, updated_at REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        self._connection.commit()
+
+    def enqueue(self, key: str, to_number: str, from_number: str, body: str) -> bool:
+        """
+        Adds a message unless one with the same key was queued before.
+
+        Returns:
+            bool: True if the message was added, False if the key already exists.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO outbox (key, to_number, from_number, body, status, attempts,"
+                " next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, 'pending', 0, ?, ?, ?)",
+                (key, to_number, from_number, body, now, now, now)
+            )
+            self._connection.commit()
+        return cursor.rowcount == 1
+
+    def claim(self, limit: int = 1) -> List[OutboxMessage]:
+        """
+        Marks up to `limit` due messages as sending and returns them.
+        Messages whose lease expired while sending are claimed again, flagged as in doubt.
+        """
+        now = time.time()
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT key, to_number, from_number, body, attempts, created_at, status FROM outbox"
+                " WHERE (status = 'pending' AND next_attempt_at <= ?)"
+                " OR (status = 'sending' AND updated_at <= ?)"
+                " ORDER BY next_attempt_at LIMIT ?",
+                (now, now - self.lease_seconds, limit)
+            ).fetchall()
+            self._connection.executemany(
+                "UPDATE outbox SET status = 'sending', attempts = attempts + 1, updated_at = ? WHERE key = ?",
+                [(now, row[0]) for row in rows]
+            )
+            self._connection.commit()
+        return [OutboxMessage(key, to_number, from_number, body, attempts + 1, created_at, status == "sending")
+                for key, to_number, from_number, body, attempts, created_at, status in rows]
+
+    def _update(self, key: str, status: str, **columns: Any) -> None:
+        assignments = "".join(f", {column} = ?" for column in columns)
+        with self._lock:
+            self._connection.execute(
+                f"UPDATE outbox SET status = ?, updated_at = ?{assignments} WHERE key = ?",
+                (status, time.time(), *columns.values(), key)
+            )
+            self._connection.commit()
+
+    def mark_sent(self, key: str, sid: Optional[str]) -> None:
+        """Records a successful send."""
+        self._update(key, "sent", sid=sid, last_error=None)
+
+    def mark_retry(self, key: str, error: str, delay: float) -> None:
+        """Schedules another attempt after `delay` seconds."""
+        self._update(key, "pending", last_error=error, next_attempt_at=time.time() + delay)
+
+    def mark_failed(self, key: str, error: str) -> None:
+        """Parks a message that will not be retried."""
+        self._update(key, "failed", last_error=error)
+
+    def counts(self) -> Dict[str, int]:
+        """Returns the number of messages per status."""
+        with self._lock:
+            rows = self._connection.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        return dict(rows)
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    Rate limits (429), server errors (5xx) and network errors are retried;
+    other HTTP errors (e.g. 400 invalid number, 401 bad credentials) are permanent.
+    """
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return True
+
+
+class TwilioSender:
+    """
+    Sends outbox messages with a twilio.rest.Client.
+    """
+
+    def __init__(self, client: Any) -> None:
+        """
+        Args:
+            client (twilio.rest.Client): Client used for messages.create.
+        """
+        self.client = client
+
+    def __call__(self, message: OutboxMessage) -> str:
+        """Sends one message and returns its Twilio SID."""
+        return self.client.messages.create(
+            body=message.body,
+            from_=message.from_number,
+            to=message.to_number
+        ).sid
+
+    def find_sent(self, message: OutboxMessage) -> Optional[str]:
+        """
+        Looks up an in-doubt message in Twilio's message log.
+
+        Returns:
+            Optional[str]: SID of a message with the same sender, recipient and body sent
+                           since the message was queued, or None if there is none.
+        """
+        # Twilio filters by whole days; a minute of margin covers clock skew at midnight
+        since = datetime.fromtimestamp(message.created_at - 60, tz=timezone.utc)
+        for sent in self.client.messages.list(to=message.to_number, from_=message.from_number,
+                                              date_sent_after=since, limit=50):
+            # Trial accounts prefix the body, so match on the end
+            if sent.body and sent.body.endswith(message.body):
+                return sent.sid
+        return None
+
+
+class DeliveryQueue:
+    """
+    Worker pool that drains an Outbox, retrying failed sends with exponential backoff and jitter.
+
+    Usage:
+        with DeliveryQueue(TwilioSender(client), Outbox()) as queue:
+            queue.enqueue(key, to_number, from_number, body)
+            queue.drain(timeout=60)
+    """
+
+    def __init__(
+        self,
+        sender: Callable[[OutboxMessage], Optional[str]],
+        outbox: Optional[Outbox] = None,
+        find_sent: Optional[Callable[[OutboxMessage], Optional[str]]] = None,
+        workers: int = 4,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        poll_interval: float = 0.2
+    ) -> None:
+        """
+        Args:
+            sender (Callable): Sends one OutboxMessage and returns a provider id (e.g. a Twilio SID).
+            outbox (Outbox, optional): Durable outbox (a default SQLite one if omitted).
+            find_sent (Callable, optional): Returns the provider id of an in-doubt message the
+                                            provider already accepted, or None; defaults to
+                                            the sender's find_sent method if it has one.
+            workers (int): Number of concurrent sends.
+            max_attempts (int): Attempts before a retryable message is parked as failed.
+            base_delay (float): Delay before the first retry; doubles on every attempt.
+            max_delay (float): Upper bound of the retry delay.
+            poll_interval (float): How often idle workers look for due messages.
+        """
+        self.sender = sender
+        self.outbox = outbox or Outbox()
+        self.find_sent = find_sent or getattr(sender, "find_sent", None)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.sent: int = 0
+        self.retried: int = 0
+        self.failed: int = 0
+        self.recovered: int = 0
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def retry_delay(self, attempts: int) -> float:
+        """Backoff before the next attempt: base_delay * 2^(attempts - 1), capped, with ±20% jitter."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def _deliver(self, message: OutboxMessage) -> None:
+        try:
+            if message.in_doubt and self.find_sent is not None:
+                # An earlier attempt may have been sent before its worker died
+                sid = self.find_sent(message)
+                if sid is not None:
+                    self.outbox.mark_sent(message.key, sid)
+                    with self._stats_lock:
+                        self.recovered += 1
+                    return
+            sid = self.sender(message)
+        except Exception as error:
+            reason = f"{type(error).__name__}: {error}"
+            if is_retryable(error) and message.attempts < self.max_attempts:
+                self.outbox.mark_retry(message.key, reason, self.retry_delay(message.attempts))
+                with self._stats_lock:
+                    self.retried += 1
+            else:
+                self.outbox.mark_failed(message.key, reason)
+                with self._stats_lock:
+                    self.failed += 1
+                print(f"Alert delivery failed permanently after {message.attempts} attempt(s): {reason}")
+        else:
+            self.outbox.mark_sent(message.key, sid)
+            with self._stats_lock:
+                self.sent += 1
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            messages = self.outbox.claim(1)
+            if not messages:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._deliver(messages[0])
+
+    def start(self) -> "DeliveryQueue":
+        """Starts the worker threads (messages already in the outbox are picked up too)."""
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def enqueue(self, key: str, to_number: str, from_number: str, body: str) -> bool:
+        """Queues a message (see Outbox.enqueue) and wakes idle workers."""
+        added = self.outbox.enqueue(key, to_number, from_number, body)
+        self._wake.set()
+        return added
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until no message is pending or sending.
+
+        Args:
+            timeout (float, optional): Maximum wait in seconds.
+
+        Returns:
+            bool: True if the outbox was drained, False on timeout (messages stay queued for the next run).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            counts = self.outbox.counts()
+            if not counts.get("pending") and not counts.get("sending"):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+    def stop(self) -> None:
+        """Stops the workers after their current send."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self) -> "DeliveryQueue":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
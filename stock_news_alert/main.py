@@ -1,18 +1,39 @@
-import requests
+import sys
+
 from twilio.rest import Client
 
+from delivery_queue import DeliveryQueue, Outbox, TwilioSender, idempotency_key
+from move_detector import MoveDetector
+from news_cache import format_alert_message
+from watchlist import QuotaScheduler, StockWatcher, WatchedSymbol, load_watchlist, trading_day
+
 # Twilio configuration: Replace with your actual Twilio virtual number 
 # and the phone number you have verified with Twilio.
 VIRTUAL_TWILIO_NUMBER = "your virtual twilio number"
 VERIFIED_NUMBER = "your own phone number verified with Twilio"
 
-# Stock and company details for monitoring
+# Stock and company details for monitoring (used when no watchlist file is given)
 STOCK_NAME = "TSLA"
 COMPANY_NAME = "Tesla Inc"
 
-# API endpoints for stock data (Alpha Vantage) and news (News API)
-STOCK_ENDPOINT = "https://www.alphavantage.co/query"
-NEWS_ENDPOINT = "https://newsapi.org/v2/everything"
+# Watch many symbols with: python main.py watchlist.txt  (one "SYMBOL,Company name" per line)
+FILE_ARGUMENTS = [argument for argument in sys.argv[1:] if not argument.startswith("--")]
+WATCHLIST_FILE = FILE_ARGUMENTS[0] if FILE_ARGUMENTS else None
+
+# Alert threshold: absolute daily move in percent (1% for testing)
+THRESHOLD_PERCENT = 1
+
+# Alert on moves that are large for each symbol's own volatility instead: --adaptive
+USE_MOVE_DETECTOR = "--adaptive" in sys.argv
+
+# Alert delivery: concurrent Twilio sends, attempts per message, and how long to wait for the outbox
+DELIVERY_WORKERS = 4
+DELIVERY_MAX_ATTEMPTS = 5
+DELIVERY_TIMEOUT_SECONDS = 120
+
+# Alpha Vantage quota (free tier: 5 calls per minute, 25 per day)
+STOCK_CALLS_PER_MINUTE = 5
+STOCK_CALLS_PER_DAY = 25
 
 # API keys for Alpha Vantage and News API
 STOCK_API_KEY = "Y79J01PZ6HSK5GJVS"
@@ -22,75 +43,60 @@ NEWS_API_KEY = "3EM9FZY8VJX39X50"
 TWILIO_SID = "YOUR TWILIO ACCOUNT SID"
 TWILIO_AUTH_TOKEN = "YOUR TWILIO AUTH TOKEN"
 
-# -------------------- STEP 1: Get Stock Price Data --------------------
-
-# Set parameters to request daily stock data for the given company
-stock_params = {
-    "function": "TIME_SERIES_DAILY",
-    "symbol": STOCK_NAME,
-    "apikey": STOCK_API_KEY,
-}
-
-# Fetch stock price data from Alpha Vantage
-response = requests.get(STOCK_ENDPOINT, params=stock_params)
-data = response.json()["Time Series (Daily)"]
-
-# Convert stock data into a list to easily access the most recent days
-data_list = [value for (key, value) in data.items()]
-
-# Extract yesterday's closing stock price
-yesterday_data = data_list[0]
-yesterday_closing_price = yesterday_data["4. close"]
-print(yesterday_closing_price)
-
-# Extract the day before yesterday's closing stock price
-day_before_yesterday_data = data_list[1]
-day_before_yesterday_closing_price = day_before_yesterday_data["4. close"]
-print(day_before_yesterday_closing_price)
-
-# Calculate the absolute difference in stock closing prices
-difference = float(yesterday_closing_price) - float(day_before_yesterday_closing_price)
-
-# Determine if the stock went up or down
-up_down = "🔺" if difference > 0 else "🔻"
-
-# Calculate the percentage difference between the two days
-diff_percent = round((difference / float(yesterday_closing_price)) * 100)
-print(diff_percent)
-
-# -------------------- STEP 2: Get Relevant News Articles --------------------
-
-# Only fetch news if the stock moved significantly (threshold = 1% for testing)
-if abs(diff_percent) > 1:
-    news_params = {
-        "apiKey": NEWS_API_KEY,
-        "qInTitle": COMPANY_NAME,
-    }
-
-    # Fetch company-related news from News API
-    news_response = requests.get(NEWS_ENDPOINT, params=news_params)
-    articles = news_response.json()["articles"]
-
-    # Select the first 3 articles to avoid spamming with too much news
-    three_articles = articles[:3]
-    print(three_articles)
-
-    # Format each article with stock movement, headline, and description
-    formatted_articles = [
-        f"{STOCK_NAME}: {up_down}{diff_percent}%\nHeadline: {article['title']}. \nBrief: {article['description']}"
-        for article in three_articles
-    ]
-    print(formatted_articles)
-
-    # -------------------- STEP 3: Send Alerts via Twilio --------------------
-
-    # Initialize Twilio client with your account credentials
-    client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
-
-    # Send each article as a separate SMS message
-    for article in formatted_articles:
-        message = client.messages.create(
-            body=article,
-            from_=VIRTUAL_TWILIO_NUMBER,
-            to=VERIFIED_NUMBER
-        )
\ No newline at end of file
+# -------------------- STEP 1: Load Watchlist --------------------
+
+if WATCHLIST_FILE:
+    watchlist = load_watchlist(WATCHLIST_FILE)
+else:
+    watchlist = [WatchedSymbol(STOCK_NAME, COMPANY_NAME)]
+print(f"Watching {len(watchlist)} symbol(s).")
+
+# -------------------- STEP 2: Get Stock Prices and Relevant News --------------------
+
+# Quotes are fetched concurrently within the Alpha Vantage quota; news is only fetched
+# for symbols that crossed the threshold. Both are cached per trading day, so a re-run
+# on the same day makes no API calls.
+watcher = StockWatcher(
+    stock_api_key=STOCK_API_KEY,
+    news_api_key=NEWS_API_KEY,
+    threshold_percent=THRESHOLD_PERCENT,
+    stock_scheduler=QuotaScheduler(STOCK_CALLS_PER_MINUTE, STOCK_CALLS_PER_DAY),
+    detector=MoveDetector() if USE_MOVE_DETECTOR else None,
+)
+results = watcher.run(watchlist)
+print(f"{watcher.api_calls} API call(s) made.")
+
+# Build one message per alerting symbol with all its distinct stories (strongest moves first)
+alert_messages = []
+for result in sorted(results, key=lambda result: -result.score):
+    if result.error:
+        print(f"{result.symbol}: skipped ({result.error})")
+        continue
+    alert_note = f" ALERT: {result.reason}" if result.alert else ""
+    print(f"{result.symbol}: {result.previous_close} -> {result.close} ({result.change_percent:+.2f}%, "
+          f"20-day volatility {result.volatility_percent:.2f}%){alert_note}")
+    if result.articles:
+        alert_messages.append(
+            (result, format_alert_message(result.symbol, result.change_percent, result.articles))
+        )
+
+# -------------------- STEP 3: Send Alerts via Twilio --------------------
+
+# Messages go to a durable outbox first; a worker pool sends them with retries, so one slow
+# or failed send does not block the run. Anything not delivered now is retried next run.
+outbox = Outbox()
+client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
+with DeliveryQueue(TwilioSender(client), outbox, workers=DELIVERY_WORKERS,
+                   max_attempts=DELIVERY_MAX_ATTEMPTS) as delivery_queue:
+    for result, alert_message in alert_messages:
+        # The same alert for the same day and recipient is queued only once, even across re-runs
+        key = idempotency_key(result.symbol, trading_day(), VERIFIED_NUMBER, alert_message)
+        if delivery_queue.enqueue(key, VERIFIED_NUMBER, VIRTUAL_TWILIO_NUMBER, alert_message):
+            # Queued durably, so its stories count as sent and are not picked again
+            watcher.news_cache.mark_sent(result.company, result.articles)
+
+    drained = delivery_queue.drain(timeout=DELIVERY_TIMEOUT_SECONDS)
+
+print(f"Alerts: {delivery_queue.sent} sent, {delivery_queue.recovered} recovered, "
+      f"{delivery_queue.retried} retried, {delivery_queue.failed} failed"
+      f"{'' if drained else ' (some still queued for the next run)'}. Outbox: {outbox.counts()}")
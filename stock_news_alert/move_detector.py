@@ -0,0 +1,221 @@
+"""
+move_detector.py
+----------------
+Volatility-aware move detection over a whole watchlist at once.
+
+Every symbol is scored in one vectorized pass over a symbols × days matrix of closes:
+1. z-score of the latest daily return against a rolling window of earlier returns,
+2. the latest return measured in units of EWMA volatility,
+3. multi-day moves (e.g. 3 and 5 sessions) scaled by EWMA volatility × sqrt(days).
+
+A symbol alerts when its strongest score crosses the threshold and the move is also
+large in absolute terms, so noisy tickers need a bigger move than calm ones.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+@dataclass
+class MoveAlert:
+    """
+    A symbol whose latest move stands out against its own history.
+
+    Attributes:
+        symbol (str): Ticker symbol.
+        score (float): Strongest absolute score (in standard deviations).
+        change_percent (float): Latest day-over-day change, in percent.
+        move_percent (float): Change over the horizon that triggered the alert, in percent.
+        reason (str): Which signal triggered, e.g. "1-day z-score", "EWMA" or "3-day move".
+    """
+    symbol: str
+    score: float
+    change_percent: float
+    move_percent: float
+    reason: str
+
+
+def close_matrix(histories: Dict[str, np.ndarray], sessions: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Aligns per-symbol histories on their common last `sessions` trading days.
+
+    Args:
+        histories (Dict[str, np.ndarray]): Symbol -> PRICE_DTYPE records (see price_store), oldest first.
+        sessions (int): Number of most recent trading days to keep.
+
+    Returns:
+        Tuple[List[str], np.ndarray, np.ndarray]: Symbols, days (datetime64[D]) and a
+        symbols × days float matrix of closes (NaN where a symbol has no session).
+    """
+    symbols = [symbol for symbol, records in histories.items() if len(records)]
+    if not symbols:
+        return [], np.empty(0, dtype="datetime64[D]"), np.empty((0, 0))
+    days = np.unique(np.concatenate([histories[symbol]["day"][-sessions:] for symbol in symbols]))[-sessions:]
+    closes = np.full((len(symbols), len(days)), np.nan)
+    for row, symbol in enumerate(symbols):
+        records = histories[symbol]
+        positions = np.searchsorted(days, records["day"])
+        inside = (positions < len(days)) & (days[np.minimum(positions, len(days) - 1)] == records["day"])
+        closes[row, positions[inside]] = records["close"][inside]
+    return symbols, days, closes
+
+
+def forward_fill(closes: np.ndarray) -> np.ndarray:
+    """Fills gaps in each row with the last known close (leading gaps stay NaN)."""
+    valid = ~np.isnan(closes)
+    last_valid = np.where(valid, np.arange(closes.shape[1]), 0)
+    np.maximum.accumulate(last_valid, axis=1, out=last_valid)
+    return closes[np.arange(closes.shape[0])[:, None], last_valid]
+
+
+class MoveDetector:
+    """
+    Scores the latest move of many symbols against each symbol's own volatility.
+    """
+
+    def __init__(
+        self,
+        window: int = 20,
+        ewma_halflife: float = 10.0,
+        horizons: Sequence[int] = (3, 5),
+        z_threshold: float = 3.0,
+        min_move_percent: float = 1.0
+    ) -> None:
+        """
+        Args:
+            window (int): Number of earlier daily returns for the rolling z-score.
+            ewma_halflife (float): Half-life (in sessions) of the EWMA volatility.
+            horizons (Sequence[int]): Multi-day horizons (in sessions) also checked for moves.
+            z_threshold (float): Minimum score (in standard deviations) for an alert.
+            min_move_percent (float): Minimum absolute move (in percent) for an alert,
+                                      so very calm tickers do not alert on tiny moves.
+        """
+        self.window = window
+        self.ewma_halflife = ewma_halflife
+        self.horizons = tuple(horizons)
+        self.z_threshold = z_threshold
+        self.min_move_percent = min_move_percent
+        # EWMA weights over the returns before the latest one, most recent first
+        self._ewma_span = max(window, int(5 * ewma_halflife))
+        self._ewma_weights = 0.5 ** (np.arange(self._ewma_span) / ewma_halflife)
+        # Earlier returns needed before any score counts; fewer give a meaningless volatility
+        self.min_history = min(window, 5)
+
+    @property
+    def sessions_needed(self) -> int:
+        """Number of closes per symbol needed to compute every score."""
+        return max(self.window, self._ewma_span, max(self.horizons, default=1)) + 2
+
+    def score(self, closes: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Scores the latest session of every row.
+
+        Args:
+            closes (np.ndarray): symbols × days matrix of closes, oldest day first (NaN allowed).
+
+        Returns:
+            Dict[str, np.ndarray]: Per symbol "change_percent", "zscore", "ewma_zscore",
+            "horizon_zscore" and "horizon_percent" (symbols × horizons), "components"
+            (absolute z-score, EWMA and horizon scores side by side) and "score" (strongest
+            component); every score is 0 where fewer than min_history earlier returns are
+            known. "horizons" lists the horizons short enough for the matrix.
+        """
+        closes = forward_fill(np.asarray(closes, dtype=np.float64))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            returns = np.diff(np.log(closes), axis=1)
+            latest = returns[:, -1]
+            earlier = returns[:, :-1]
+
+            window = earlier[:, -self.window:]
+            valid = ~np.isnan(window)
+            count = valid.sum(axis=1)
+            mean = np.where(valid, window, 0).sum(axis=1) / count
+            deviation = np.where(valid, window - mean[:, None], 0)
+            std = np.sqrt((deviation ** 2).sum(axis=1) / (count - 1))
+            zscore = np.where(count >= self.min_history, (latest - mean) / std, 0.0)
+
+            recent = earlier[:, ::-1][:, :self._ewma_span]
+            weights = self._ewma_weights[:recent.shape[1]]
+            recent_valid = ~np.isnan(recent)
+            ewma_variance = (np.where(recent_valid, recent ** 2, 0) @ weights) / (recent_valid @ weights)
+            ewma_volatility = np.sqrt(ewma_variance)
+            enough_history = recent_valid.sum(axis=1) >= self.min_history
+            ewma_zscore = np.where(enough_history, latest / ewma_volatility, 0.0)
+
+            horizons = [h for h in self.horizons if h < closes.shape[1]]
+            horizon_log = np.stack(
+                [np.log(closes[:, -1] / closes[:, -1 - h]) for h in horizons], axis=1
+            ) if horizons else np.empty((len(closes), 0))
+            horizon_zscore = np.where(enough_history[:, None],
+                                      horizon_log / (ewma_volatility[:, None] * np.sqrt(horizons)), 0.0)
+
+        components = np.column_stack([zscore, ewma_zscore, horizon_zscore])
+        components = np.nan_to_num(np.abs(components), nan=0.0, posinf=0.0)
+        return {
+            "change_percent": np.expm1(latest) * 100,
+            "zscore": zscore,
+            "ewma_zscore": ewma_zscore,
+            "horizon_zscore": horizon_zscore,
+            "horizon_percent": np.expm1(horizon_log) * 100,
+            "components": components,
+            "score": components.max(axis=1),
+            "horizons": np.array(horizons, dtype=np.int64),
+        }
+
+    def alerting(
+        self,
+        scores: Dict[str, np.ndarray],
+        z_threshold: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Applies the alert rule to the output of score().
+
+        Args:
+            scores (Dict[str, np.ndarray]): Result of score().
+            z_threshold (float, optional): Overrides the detector's z_threshold (e.g. to try several).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Boolean alert mask and the move (in percent)
+            behind each row's strongest signal.
+        """
+        z_threshold = self.z_threshold if z_threshold is None else z_threshold
+        strongest = scores["components"].argmax(axis=1)
+        # Absolute size of the move behind the strongest signal (1-day for the first two)
+        move_percent = np.column_stack([scores["change_percent"], scores["change_percent"],
+                                        scores["horizon_percent"]])
+        triggering_move = move_percent[np.arange(len(move_percent)), strongest]
+        alerting = (scores["score"] >= z_threshold) & (np.abs(triggering_move) >= self.min_move_percent)
+        return alerting, triggering_move
+
+    def detect(self, symbols: Sequence[str], closes: np.ndarray) -> List[MoveAlert]:
+        """
+        Returns the symbols whose latest move stands out, strongest first.
+
+        Args:
+            symbols (Sequence[str]): Row labels of `closes`.
+            closes (np.ndarray): symbols × days matrix of closes, oldest day first.
+
+        Returns:
+            List[MoveAlert]: Ranked alerts.
+        """
+        if len(symbols) == 0:
+            return []
+        scores = self.score(closes)
+        strongest = scores["components"].argmax(axis=1)
+        alerting, triggering_move = self.alerting(scores)
+
+        reasons = ["1-day z-score", "EWMA"] + [f"{h}-day move" for h in scores["horizons"]]
+        order = np.flatnonzero(alerting)
+        order = order[np.argsort(-scores["score"][order], kind="stable")]
+        return [
+            MoveAlert(
+                symbol=symbols[row],
+                score=float(scores["score"][row]),
+                change_percent=float(scores["change_percent"][row]),
+                move_percent=float(triggering_move[row]),
+                reason=reasons[strongest[row]],
+            )
+            for row in order
+        ]
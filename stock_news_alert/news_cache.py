@@ -0,0 +1,310 @@
+"""
+news_cache.py
+----------------
+News layer for the Stock News Alert:
+1. NewsCache: articles per (company, trading day) in SQLite, refreshed conditionally
+   (only when stale, only for articles newer than the cached ones, with ETag/Last-Modified).
+2. MinHash near-duplicate detection on titles, so a syndicated story that comes back
+   under several URLs is sent once, and stories sent in earlier runs are not sent again.
+3. format_alert_message: one batched message per symbol instead of one SMS per article.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+# Smallest prime above 2**32; with 32-bit hashes and coefficients (a * x + b) fits in uint64
+_MINHASH_PRIME = np.uint64(4294967311)
+
+# Twilio splits longer bodies into several segments and rejects anything above 1600 characters
+TWILIO_MAX_BODY_LENGTH = 1600
+
+# Placeholder title News API returns for articles that were taken down
+REMOVED_TITLE = "[Removed]"
+
+
+class MinHasher:
+    """
+    MinHash signatures over character shingles of normalized text.
+    The fraction of equal signature slots estimates the Jaccard similarity of two texts.
+    """
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 4, seed: int = 1) -> None:
+        """
+        Args:
+            num_perm (int): Number of hash permutations (signature length).
+            shingle_size (int): Characters per shingle.
+            seed (int): Seed of the permutation coefficients, so signatures are stable across runs.
+        """
+        rng = np.random.default_rng(seed)
+        self.shingle_size = shingle_size
+        self._a = rng.integers(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> Set[str]:
+        """Returns the character shingles of text lower-cased and stripped of punctuation."""
+        normalized = " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+        if len(normalized) <= self.shingle_size:
+            return {normalized}
+        return {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Returns the MinHash signature of a text.
+
+        Returns:
+            np.ndarray: uint64 array of length num_perm.
+        """
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+             for shingle in self.shingles(text)),
+            dtype=np.uint64
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _MINHASH_PRIME).min(axis=0)
+
+
+def similarity(signatures: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """
+    Estimated Jaccard similarity between every row of `signatures` and every row of `others`.
+
+    Returns:
+        np.ndarray: len(signatures) × len(others) matrix.
+    """
+    if len(signatures) == 0 or len(others) == 0:
+        return np.zeros((len(signatures), len(others)))
+    return (signatures[:, None, :] == others[None, :, :]).mean(axis=2)
+
+
+def article_text(article: Dict[str, Any]) -> str:
+    """Text used to compare articles: the title, or the description if there is no title."""
+    return article.get("title") or article.get("description") or ""
+
+
+def distinct_stories(
+    articles: List[Dict[str, Any]],
+    hasher: MinHasher,
+    threshold: float = 0.5,
+    exclude: Optional[np.ndarray] = None
+) -> List[Dict[str, Any]]:
+    """
+    Drops near-duplicate articles, keeping the first article of every story.
+
+    Args:
+        articles (List[Dict]): News API articles, best first.
+        hasher (MinHasher): Signature builder.
+        threshold (float): Estimated similarity above which two titles are the same story.
+        exclude (np.ndarray, optional): Signatures of stories to drop as well (e.g. already sent).
+
+    Returns:
+        List[Dict]: Articles of distinct stories, in input order.
+    """
+    articles = [article for article in articles if article.get("title") != REMOVED_TITLE]
+    if not articles:
+        return []
+    signatures = np.stack([hasher.signature(article_text(article)) for article in articles])
+    within = similarity(signatures, signatures)
+    already_sent = similarity(signatures, exclude).max(axis=1) if exclude is not None and len(exclude) else None
+
+    kept: List[int] = []
+    for index in range(len(articles)):
+        if already_sent is not None and already_sent[index] >= threshold:
+            continue
+        if kept and within[index, kept].max() >= threshold:
+            continue
+        kept.append(index)
+    return [articles[index] for index in kept]
+
+
+@dataclass
+class NewsEntry:
+    """
+    Cached articles of one company on one trading day.
+
+    Attributes:
+        articles (List[Dict]): Articles, newest first.
+        fetched_at (float): When the entry was last fetched or revalidated (epoch seconds).
+        etag (str, optional): ETag of the last response, for If-None-Match.
+        last_modified (str, optional): Last-Modified of the last response, for If-Modified-Since.
+    """
+    articles: List[Dict[str, Any]] = field(default_factory=list)
+    fetched_at: float = 0.0
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def newest_published(self) -> Optional[str]:
+        """publishedAt of the newest cached article (News API "from" parameter for delta fetches)."""
+        return max((article.get("publishedAt") or "" for article in self.articles), default=None) or None
+
+
+class NewsCache:
+    """
+    SQLite store of articles per (company, trading day) and of the stories already sent.
+    """
+
+    def __init__(
+        self,
+        path: str = "news_cache.sqlite3",
+        max_age_seconds: float = 60 * 60,
+        sent_ttl_seconds: float = 7 * 24 * 60 * 60,
+        similarity_threshold: float = 0.5,
+        hasher: Optional[MinHasher] = None
+    ) -> None:
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a throwaway cache).
+            max_age_seconds (float): How long cached articles are served without revalidation.
+            sent_ttl_seconds (float): How long a sent story suppresses near-duplicates.
+            similarity_threshold (float): Estimated title similarity that counts as the same story.
+            hasher (MinHasher, optional): Signature builder (must stay the same across runs).
+        """
+        self.max_age_seconds = max_age_seconds
+        self.sent_ttl_seconds = sent_ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.hasher = hasher or MinHasher()
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS news ("
+            " company TEXT, day TEXT, fetched_at REAL, etag TEXT, last_modified TEXT, articles TEXT,"
+            " PRIMARY KEY (company, day));"
+            "CREATE TABLE IF NOT EXISTS sent_stories (company TEXT, signature BLOB, sent_at REAL);"
+            "CREATE INDEX IF NOT EXISTS sent_stories_company ON sent_stories (company);"
+        )
+        self._connection.commit()
+
+    @staticmethod
+    def _key(company: str) -> str:
+        return company.strip().casefold()
+
+    def get(self, company: str, day: date) -> Optional[NewsEntry]:
+        """Returns the cached entry of a company and day, or None."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT articles, fetched_at, etag, last_modified FROM news WHERE company = ? AND day = ?",
+                (self._key(company), day.isoformat())
+            ).fetchone()
+        if row is None:
+            return None
+        return NewsEntry(json.loads(row[0]), row[1], row[2], row[3])
+
+    def is_fresh(self, entry: NewsEntry) -> bool:
+        """True if the entry may be served without asking the API."""
+        return time.time() - entry.fetched_at < self.max_age_seconds
+
+    def store(
+        self,
+        company: str,
+        day: date,
+        articles: List[Dict[str, Any]],
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> NewsEntry:
+        """
+        Merges freshly fetched articles into the cached ones (by URL) and marks the entry fresh.
+
+        Returns:
+            NewsEntry: The merged entry.
+        """
+        entry = self.get(company, day) or NewsEntry()
+        merged = {article.get("url") or article_text(article): article for article in entry.articles}
+        merged.update({article.get("url") or article_text(article): article for article in articles})
+        entry = NewsEntry(
+            articles=sorted(merged.values(), key=lambda article: article.get("publishedAt") or "", reverse=True),
+            fetched_at=time.time(),
+            etag=etag or entry.etag,
+            last_modified=last_modified or entry.last_modified,
+        )
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO news (company, day, fetched_at, etag, last_modified, articles) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (self._key(company), day.isoformat(), entry.fetched_at, entry.etag, entry.last_modified,
+                 json.dumps(entry.articles))
+            )
+            self._connection.commit()
+        return entry
+
+    def touch(self, company: str, day: date) -> None:
+        """Marks an entry fresh again (the API answered 304 Not Modified)."""
+        with self._lock:
+            self._connection.execute(
+                "UPDATE news SET fetched_at = ? WHERE company = ? AND day = ?",
+                (time.time(), self._key(company), day.isoformat())
+            )
+            self._connection.commit()
+
+    def _sent_signatures(self, company: str) -> np.ndarray:
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT signature FROM sent_stories WHERE company = ? AND sent_at > ?",
+                (self._key(company), time.time() - self.sent_ttl_seconds)
+            ).fetchall()
+        return np.array([np.frombuffer(row[0], dtype=np.uint64) for row in rows])
+
+    def unsent_stories(self, company: str, articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Returns one article per distinct story that was not sent for this company recently.
+        """
+        return distinct_stories(articles, self.hasher, self.similarity_threshold, self._sent_signatures(company))
+
+    def mark_sent(self, company: str, articles: List[Dict[str, Any]]) -> None:
+        """Remembers the stories of sent articles so later runs skip them and their near-duplicates."""
+        now = time.time()
+        rows = [(self._key(company), self.hasher.signature(article_text(article)).tobytes(), now)
+                for article in articles]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT INTO sent_stories (company, signature, sent_at) VALUES (?, ?, ?)", rows
+            )
+            self._connection.execute("DELETE FROM sent_stories WHERE sent_at < ?", (now - self.sent_ttl_seconds,))
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+def format_alert_message(
+    symbol: str,
+    change_percent: float,
+    articles: List[Dict[str, Any]],
+    max_length: int = TWILIO_MAX_BODY_LENGTH
+) -> str:
+    """
+    Builds one message with the move and all distinct headlines of a symbol.
+    Briefs are dropped (and then headlines) as needed to stay within `max_length`.
+
+    Args:
+        symbol (str): Ticker symbol.
+        change_percent (float): Day-over-day change, in percent.
+        articles (List[Dict]): Distinct articles to include, best first.
+        max_length (int): Maximum message length.
+
+    Returns:
+        str: Message body.
+    """
+    up_down = "🔺" if change_percent > 0 else "🔻"
+    header = f"{symbol}: {up_down}{round(abs(change_percent))}%"
+    with_briefs = [f"Headline: {article['title']}. \nBrief: {article['description']}" for article in articles]
+    headlines_only = [f"Headline: {article['title']}." for article in articles]
+
+    for entries in (with_briefs, headlines_only):
+        message = "\n\n".join([header] + entries)
+        if len(message) <= max_length:
+            return message
+    message = header
+    for entry in headlines_only:
+        if len(message) + 2 + len(entry) > max_length:
+            break
+        message += "\n\n" + entry
+    return message
@@ -0,0 +1,196 @@
+"""
+price_store.py
+----------------
+Local, append-only daily price history per symbol:
+1. PriceStore: one binary file of fixed-size NumPy records per symbol. It is backfilled once
+   from Alpha Vantage and then only extended with new sessions (outputsize=compact deltas).
+2. Vectorized analytics over the stored history: day-over-day change, rolling volatility,
+   missing-session and opening-gap detection.
+"""
+
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# One fixed-size record per trading session; files are plain concatenations of these
+PRICE_DTYPE = np.dtype([
+    ("day", "datetime64[D]"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+
+# Number of sessions returned by Alpha Vantage with outputsize=compact
+COMPACT_SESSIONS = 100
+
+_SERIES_FIELDS = (("open", "1. open"), ("high", "2. high"), ("low", "3. low"),
+                  ("close", "4. close"), ("volume", "5. volume"))
+
+
+def parse_series(series: Dict[str, Dict[str, str]]) -> np.ndarray:
+    """
+    Converts an Alpha Vantage "Time Series (Daily)" object into records sorted by day.
+
+    Args:
+        series (Dict[str, Dict[str, str]]): Date -> {"1. open": ..., "4. close": ...}.
+
+    Returns:
+        np.ndarray: Structured array of PRICE_DTYPE, oldest session first.
+    """
+    days = sorted(series)
+    records = np.empty(len(days), dtype=PRICE_DTYPE)
+    records["day"] = np.array(days, dtype="datetime64[D]")
+    for name, key in _SERIES_FIELDS:
+        records[name] = np.array([series[day].get(key, "nan") for day in days], dtype=np.float64)
+    return records
+
+
+class PriceStore:
+    """
+    Directory of append-only price files, one per symbol ("<SYMBOL>.prices").
+    Appending a session writes 48 bytes; reading a symbol is a single np.fromfile.
+    """
+
+    def __init__(self, directory: str = "price_history") -> None:
+        """
+        Args:
+            directory (str): Where the per-symbol files are kept (created if missing).
+        """
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol.upper()}.prices")
+
+    def load(self, symbol: str) -> np.ndarray:
+        """
+        Returns the stored history of a symbol, oldest session first (empty if none).
+        """
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=PRICE_DTYPE)
+        return np.fromfile(path, dtype=PRICE_DTYPE)
+
+    def last_day(self, symbol: str) -> Optional[np.datetime64]:
+        """
+        Returns the latest stored session of a symbol without reading the whole file.
+        """
+        path = self._path(symbol)
+        if not os.path.exists(path) or os.path.getsize(path) < PRICE_DTYPE.itemsize:
+            return None
+        with open(path, "rb") as file:
+            file.seek(-PRICE_DTYPE.itemsize, os.SEEK_END)
+            return np.frombuffer(file.read(PRICE_DTYPE.itemsize), dtype=PRICE_DTYPE)["day"][0]
+
+    def append(self, symbol: str, records: np.ndarray) -> int:
+        """
+        Appends the sessions newer than the stored history.
+
+        Args:
+            symbol (str): Ticker symbol.
+            records (np.ndarray): PRICE_DTYPE records in any order (older ones are ignored).
+
+        Returns:
+            int: Number of sessions appended.
+        """
+        with self._lock:
+            last = self.last_day(symbol)
+            records = np.sort(records, order="day")
+            if last is not None:
+                records = records[records["day"] > last]
+            if len(records):
+                with open(self._path(symbol), "ab") as file:
+                    file.write(records.tobytes())
+        return len(records)
+
+    def needs_backfill(self, symbol: str, day: np.datetime64) -> bool:
+        """
+        True if a compact (last COMPACT_SESSIONS sessions) update could not close the gap
+        between the stored history and `day`, i.e. the symbol is new or long stale.
+        """
+        last = self.last_day(symbol)
+        return last is None or np.busday_count(last, day) >= COMPACT_SESSIONS
+
+
+# -------------------- VECTORIZED ANALYTICS --------------------
+
+def daily_change_percent(closes: np.ndarray) -> np.ndarray:
+    """
+    Day-over-day change of each close relative to the previous one, in percent.
+
+    Returns:
+        np.ndarray: One value per session; the first one is NaN.
+    """
+    change = np.full(closes.shape, np.nan)
+    change[1:] = np.diff(closes) / closes[:-1] * 100
+    return change
+
+
+def rolling_volatility(closes: np.ndarray, window: int = 20) -> np.ndarray:
+    """
+    Standard deviation of daily log returns over a rolling window, in percent.
+
+    Args:
+        closes (np.ndarray): Closing prices, oldest first.
+        window (int): Number of returns per window.
+
+    Returns:
+        np.ndarray: One value per session; NaN until `window` returns are available.
+    """
+    volatility = np.full(closes.shape, np.nan)
+    returns = np.diff(np.log(closes))
+    if len(returns) < window:
+        return volatility
+    windows = np.lib.stride_tricks.sliding_window_view(returns, window)
+    volatility[window:] = windows.std(axis=1, ddof=1) * 100
+    return volatility
+
+
+def missing_sessions(days: np.ndarray) -> np.ndarray:
+    """
+    Number of weekdays missing before each stored session (holidays count as missing).
+
+    Returns:
+        np.ndarray: One count per session; the first one is 0.
+    """
+    missing = np.zeros(days.shape, dtype=np.int64)
+    if len(days) > 1:
+        missing[1:] = np.busday_count(days[:-1], days[1:]) - 1
+    return np.maximum(missing, 0)
+
+
+def opening_gaps(records: np.ndarray, threshold_percent: float = 2.0) -> np.ndarray:
+    """
+    Indices of sessions that opened more than `threshold_percent` away from the previous close.
+    """
+    gap = np.zeros(len(records))
+    gap[1:] = (records["open"][1:] - records["close"][:-1]) / records["close"][:-1] * 100
+    return np.flatnonzero(np.abs(gap) > threshold_percent)
+
+
+def summarize(records: np.ndarray, window: int = 20) -> Dict[str, Any]:
+    """
+    Latest close, previous close, change, volatility and data gaps of a stored history.
+
+    Args:
+        records (np.ndarray): PRICE_DTYPE history, oldest first (at least two sessions).
+        window (int): Volatility window.
+
+    Returns:
+        Dict[str, Any]: close, previous_close, change_percent, volatility_percent,
+                        missing_sessions (total weekdays missing) and last_day.
+    """
+    closes = records["close"]
+    return {
+        "close": float(closes[-1]),
+        "previous_close": float(closes[-2]),
+        "change_percent": float(daily_change_percent(closes[-2:])[-1]),
+        "volatility_percent": float(rolling_volatility(closes[-(window + 1):], window)[-1]),
+        "missing_sessions": int(missing_sessions(records["day"]).sum()),
+        "last_day": str(records["day"][-1]),
+    }
@@ -0,0 +1,181 @@
+"""
+test_delivery_queue.py
+----------------
+Outbox and DeliveryQueue against a fake Twilio client: retries with backoff, dead-lettering,
+lease expiry and no double delivery after a crash between send and acknowledgement.
+"""
+
+import time
+from types import SimpleNamespace
+from typing import List
+
+import pytest
+
+from delivery_queue import DeliveryQueue, Outbox, TwilioSender, idempotency_key
+
+
+class TwilioError(Exception):
+    """Stands in for twilio's TwilioRestException (only `status` is used)."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+class FakeMessages:
+    """Twilio's messages resource: create() fails with the queued errors first, list() returns the log."""
+
+    def __init__(self, errors: List[Exception] = ()) -> None:
+        self.errors = list(errors)
+        self.log: List[SimpleNamespace] = []
+        self.attempt_times: List[float] = []
+
+    def create(self, body: str, from_: str, to: str) -> SimpleNamespace:
+        self.attempt_times.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        sent = SimpleNamespace(sid=f"SM{len(self.log)}", body=body, from_=from_, to=to)
+        self.log.append(sent)
+        return sent
+
+    def list(self, to: str, from_: str, date_sent_after=None, limit: int = 50) -> List[SimpleNamespace]:
+        return [sent for sent in self.log if sent.to == to and sent.from_ == from_][:limit]
+
+
+def fake_client(errors: List[Exception] = ()) -> SimpleNamespace:
+    return SimpleNamespace(messages=FakeMessages(errors))
+
+
+def status(outbox: Outbox, key: str) -> str:
+    return outbox._connection.execute("SELECT status FROM outbox WHERE key = ?", (key,)).fetchone()[0]
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    store = Outbox(str(tmp_path / "outbox.sqlite3"))
+    yield store
+    store.close()
+
+
+def enqueue(queue_or_outbox, body: str = "IBM: 🔺5%") -> str:
+    key = idempotency_key("IBM", "2026-03-10", "+15550000002", body)
+    assert queue_or_outbox.enqueue(key, "+15550000002", "+15550000001", body)
+    return key
+
+
+def test_enqueue_is_idempotent(outbox):
+    key = enqueue(outbox)
+    assert not outbox.enqueue(key, "+15550000002", "+15550000001", "IBM: 🔺5%")
+    assert outbox.counts() == {"pending": 1}
+
+
+def test_retryable_failures_are_retried_with_backoff(outbox):
+    client = fake_client([TwilioError(503), TwilioError(429)])
+    queue = DeliveryQueue(TwilioSender(client), outbox, workers=1, base_delay=0.1, max_delay=1.0,
+                          poll_interval=0.01)
+    with queue:
+        key = enqueue(queue)
+        assert queue.drain(timeout=5)
+
+    assert status(outbox, key) == "sent"
+    assert (queue.sent, queue.retried, queue.failed) == (1, 2, 0)
+    assert len(client.messages.log) == 1
+    first, second, third = client.messages.attempt_times
+    # 0.1s then 0.2s, each with at most 20% jitter
+    assert second - first >= 0.08
+    assert third - second >= 0.16
+
+
+def test_retry_delay_doubles_and_is_capped():
+    queue = DeliveryQueue(lambda message: "SM0", outbox=Outbox(":memory:"),
+                          base_delay=1.0, max_delay=5.0)
+    for attempts, expected in [(1, 1.0), (2, 2.0), (3, 4.0), (4, 5.0), (10, 5.0)]:
+        assert expected * 0.8 <= queue.retry_delay(attempts) <= expected * 1.2
+
+
+def test_retried_message_is_not_claimed_before_its_delay(outbox):
+    key = enqueue(outbox)
+    [message] = outbox.claim()
+    outbox.mark_retry(message.key, "HTTP 503", delay=60)
+    assert outbox.claim() == []
+    assert status(outbox, key) == "pending"
+
+
+def test_permanent_error_and_exhausted_attempts_are_dead_lettered(outbox):
+    client = fake_client([TwilioError(400)] + [TwilioError(500)] * 3)
+    queue = DeliveryQueue(TwilioSender(client), outbox, workers=1, max_attempts=3, base_delay=0.01,
+                          poll_interval=0.01)
+    with queue:
+        invalid_number = enqueue(queue, "invalid number")
+        assert queue.drain(timeout=5)
+        flaky = enqueue(queue, "server errors")
+        assert queue.drain(timeout=5)
+
+    assert status(outbox, invalid_number) == "failed"
+    assert status(outbox, flaky) == "failed"
+    assert len(client.messages.attempt_times) == 1 + 3
+    assert client.messages.log == []
+    assert queue.failed == 2
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    outbox = Outbox(str(tmp_path / "outbox.sqlite3"), lease_seconds=0.2)
+    key = enqueue(outbox)
+
+    [message] = outbox.claim()
+    assert not message.in_doubt and message.attempts == 1
+    # The worker holding the lease died; nobody else may take it until the lease expires
+    assert outbox.claim() == []
+
+    time.sleep(0.25)
+    [reclaimed] = outbox.claim()
+    assert reclaimed.key == key
+    assert reclaimed.in_doubt and reclaimed.attempts == 2
+    outbox.close()
+
+
+def test_no_double_delivery_after_crash_between_send_and_ack(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    client = fake_client()
+    sender = TwilioSender(client)
+
+    # First run: the message is sent, then the process dies before mark_sent
+    crashed = Outbox(path, lease_seconds=0.1)
+    key = enqueue(crashed)
+    [message] = crashed.claim()
+    sender(message)
+    crashed.close()
+
+    # Next run: the lease has expired and the message is claimed again
+    time.sleep(0.15)
+    outbox = Outbox(path, lease_seconds=0.1)
+    queue = DeliveryQueue(sender, outbox, workers=2, poll_interval=0.01)
+    with queue:
+        assert queue.drain(timeout=5)
+
+    assert len(client.messages.log) == 1
+    assert status(outbox, key) == "sent"
+    assert (queue.sent, queue.recovered) == (0, 1)
+    outbox.close()
+
+
+def test_in_doubt_message_that_was_never_sent_is_sent(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    client = fake_client()
+
+    # The process dies after claiming, before the send reached Twilio
+    crashed = Outbox(path, lease_seconds=0.1)
+    key = enqueue(crashed)
+    crashed.claim()
+    crashed.close()
+
+    time.sleep(0.15)
+    outbox = Outbox(path, lease_seconds=0.1)
+    queue = DeliveryQueue(TwilioSender(client), outbox, workers=1, poll_interval=0.01)
+    with queue:
+        assert queue.drain(timeout=5)
+
+    assert len(client.messages.log) == 1
+    assert status(outbox, key) == "sent"
+    assert (queue.sent, queue.recovered) == (1, 0)
+    outbox.close()
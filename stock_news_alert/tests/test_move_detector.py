@@ -0,0 +1,43 @@
+"""
+test_move_detector.py
+----------------
+MoveDetector scores: a large move alerts against a calm history, while a symbol with too
+few earlier returns scores 0 instead of being judged against a one-return volatility.
+"""
+
+import numpy as np
+
+from move_detector import MoveDetector
+
+
+def calm_history(sessions: int, last_move: float) -> np.ndarray:
+    closes = 100 * np.cumprod(1 + 0.002 * np.where(np.arange(sessions) % 2, 1, -1))
+    closes[-1] = closes[-2] * (1 + last_move)
+    return closes
+
+
+def test_large_move_alerts_against_calm_history():
+    detector = MoveDetector()
+    alerts = detector.detect(["CALM"], calm_history(detector.sessions_needed, 0.05)[None, :])
+
+    assert [alert.symbol for alert in alerts] == ["CALM"]
+    assert alerts[0].score >= detector.z_threshold
+
+
+def test_short_history_scores_zero():
+    detector = MoveDetector()
+    closes = np.array([[100.0, 101.0, 110.0]])
+
+    scores = detector.score(closes)
+
+    assert scores["score"][0] == 0.0
+    assert scores["ewma_zscore"][0] == 0.0 and not scores["horizon_zscore"].any()
+    assert detector.detect(["NEW"], closes) == []
+
+
+def test_scores_start_at_min_history():
+    detector = MoveDetector()
+    closes = calm_history(detector.min_history + 2, 0.05)
+
+    assert detector.score(closes[None, 1:])["score"][0] == 0.0
+    assert detector.score(closes[None, :])["score"][0] >= detector.z_threshold
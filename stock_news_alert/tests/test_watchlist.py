@@ -0,0 +1,75 @@
+"""
+test_watchlist.py
+----------------
+StockWatcher.update_history against a fake Alpha Vantage session: bars dated after the
+requested trading day (the unfinished session) must never reach the price store.
+"""
+
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+
+from news_cache import NewsCache
+from price_store import PriceStore, summarize
+from watchlist import DailyCache, QuotaScheduler, StockWatcher
+
+
+def bar(close: float) -> Dict[str, str]:
+    return {"1. open": str(close), "2. high": str(close), "3. low": str(close),
+            "4. close": str(close), "5. volume": "1000"}
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, body: Dict) -> None:
+        self.body = body
+
+    def json(self) -> Dict:
+        return self.body
+
+    def raise_for_status(self) -> None:
+        pass
+
+
+class FakeSession:
+    """Serves one daily series per call, in order."""
+
+    def __init__(self, series: List[Dict[str, Dict[str, str]]]) -> None:
+        self.series = list(series)
+        self.calls = 0
+
+    def get(self, url, params=None, headers=None, timeout=None) -> FakeResponse:
+        self.calls += 1
+        return FakeResponse({"Time Series (Daily)": self.series.pop(0)})
+
+
+def make_watcher(tmp_path, session: FakeSession) -> StockWatcher:
+    return StockWatcher(
+        "stock-key", "news-key",
+        stock_scheduler=QuotaScheduler(calls_per_minute=1000),
+        news_scheduler=QuotaScheduler(calls_per_minute=1000),
+        cache=DailyCache(":memory:"),
+        news_cache=NewsCache(":memory:"),
+        price_store=PriceStore(str(tmp_path / "prices")),
+        session=session,
+    )
+
+
+def test_unfinished_bar_after_day_is_not_stored(tmp_path):
+    intraday = {"2026-03-09": bar(100), "2026-03-10": bar(102), "2026-03-11": bar(150)}
+    final = {"2026-03-09": bar(100), "2026-03-10": bar(102), "2026-03-11": bar(104)}
+    session = FakeSession([intraday, final])
+    watcher = make_watcher(tmp_path, session)
+
+    history = watcher.update_history("IBM", date(2026, 3, 10))
+
+    assert history["day"][-1] == np.datetime64("2026-03-10")
+    assert summarize(history)["close"] == 102
+    assert watcher.price_store.last_day("IBM") == np.datetime64("2026-03-10")
+
+    # Once the 11th is the trading day, its final bar is fetched and stored
+    history = watcher.update_history("IBM", date(2026, 3, 11))
+    assert session.calls == 2
+    assert list(history["close"]) == [100, 102, 104]
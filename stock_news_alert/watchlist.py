@@ -0,0 +1,494 @@
+"""
+watchlist.py
+----------------
+Watchlist-driven engine for the Stock News Alert:
+1. Loads the symbols to watch from a file.
+2. Fetches daily quotes for all symbols concurrently, paced by a scheduler that
+   respects Alpha Vantage's per-minute (and daily) quota.
+3. Queries News API only for symbols whose move crosses the threshold
+   (or that a volatility-aware MoveDetector flags).
+4. Caches quotes per symbol per trading day and news per company per trading day
+   (see news_cache), so re-runs make no API calls and do not resend stories.
+5. Keeps each symbol's daily history in a local PriceStore, fetching only compact deltas.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import requests
+
+from move_detector import MoveDetector, close_matrix
+from news_cache import NewsCache
+from price_store import PriceStore, parse_series, summarize
+
+STOCK_ENDPOINT = "https://www.alphavantage.co/query"
+NEWS_ENDPOINT = "https://newsapi.org/v2/everything"
+
+# US markets close at 16:00 New York time; daily bars are final after that
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+MARKET_CLOSE_HOUR = 16
+
+
+@dataclass
+class WatchedSymbol:
+    """A ticker to watch and the company name used to search for news."""
+    symbol: str
+    company: str
+
+
+@dataclass
+class SymbolResult:
+    """
+    Outcome of one watchlist run for a single symbol.
+
+    Attributes:
+        symbol (str): Ticker symbol.
+        company (str): Company name.
+        close (float): Latest closing price.
+        previous_close (float): Closing price of the session before.
+        change_percent (float): Day-over-day change of the close, in percent.
+        volatility_percent (float): 20-session volatility of daily returns, in percent (NaN if too short).
+        missing_sessions (int): Weekdays missing from the stored history (holidays or data gaps).
+        alert (bool): Whether the move triggered an alert (and a news search).
+        score (float): Alert ranking score: the detector score, or the absolute change in percent.
+        reason (str): What triggered the alert.
+        articles (List[Dict]): Distinct, not yet sent news stories (only fetched for alerts).
+        error (str, optional): Why the symbol could not be checked.
+    """
+    symbol: str
+    company: str
+    close: float = 0.0
+    previous_close: float = 0.0
+    change_percent: float = 0.0
+    volatility_percent: float = float("nan")
+    missing_sessions: int = 0
+    alert: bool = False
+    score: float = 0.0
+    reason: str = ""
+    articles: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def up_down(self) -> str:
+        return "🔺" if self.change_percent > 0 else "🔻"
+
+
+class QuotaExhaustedError(Exception):
+    """Raised when the API's daily quota is used up."""
+
+
+class RateLimitedError(Exception):
+    """Raised when the API answered with a rate-limit notice instead of data."""
+
+
+class PremiumEndpointError(Exception):
+    """Raised when a request needs a premium Alpha Vantage plan (e.g. outputsize=full)."""
+
+
+def load_watchlist(path: str) -> List[WatchedSymbol]:
+    """
+    Reads a watchlist file with one "SYMBOL,Company name" per line.
+    The company name is optional (defaults to the symbol); blank lines and
+    lines starting with "#" are ignored, and duplicate symbols are dropped.
+
+    Args:
+        path (str): Path of the watchlist file.
+
+    Returns:
+        List[WatchedSymbol]: Symbols in file order.
+    """
+    watchlist: Dict[str, WatchedSymbol] = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            symbol, _, company = line.partition(",")
+            symbol = symbol.strip().upper()
+            watchlist.setdefault(symbol, WatchedSymbol(symbol, company.strip() or symbol))
+    return list(watchlist.values())
+
+
+def trading_day(now: Optional[datetime] = None) -> date:
+    """
+    Returns the most recent trading day whose daily bar is final:
+    today after the close on a weekday, otherwise the previous weekday.
+    Exchange holidays are not modelled; they simply get their own cache key.
+
+    Args:
+        now (datetime, optional): Current time (timezone-aware); defaults to now.
+
+    Returns:
+        date: Trading day used as the cache key.
+    """
+    local = (now or datetime.now(MARKET_TIMEZONE)).astimezone(MARKET_TIMEZONE)
+    day = local.date()
+    if local.hour < MARKET_CLOSE_HOUR:
+        day -= timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+class QuotaScheduler:
+    """
+    Sliding-window request scheduler for APIs with a per-minute quota (and optionally a daily one).
+    Callers block in acquire() until a slot is free; after a rate-limit notice from the API
+    all callers pause until the window has passed.
+    """
+
+    def __init__(self, calls_per_minute: int, calls_per_day: Optional[int] = None, period: float = 60.0) -> None:
+        """
+        Args:
+            calls_per_minute (int): Requests allowed in any `period`-second window.
+            calls_per_day (int, optional): Requests allowed per run/day; None for no daily cap.
+            period (float): Window length in seconds.
+        """
+        self.calls_per_minute = calls_per_minute
+        self.calls_per_day = calls_per_day
+        self.period = period
+        self.calls_made: int = 0
+        self._calls: Deque[float] = deque()
+        self._paused_until: float = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be sent.
+
+        Raises:
+            QuotaExhaustedError: If the daily quota is used up.
+        """
+        while True:
+            with self._lock:
+                if self.calls_per_day is not None and self.calls_made >= self.calls_per_day:
+                    raise QuotaExhaustedError(f"daily quota of {self.calls_per_day} calls used up")
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                if now >= self._paused_until and len(self._calls) < self.calls_per_minute:
+                    self._calls.append(now)
+                    self.calls_made += 1
+                    return
+                wait = max(self._paused_until - now,
+                           self._calls[0] + self.period - now if len(self._calls) >= self.calls_per_minute else 0)
+            time.sleep(wait)
+
+    def pause(self) -> None:
+        """Holds back every caller for one full window (after the API reported a rate limit)."""
+        with self._lock:
+            self._paused_until = time.monotonic() + self.period
+
+
+class DailyCache:
+    """
+    SQLite cache of API results per symbol, trading day and kind (e.g. "quote").
+    """
+
+    def __init__(self, path: str = "stock_cache.sqlite3") -> None:
+        """
+        Args:
+            path (str): SQLite database file (":memory:" for a throwaway cache).
+        """
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "symbol TEXT, day TEXT, kind TEXT, payload TEXT, PRIMARY KEY (symbol, day, kind))"
+        )
+        self._connection.commit()
+
+    def get(self, symbol: str, day: date, kind: str) -> Optional[Any]:
+        """Returns the cached result, or None on a miss."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT payload FROM results WHERE symbol = ? AND day = ? AND kind = ?",
+                (symbol, day.isoformat(), kind)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, symbol: str, day: date, kind: str, payload: Any) -> None:
+        """Stores a result."""
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results (symbol, day, kind, payload) VALUES (?, ?, ?, ?)",
+                (symbol, day.isoformat(), kind, json.dumps(payload))
+            )
+            self._connection.commit()
+
+    def purge_before(self, day: date) -> int:
+        """Deletes results of trading days before `day`; returns how many rows were removed."""
+        with self._lock:
+            cursor = self._connection.execute("DELETE FROM results WHERE day < ?", (day.isoformat(),))
+            self._connection.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        """Closes the database connection."""
+        with self._lock:
+            self._connection.close()
+
+
+class StockWatcher:
+    """
+    Checks a whole watchlist: concurrent quote fetches under the Alpha Vantage quota,
+    news only for symbols that moved more than the threshold.
+    """
+
+    def __init__(
+        self,
+        stock_api_key: str,
+        news_api_key: str,
+        threshold_percent: float = 1.0,
+        stock_scheduler: Optional[QuotaScheduler] = None,
+        news_scheduler: Optional[QuotaScheduler] = None,
+        cache: Optional[DailyCache] = None,
+        news_cache: Optional[NewsCache] = None,
+        price_store: Optional[PriceStore] = None,
+        detector: Optional[MoveDetector] = None,
+        max_workers: int = 8,
+        max_articles: int = 3,
+        session: Optional[requests.Session] = None
+    ) -> None:
+        """
+        Args:
+            stock_api_key (str): Alpha Vantage API key.
+            news_api_key (str): News API key.
+            threshold_percent (float): Absolute daily move (in percent) that triggers a news search.
+            stock_scheduler (QuotaScheduler, optional): Alpha Vantage pacing (free tier: 5/min, 25/day).
+            news_scheduler (QuotaScheduler, optional): News API pacing (developer tier: 100/day).
+            cache (DailyCache, optional): Per-trading-day quote cache.
+            news_cache (NewsCache, optional): Per-company, per-day news cache and sent-story log.
+            price_store (PriceStore, optional): Local daily price history.
+            detector (MoveDetector, optional): Volatility-aware detector used instead of the
+                                               fixed `threshold_percent` rule.
+            max_workers (int): Maximum number of concurrent requests.
+            max_articles (int): Articles kept per symbol.
+            session (requests.Session, optional): Shared keep-alive session.
+        """
+        self.stock_api_key = stock_api_key
+        self.news_api_key = news_api_key
+        self.threshold_percent = threshold_percent
+        self.stock_scheduler = stock_scheduler or QuotaScheduler(calls_per_minute=5, calls_per_day=25)
+        self.news_scheduler = news_scheduler or QuotaScheduler(calls_per_minute=50, calls_per_day=100)
+        self.cache = cache or DailyCache()
+        self.news_cache = news_cache or NewsCache()
+        self.price_store = price_store or PriceStore()
+        self.detector = detector
+        self.max_workers = max_workers
+        self.max_articles = max_articles
+        self.session = session or requests.Session()
+        self.api_calls: int = 0
+        self._calls_lock = threading.Lock()
+
+    def _request(
+        self,
+        url: str,
+        params: Dict[str, str],
+        scheduler: QuotaScheduler,
+        headers: Optional[Dict[str, str]] = None,
+        attempts: int = 3
+    ) -> Tuple[requests.Response, Dict]:
+        """
+        Sends one scheduled GET request, waiting out rate-limit notices.
+
+        Returns:
+            Tuple[requests.Response, Dict]: The response and its JSON body ({} for 304 Not Modified).
+
+        Raises:
+            RateLimitedError: If the API still reports a rate limit after all attempts.
+            QuotaExhaustedError: If the daily quota is used up.
+        """
+        for _ in range(attempts):
+            scheduler.acquire()
+            with self._calls_lock:
+                self.api_calls += 1
+            response = self.session.get(url, params=params, headers=headers, timeout=30)
+            if response.status_code == 429:
+                scheduler.pause()
+                continue
+            if response.status_code == 304:
+                return response, {}
+            response.raise_for_status()
+            data = response.json()
+            # Alpha Vantage reports throttling with HTTP 200 and a "Note"/"Information" message
+            notice = data.get("Note") or data.get("Information")
+            if notice:
+                if "premium" in notice.lower():
+                    raise PremiumEndpointError(notice)
+                if "per day" in notice or "daily" in notice:
+                    raise QuotaExhaustedError(notice)
+                scheduler.pause()
+                continue
+            return response, data
+        raise RateLimitedError(f"still rate limited after {attempts} attempts")
+
+    def _get(self, url: str, params: Dict[str, str], scheduler: QuotaScheduler) -> Dict:
+        """Sends one scheduled GET request and returns its JSON body (see _request)."""
+        return self._request(url, params, scheduler)[1]
+
+    def update_history(self, symbol: str, day: date) -> np.ndarray:
+        """
+        Brings the stored history of a symbol up to `day` and returns it.
+        New or long-stale symbols are backfilled with outputsize=full (falling back to
+        compact on plans without it); otherwise only the compact delta is fetched.
+
+        Args:
+            symbol (str): Ticker symbol.
+            day (date): Latest trading day that should be stored; later (unfinished) bars are ignored.
+
+        Returns:
+            np.ndarray: Stored PRICE_DTYPE history, oldest first.
+        """
+        last = self.price_store.last_day(symbol)
+        if last is not None and last >= np.datetime64(day):
+            return self.price_store.load(symbol)
+
+        params = {"function": "TIME_SERIES_DAILY", "symbol": symbol, "apikey": self.stock_api_key,
+                  "outputsize": "compact"}
+        if self.price_store.needs_backfill(symbol, np.datetime64(day)):
+            params["outputsize"] = "full"
+        try:
+            data = self._get(STOCK_ENDPOINT, params, self.stock_scheduler)
+        except PremiumEndpointError:
+            data = self._get(STOCK_ENDPOINT, {**params, "outputsize": "compact"}, self.stock_scheduler)
+        records = parse_series(data["Time Series (Daily)"])
+        # During market hours the series includes today's unfinished bar; storing it would
+        # make its partial close permanent in the append-only history
+        self.price_store.append(symbol, records[records["day"] <= np.datetime64(day)])
+        return self.price_store.load(symbol)
+
+    def fetch_quote(self, symbol: str, day: date) -> Dict[str, Any]:
+        """
+        Returns the latest close, previous close, change and volatility of a symbol,
+        computed from the local history (cached per trading day).
+
+        Args:
+            symbol (str): Ticker symbol.
+            day (date): Trading day used as the cache key.
+
+        Returns:
+            Dict[str, Any]: Summary as returned by price_store.summarize.
+        """
+        cached = self.cache.get(symbol, day, "quote")
+        if cached is not None:
+            return cached
+
+        history = self.update_history(symbol, day)
+        if len(history) < 2:
+            raise ValueError(f"only {len(history)} session(s) of history for {symbol}")
+        quote = summarize(history)
+        self.cache.set(symbol, day, "quote", quote)
+        return quote
+
+    def fetch_news(self, watched: WatchedSymbol, day: date) -> List[Dict[str, Any]]:
+        """
+        Returns the distinct stories about a company that were not sent yet.
+
+        Articles are cached per (company, trading day). A stale entry is revalidated
+        with If-None-Match/If-Modified-Since and only asks for articles published after
+        the newest cached one; near-duplicate titles and stories sent in earlier runs
+        are dropped (see NewsCache.unsent_stories).
+
+        Args:
+            watched (WatchedSymbol): Symbol and company name.
+            day (date): Trading day used as the cache key.
+
+        Returns:
+            List[Dict]: Up to `max_articles` articles, newest first.
+        """
+        entry = self.news_cache.get(watched.company, day)
+        if entry is None or not self.news_cache.is_fresh(entry):
+            params = {"apiKey": self.news_api_key, "qInTitle": watched.company, "sortBy": "publishedAt"}
+            headers: Dict[str, str] = {}
+            if entry is not None:
+                if entry.newest_published:
+                    params["from"] = entry.newest_published
+                if entry.etag:
+                    headers["If-None-Match"] = entry.etag
+                if entry.last_modified:
+                    headers["If-Modified-Since"] = entry.last_modified
+
+            response, data = self._request(NEWS_ENDPOINT, params, self.news_scheduler, headers)
+            if response.status_code == 304:
+                self.news_cache.touch(watched.company, day)
+            else:
+                entry = self.news_cache.store(
+                    watched.company, day, data.get("articles", []),
+                    etag=response.headers.get("ETag"), last_modified=response.headers.get("Last-Modified")
+                )
+
+        return self.news_cache.unsent_stories(watched.company, entry.articles)[:self.max_articles]
+
+    def check_quote(self, watched: WatchedSymbol, day: date) -> SymbolResult:
+        """Fetches the quote of one symbol (errors are recorded on the result)."""
+        result = SymbolResult(watched.symbol, watched.company)
+        try:
+            quote = self.fetch_quote(watched.symbol, day)
+            result.close, result.previous_close = quote["close"], quote["previous_close"]
+            result.change_percent = quote["change_percent"]
+            result.volatility_percent = quote["volatility_percent"]
+            result.missing_sessions = quote["missing_sessions"]
+        except (requests.RequestException, KeyError, ValueError,
+                RateLimitedError, QuotaExhaustedError, PremiumEndpointError) as error:
+            result.error = f"{type(error).__name__}: {error}"
+        return result
+
+    def flag_moves(self, results: List[SymbolResult]) -> None:
+        """
+        Marks the results that should alert. With a detector, all symbols are scored
+        together on their stored histories; otherwise the fixed threshold rule applies.
+        """
+        checked = [result for result in results if result.error is None]
+        if self.detector is None:
+            for result in checked:
+                result.score = abs(result.change_percent)
+                result.alert = result.score > self.threshold_percent
+                result.reason = f"moved more than {self.threshold_percent}%" if result.alert else ""
+            return
+
+        histories = {result.symbol: self.price_store.load(result.symbol) for result in checked}
+        symbols, _, closes = close_matrix(histories, self.detector.sessions_needed)
+        scores = self.detector.score(closes)["score"] if symbols else []
+        by_symbol = {result.symbol: result for result in checked}
+        for symbol, score in zip(symbols, scores):
+            by_symbol[symbol].score = float(score)
+        for move in self.detector.detect(symbols, closes):
+            by_symbol[move.symbol].alert = True
+            by_symbol[move.symbol].reason = f"{move.reason} ({move.score:.1f}σ, {move.move_percent:+.1f}%)"
+
+    def fetch_alert_news(self, result: SymbolResult, day: date) -> None:
+        """Fetches the news of an alerting symbol (errors are recorded on the result)."""
+        try:
+            result.articles = self.fetch_news(WatchedSymbol(result.symbol, result.company), day)
+        except (requests.RequestException, ValueError, RateLimitedError, QuotaExhaustedError) as error:
+            result.error = f"{type(error).__name__}: {error}"
+
+    def run(self, watchlist: List[WatchedSymbol], day: Optional[date] = None) -> List[SymbolResult]:
+        """
+        Checks every symbol of the watchlist: quotes concurrently, then move detection
+        over all symbols at once, then news for the alerting symbols concurrently.
+
+        Args:
+            watchlist (List[WatchedSymbol]): Symbols to check.
+            day (date, optional): Trading day (defaults to trading_day()).
+
+        Returns:
+            List[SymbolResult]: One result per symbol, in watchlist order.
+        """
+        day = day or trading_day()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(lambda watched: self.check_quote(watched, day), watchlist))
+            self.flag_moves(results)
+            list(executor.map(lambda result: self.fetch_alert_news(result, day),
+                              [result for result in results if result.alert]))
+        return results